@@ -1,8 +1,23 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, session, flash, Response
 from datetime import datetime
 from database import db, init_db
-from models import Project, Stakeholder, Requirement, Milestone
+from models import Project, Stakeholder, Requirement, Milestone, RequirementDependency, RequirementSignature
+from instrumentation import init_instrumentation
+import kano_engine
+import vsm_engine
+import wfmt_engine
+import roi_engine
+import roadmap_optimizer
+import dependency_graph
+import project_stats
+import accuracy_engine
+import search_index
+import duplicate_detector
+import sync_engine
+import change_log
+import requirement_updates
+import event_stream
 import json
 import functools
 import logging
@@ -44,6 +59,31 @@ logger = logging.getLogger(__name__)
 # 初始化数据库
 init_db(app)
 
+# 初始化性能埋点（按config.ini中的[INSTRUMENTATION]配置启用）
+init_instrumentation(app, db, config)
+
+# 需求依赖边随dependencies文本同步
+dependency_graph.init_dependency_graph(app)
+
+# WFMT标准时间计算使用的TMU表和默认宽放率
+wfmt_engine.configure(config)
+
+# 项目统计表随需求增删改增量维护，按[STATS]配置定期对账
+project_stats.init_project_stats(app, config)
+
+# 需求全文索引（SQLite FTS5 trigram，由触发器同步）
+search_index.init_search_index(app)
+
+# 近似重复需求检测的相似度阈值及导入时的检查方式；需求签名随需求写入同步
+duplicate_detector.configure(config)
+duplicate_detector.init_duplicate_detector(app)
+
+# 需求、干系人、里程碑的变更记录（供增量刷新），按[CHANGES]配置清理过期记录
+change_log.init_change_log(config)
+
+# 变更事件推送（SSE）的心跳间隔和订阅者上限
+event_stream.configure(config)
+
 # 添加响应后处理器，禁用缓存
 @app.after_request
 def after_request(response):
@@ -192,6 +232,8 @@ def delete_project(project_id):
     
     # 删除项目相关的所有数据
     Stakeholder.query.filter_by(project_id=project_id).delete()
+    RequirementSignature.query.filter_by(project_id=project_id).delete()
+    RequirementDependency.query.filter_by(project_id=project_id).delete()
     Requirement.query.filter_by(project_id=project_id).delete()
     Milestone.query.filter_by(project_id=project_id).delete()
     
@@ -387,6 +429,7 @@ def api_requirements(project_id):
         'estimated_roi': float(r.estimated_roi) if r.estimated_roi else 0,
         'actual_roi': float(r.actual_roi) if r.actual_roi else 0,
         'kano_category': r.kano_category,
+        'version': r.version,
         'created_at': r.created_at.isoformat() if r.created_at else None,
         'updated_at': r.updated_at.isoformat() if r.updated_at else None
     } for r in requirements])
@@ -498,6 +541,121 @@ def api_requirement_detail(req_id):
         logger.info(f"用户 {session['user_id']} 删除了需求: {requirement.title}")
         return add_cache_headers(jsonify({'success': True}))
 
+@app.route('/api/requirements/<int:req_id>', methods=['PATCH'])
+@login_required
+def api_patch_requirement(req_id):
+    """修改需求的状态、优先级或所属里程碑（只修改请求中给出的 status / priority / assigned_milestone_id）
+
+    请求头 If-Match 为需求的 version（GET 返回的 ETag），与当前版本不一致时返回412及当前版本，不写入；
+    不带 If-Match 时不检查版本。成功时返回修改后的字段和新的 version，ETag 为新版本。
+    """
+    project_id = db.first_or_404(db.select(Requirement.project_id).where(Requirement.id == req_id))
+    try:
+        item = requirement_updates.clean_item(dict(request.get_json(silent=True) or {}, id=req_id,
+                                                   version=request.headers.get('If-Match')))
+        results, conflicts = requirement_updates.apply_patches(project_id, [item])
+    except ValueError as e:
+        db.session.rollback()
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"修改需求失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+    if conflicts:
+        db.session.rollback()
+        response = jsonify({'success': False, 'error': '需求已被其他人修改', 'version': conflicts[0]['version']})
+        if conflicts[0]['version'] is not None:
+            response.headers['ETag'] = requirement_updates.format_etag(conflicts[0]['version'])
+        return add_cache_headers(response, 412)
+    db.session.commit()
+    logger.info(f"用户 {session['user_id']} 修改了需求 {req_id}: {item['fields']}")
+    response = jsonify({'success': True, **results[0]})
+    response.headers['ETag'] = requirement_updates.format_etag(results[0]['version'])
+    return add_cache_headers(response)
+
+@app.route('/api/projects/<int:project_id>/requirements', methods=['PATCH'])
+@login_required
+def api_patch_requirements(project_id):
+    """在一个事务中修改项目内多个需求（看板多选拖动）
+
+    请求体为 {"items": [{"id", "version", "status" / "priority" / "assigned_milestone_id"}]}，version
+    为客户端看到的版本（省略时不检查）。任一需求版本不一致或已删除时整批不写入，返回409及
+    conflicts（[{"id", "version"}]，version为当前版本，已删除时为null）。
+    """
+    Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return add_cache_headers(jsonify({'success': False, 'error': '缺少 items'}), 400)
+    if len(items) > requirement_updates.MAX_BATCH_ITEMS:
+        return add_cache_headers(jsonify({'success': False,
+                                          'error': f'单次最多修改{requirement_updates.MAX_BATCH_ITEMS}个需求'}), 400)
+    try:
+        results, conflicts = requirement_updates.apply_patches(
+            project_id, [requirement_updates.clean_item(item) for item in items])
+    except ValueError as e:
+        db.session.rollback()
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"批量修改需求失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+    if conflicts:
+        db.session.rollback()
+        return add_cache_headers(jsonify({'success': False, 'error': '部分需求已被其他人修改',
+                                          'conflicts': conflicts}), 409)
+    db.session.commit()
+    logger.info(f"用户 {session['user_id']} 批量修改了项目 {project_id} 的 {len(results)} 个需求")
+    return add_cache_headers(jsonify({'success': True, 'items': results}))
+
+@app.route('/api/projects/<int:project_id>/requirements/bulk-update', methods=['POST'])
+@login_required
+def api_bulk_update_requirements(project_id):
+    """批量修改项目内的需求（一条UPDATE语句）
+
+    请求体为 {"filter": {字段: 值或值列表}, "ids": [...], "set": {"status" / "priority" / "assigned_milestone_id"}}，
+    filter 和 ids 至少给出一个（同时给出时取交集）。返回修改的需求数 updated。
+    """
+    Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        updated = requirement_updates.bulk_update(project_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"批量修改需求失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+    logger.info(f"用户 {session['user_id']} 批量修改了项目 {project_id} 的 {updated} 个需求: {data.get('set')}")
+    return add_cache_headers(jsonify({'success': True, 'updated': updated}))
+
+@app.route('/api/projects/<int:project_id>/requirements/bulk-delete', methods=['POST'])
+@login_required
+def api_bulk_delete_requirements(project_id):
+    """批量删除项目内的需求（一条DELETE语句）
+
+    请求体为 {"filter": {字段: 值或值列表}, "ids": [...]}，至少给出一个（同时给出时取交集）。
+    返回删除的需求数 deleted。
+    """
+    Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        deleted = requirement_updates.bulk_delete(project_id, data)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"批量删除需求失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+    logger.info(f"用户 {session['user_id']} 批量删除了项目 {project_id} 的 {deleted} 个需求")
+    return add_cache_headers(jsonify({'success': True, 'deleted': deleted}))
+
 @app.route('/api/requirements/detail/<int:req_id>')
 @login_required
 def get_requirement_detail(req_id):
@@ -513,8 +671,11 @@ def get_requirement_detail(req_id):
         'goal': requirement.goal,
         'expected_solution': requirement.expected_solution,
         'value': requirement.value,
-        'other_info': requirement.other_info
+        'other_info': requirement.other_info,
+        'version': requirement.version
     })
+    # 版本号作为ETag，PATCH时用If-Match提交
+    response.headers['ETag'] = requirement_updates.format_etag(requirement.version)
     return response
 
 # 价值评估路由
@@ -525,43 +686,33 @@ def value_assessment(project_id):
     project = Project.query.get_or_404(project_id)
     requirements = Requirement.query.filter_by(project_id=project_id).all()
     
-    # 计算已完成价值评估的需求
-    completed_requirements = [r for r in requirements if r.actual_roi is not None]
-    
-    # 计算平均准确度
-    average_accuracy = 0
-    if completed_requirements:
-        total_accuracy = 0
-        for r in completed_requirements:
-            if r.actual_roi and r.estimated_roi:
-                accuracy = (1 - abs(r.actual_roi - r.estimated_roi) / r.actual_roi) * 100
-                total_accuracy += accuracy
-        average_accuracy = total_accuracy / len(completed_requirements)
-    
-    # 计算最佳评估者
-    performer_scores = {}
-    for r in completed_requirements:
-        if r.actual_value_assessor:
-            if r.actual_value_assessor not in performer_scores:
-                performer_scores[r.actual_value_assessor] = []
-            if r.actual_roi and r.estimated_roi:
-                accuracy = (1 - abs(r.actual_roi - r.estimated_roi) / r.actual_roi) * 100
-                performer_scores[r.actual_value_assessor].append(accuracy)
-    
-    best_performer = None
-    if performer_scores:
-        avg_scores = {k: sum(v)/len(v) for k, v in performer_scores.items()}
-        best_performer = max(avg_scores.items(), key=lambda x: x[1])[0]
+    # 预估准确性指标（向量化计算，按项目数据版本缓存）
+    accuracy = accuracy_engine.analyze_project(db, Requirement, project_id)
     
     response = make_response(render_template('value_assessment.html',
                          project=project,
                          requirements=requirements,
-                         completed_requirements=completed_requirements,
-                         average_accuracy=average_accuracy/100,
-                         best_performer=best_performer,
-                         improvement_trend="↑ 改善" if len(completed_requirements) > 3 else "→ 稳定"))
+                         completed_count=accuracy['assessed'],
+                         average_accuracy=accuracy['overall']['accuracy']/100,
+                         best_performer=accuracy['best_performer'],
+                         improvement_trend=accuracy['trend']['label']))
     return response
 
+@app.route('/api/projects/<int:project_id>/value-accuracy')
+@login_required
+def api_value_accuracy(project_id):
+    """预估准确性分析API
+
+    返回项目整体及按提案人、分类汇总的准确率、MAPE和偏差，以及按实际价值评估日期的月度趋势。
+    """
+    Project.query.get_or_404(project_id)
+    try:
+        accuracy = accuracy_engine.analyze_project(db, Requirement, project_id)
+        return add_cache_headers(jsonify({'success': True, **accuracy}))
+    except Exception as e:
+        logger.error(f"预估准确性分析失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 @app.route('/api/requirements/<int:req_id>/actual-value', methods=['POST'])
 @login_required
 def submit_actual_value(req_id):
@@ -615,6 +766,34 @@ def export_value_report(project_id):
     logger.info(f"用户 {session['user_id']} 导出了项目 {project.name} 的价值评估报告")
     return response
 
+@app.route('/api/projects/<int:project_id>/roi-simulation')
+@login_required
+def api_roi_simulation(project_id):
+    """ROI蒙特卡洛模拟
+
+    按历史预估/实际误差标定价值和工作量的三角分布，返回每个需求ROI的P10/P50/P90
+    以及项目组合的价值、工作量和ROI分位数。可选参数 trials（试验次数）和 seed（随机种子）。
+    """
+    project = Project.query.get_or_404(project_id)
+    try:
+        trials = request.args.get('trials', 10000, type=int)
+        seed = request.args.get('seed', type=int)
+        if trials is None or not 100 <= trials <= 100000:
+            return add_cache_headers(jsonify({'success': False, 'error': 'trials 必须在100到100000之间'}), 400)
+
+        calibration, portfolio, results = roi_engine.simulate_project(db, Requirement, project_id, trials, seed)
+        logger.info(f"用户 {session['user_id']} 运行了项目 {project.name} 的ROI模拟，共 {len(results)} 个需求")
+        return add_cache_headers(jsonify({
+            'success': True,
+            'trials': trials,
+            'calibration': calibration,
+            'portfolio': portfolio,
+            'results': results
+        }))
+    except Exception as e:
+        logger.error(f"ROI模拟失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 # 需求分析路由
 @app.route('/project/<int:project_id>/requirement-analysis')
 @login_required
@@ -623,12 +802,10 @@ def requirement_analysis(project_id):
     project = Project.query.get_or_404(project_id)
     requirements = Requirement.query.filter_by(project_id=project_id).all()
     
-    # 统计优先级和分类
-    priority_stats = {}
-    category_stats = {}
-    for req in requirements:
-        priority_stats[req.priority] = priority_stats.get(req.priority, 0) + 1
-        category_stats[req.category] = category_stats.get(req.category, 0) + 1
+    # 统计优先级和分类（读取增量维护的项目统计表）
+    stats = project_stats.get_project_stats(project_id)
+    priority_stats = stats['priority']
+    category_stats = stats['category']
     
     response = make_response(render_template('requirement_analysis.html',
                           project=project,
@@ -643,6 +820,8 @@ def requirement_analysis(project_id):
 def roadmap_planning(project_id):
     """路线图规划页面"""
     project = Project.query.get_or_404(project_id)
+    # 在查询之前取游标，页面渲染期间的修改会在实时刷新时补上
+    change_cursor = change_log.latest_cursor()
     milestones = Milestone.query.filter_by(project_id=project_id).order_by(Milestone.deadline).all()
     requirements = Requirement.query.filter_by(project_id=project_id).all()
     
@@ -659,10 +838,19 @@ def roadmap_planning(project_id):
         if req.status in status_groups:
             status_groups[req.status].append(req)
     
+    # 各里程碑已分配的需求
+    milestone_requirements = {milestone.id: [] for milestone in milestones}
+    for req in requirements:
+        if req.assigned_milestone_id in milestone_requirements:
+            milestone_requirements[req.assigned_milestone_id].append(req)
+    
     response = make_response(render_template('roadmap_planning.html',
                           project=project,
                           milestones=milestones,
-                          status_groups=status_groups))
+                          requirements=requirements,
+                          milestone_requirements=milestone_requirements,
+                          status_groups=status_groups,
+                          change_cursor=change_cursor))
     return response
 
 @app.route('/api/roadmap/<int:project_id>')
@@ -670,11 +858,16 @@ def roadmap_planning(project_id):
 def api_roadmap_data(project_id):
     """获取用于路线图显示的里程碑数据"""
     milestones = Milestone.query.filter_by(project_id=project_id).order_by(Milestone.deadline).all()
+    # 所有里程碑关联的需求按assigned_milestone_id一次查出，避免每个里程碑一条查询
+    milestone_requirements = {m.id: [] for m in milestones}
+    if milestone_requirements:
+        for r in Requirement.query.filter(Requirement.assigned_milestone_id.in_(list(milestone_requirements))) \
+                .order_by(Requirement.id):
+            milestone_requirements[r.assigned_milestone_id].append(r)
     result = []
     for m in milestones:
         # 获取关联的需求
-        req_ids = [int(r) for r in m.requirements.split(',')] if m.requirements else []
-        requirements = Requirement.query.filter(Requirement.id.in_(req_ids)).all()
+        requirements = milestone_requirements[m.id]
         
         result.append({
             'id': m.id,
@@ -694,6 +887,99 @@ def api_roadmap_data(project_id):
     
     return add_cache_headers(jsonify(result))
 
+@app.route('/api/roadmap/<int:project_id>/optimize', methods=['POST'])
+@login_required
+def api_roadmap_optimize(project_id):
+    """按里程碑容量自动规划需求
+
+    请求体 {"capacities": {"<里程碑ID>": 工作量点数}, "default_capacity": 0,
+    "method": "auto"|"dp"|"greedy", "apply": false}。在容量和依赖约束下按截止日期
+    顺序为各里程碑选择estimated_roi总和最大的需求；apply为true时写回分配结果。
+    """
+    project = Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    method = data.get('method', 'auto')
+    if method not in ('auto', 'dp', 'greedy'):
+        return add_cache_headers(jsonify({'success': False, 'error': 'method 只能是 auto、dp 或 greedy'}), 400)
+    try:
+        capacities = {int(k): int(v) for k, v in (data.get('capacities') or {}).items()}
+        default_capacity = int(data.get('default_capacity', 0))
+    except (TypeError, ValueError, AttributeError):
+        return add_cache_headers(jsonify({'success': False, 'error': '里程碑容量必须是整数'}), 400)
+    if default_capacity < 0 or any(v < 0 for v in capacities.values()):
+        return add_cache_headers(jsonify({'success': False, 'error': '里程碑容量不能为负数'}), 400)
+
+    try:
+        apply = bool(data.get('apply'))
+        result = roadmap_optimizer.optimize_project(db, Requirement, Milestone, project_id, capacities,
+                                                    default_capacity, method, apply,
+                                                    dependency_graph.prerequisites(project_id))
+        if apply:
+            logger.info(f"用户 {session['user_id']} 应用了项目 {project.name} 的路线图规划，共 {result['scheduled_requirements']} 个需求")
+        result['success'] = True
+        result['applied'] = apply
+        return add_cache_headers(jsonify(result))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"路线图规划失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/dependencies/<int:project_id>')
+@login_required
+def api_dependency_graph(project_id):
+    """需求依赖图API
+
+    返回拓扑顺序、依赖环、关键路径（按工作量累计最长的依赖链）以及按里程碑截止日期
+    推算会延期的需求。可选参数 days_per_point 为每个工作量点对应的天数（默认1）。
+    依赖图按项目数据版本缓存，数据未变化时不会重新读取需求表。
+    """
+    Project.query.get_or_404(project_id)
+    days_per_point = request.args.get('days_per_point', 1.0, type=float)
+    if days_per_point is None or days_per_point <= 0:
+        return add_cache_headers(jsonify({'success': False, 'error': 'days_per_point 必须大于0'}), 400)
+    try:
+        graph = dependency_graph.get_project_graph(project_id, days_per_point)
+        result = graph.summary()
+        result['success'] = True
+        return add_cache_headers(jsonify(result))
+    except Exception as e:
+        logger.error(f"依赖图计算失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/dependencies/<int:project_id>/<int:req_id>')
+@login_required
+def api_requirement_dependencies(project_id, req_id):
+    """单个需求的上游（阻塞它的）和下游（被它阻塞的）需求"""
+    Project.query.get_or_404(project_id)
+    days_per_point = request.args.get('days_per_point', 1.0, type=float)
+    if days_per_point is None or days_per_point <= 0:
+        return add_cache_headers(jsonify({'success': False, 'error': 'days_per_point 必须大于0'}), 400)
+    graph = dependency_graph.get_project_graph(project_id, days_per_point)
+    if req_id not in graph.index:
+        return add_cache_headers(jsonify({'success': False, 'error': '需求不存在'}), 404)
+    i = graph.index[req_id]
+    return add_cache_headers(jsonify({
+        'success': True,
+        'requirement': graph.node_info(i),
+        'in_cycle': any(i in cycle for cycle in graph.cycles),
+        'upstream': graph.related(req_id, downstream=False),
+        'downstream': graph.related(req_id, downstream=True)
+    }))
+
+@app.route('/api/dependencies/<int:project_id>/rebuild', methods=['POST'])
+@login_required
+def api_rebuild_dependencies(project_id):
+    """按dependencies文本重新生成项目的依赖边"""
+    project = Project.query.get_or_404(project_id)
+    try:
+        count = dependency_graph.rebuild_project_edges(project_id)
+        logger.info(f"用户 {session['user_id']} 重建了项目 {project.name} 的依赖边，共 {count} 条")
+        return add_cache_headers(jsonify({'success': True, 'edges': count}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"依赖边重建失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 @app.route('/api/milestones/<int:project_id>', methods=['GET', 'POST'])
 @login_required
 def api_milestones(project_id):
@@ -713,10 +999,15 @@ def api_milestones(project_id):
             title=data['title'],
             description=data.get('description', ''),
             deadline=deadline,
-            requirements=','.join(map(str, data.get('requirements', []))),
             status=data.get('status', 'planned')
         )
         db.session.add(milestone)
+        try:
+            # 所属里程碑以需求的assigned_milestone_id为准，同时重写里程碑的需求列表
+            requirement_updates.assign_milestone(milestone, data.get('requirements') or [])
+        except (TypeError, ValueError):
+            db.session.rollback()
+            return add_cache_headers(jsonify({'success': False, 'error': 'requirements 必须为需求ID列表'}), 400)
         db.session.commit()
         logger.info(f"用户 {session['user_id']} 创建了里程碑: {data['title']}")
         response = jsonify({'success': True, 'id': milestone.id})
@@ -754,8 +1045,12 @@ def api_milestone_detail(milestone_id):
                 pass
         milestone.deadline = deadline
         
-        milestone.requirements = ','.join(map(str, data.get('requirements', [])))
         milestone.status = data.get('status', milestone.status)
+        try:
+            requirement_updates.assign_milestone(milestone, data.get('requirements') or [])
+        except (TypeError, ValueError):
+            db.session.rollback()
+            return add_cache_headers(jsonify({'success': False, 'error': 'requirements 必须为需求ID列表'}), 400)
         
         db.session.commit()
         logger.info(f"用户 {session['user_id']} 更新了里程碑: {old_title} -> {milestone.title}")
@@ -765,6 +1060,7 @@ def api_milestone_detail(milestone_id):
         # 记录删除日志
         log_deletion(session['user_id'], '里程碑', milestone_id, milestone.title)
         
+        requirement_updates.assign_milestone(milestone, [])
         db.session.delete(milestone)
         db.session.commit()
         logger.info(f"用户 {session['user_id']} 删除了里程碑: {milestone.title}")
@@ -796,6 +1092,43 @@ def kano_analysis(project_id):
                           kano_groups=kano_groups))
     return response
 
+@app.route('/api/kano/<int:project_id>', methods=['GET', 'POST'])
+@login_required
+def api_kano_analysis(project_id):
+    """KANO调查评估API
+
+    GET 按当前调查数据计算分类分布和Better/Worse系数；
+    POST 可附带新的调查答案 {"responses": [...], "mode": "append"|"replace"}，
+    评估后批量写回kano_category和kano_priority_score。
+    """
+    project = Project.query.get_or_404(project_id)
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            mode = data.get('mode', 'append')
+            if mode not in ('append', 'replace'):
+                return add_cache_headers(jsonify({'success': False, 'error': 'mode 只能是 append 或 replace'}), 400)
+            try:
+                results = kano_engine.evaluate_project(db, Requirement, project_id,
+                                                       responses=data.get('responses'), mode=mode)
+            except ValueError as e:
+                db.session.rollback()
+                return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+            logger.info(f"用户 {session['user_id']} 评估了项目 {project.name} 的KANO调查，共 {len(results)} 个需求")
+        else:
+            results = kano_engine.evaluate_project(db, Requirement, project_id, write=False)
+
+        return add_cache_headers(jsonify({
+            'success': True,
+            'evaluated_requirements': len(results),
+            'category_distribution': kano_engine.category_distribution(results),
+            'results': list(results.values())
+        }))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"KANO评估失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 # VSM分析路由
 @app.route('/project/<int:project_id>/vsm')
 @login_required
@@ -809,6 +1142,42 @@ def vsm_analysis(project_id):
                           requirements=requirements))
     return response
 
+@app.route('/api/vsm/<int:project_id>', methods=['GET', 'POST'])
+@login_required
+def api_vsm_analysis(project_id):
+    """VSM价值流计算API
+
+    GET 按vsm_process_steps_json计算各需求的交付周期、增值比、瓶颈和未来状态改善量；
+    POST 计算后批量写回cycle_time（瓶颈步骤的有效节拍）、lead_time和process_efficiency。
+    可选参数 takt_time（节拍时间）和 daily_demand（日需求量，用于把库存折算为等待时间）。
+    """
+    project = Project.query.get_or_404(project_id)
+    try:
+        params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        try:
+            takt_time = float(params['takt_time']) if params.get('takt_time') not in (None, '') else None
+            daily_demand = float(params['daily_demand']) if params.get('daily_demand') not in (None, '') else None
+        except (TypeError, ValueError):
+            return add_cache_headers(jsonify({'success': False, 'error': 'takt_time 和 daily_demand 必须是数字'}), 400)
+        if (takt_time is not None and takt_time <= 0) or (daily_demand is not None and daily_demand <= 0):
+            return add_cache_headers(jsonify({'success': False, 'error': 'takt_time 和 daily_demand 必须大于0'}), 400)
+
+        write = request.method == 'POST'
+        results = vsm_engine.analyze_project(db, Requirement, project_id, takt_time=takt_time,
+                                             daily_demand=daily_demand, write=write)
+        if write:
+            logger.info(f"用户 {session['user_id']} 计算了项目 {project.name} 的价值流，共 {len(results)} 个需求")
+
+        return add_cache_headers(jsonify({
+            'success': True,
+            'summary': vsm_engine.project_summary(results),
+            'results': list(results.values())
+        }))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"VSM计算失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 # SMART目标路由
 @app.route('/project/<int:project_id>/smart')
 @login_required
@@ -844,6 +1213,7 @@ def wfmt_analysis(project_id):
 def kanban_view(project_id):
     """看板视图页面"""
     project = Project.query.get_or_404(project_id)
+    change_cursor = change_log.latest_cursor()
     requirements = Requirement.query.filter_by(project_id=project_id).all()
     
     status_groups = {
@@ -855,30 +1225,61 @@ def kanban_view(project_id):
     
     response = make_response(render_template('kanban.html',
                           project=project,
-                          status_groups=status_groups))
+                          status_groups=status_groups,
+                          change_cursor=change_cursor))
     return response
 
 @app.route('/api/wfmt/<int:project_id>', methods=['GET', 'POST'])
 @login_required
 def api_wfmt_analysis(project_id):
-    """WFMT分析API"""
+    """WFMT分析API
+
+    POST 提交需求的动作序列，由服务端按TMU表计算TMU总数、标准时间和改善前后时间，
+    不再直接保存客户端计算的结果。
+    """
     if request.method == 'POST':
         try:
-            data = request.get_json()
+            data = request.get_json(silent=True) or {}
             requirement_id = data.get('requirement_id')
-            
+            sequence = data.get('action_sequence')
+            if not sequence:
+                return add_cache_headers(jsonify({'success': False, 'error': '缺少动作序列 action_sequence'}), 400)
+
+            try:
+                allowance_rate = data.get('allowance_rate')
+                allowance_rate = wfmt_engine.default_allowance_rate if allowance_rate in (None, '') else float(allowance_rate)
+                improvement_potential = data.get('improvement_potential')
+                improvement_potential = None if improvement_potential in (None, '') else float(improvement_potential)
+            except (TypeError, ValueError):
+                return add_cache_headers(jsonify({'success': False, 'error': '宽放率和改善潜力必须是数字'}), 400)
+            if not 0 <= allowance_rate <= 100 or (improvement_potential is not None and not 0 <= improvement_potential <= 100):
+                return add_cache_headers(jsonify({'success': False, 'error': '宽放率和改善潜力必须在0到100之间'}), 400)
+
             requirement = Requirement.query.filter_by(id=requirement_id, project_id=project_id).first_or_404()
-            
+
+            raw_sequence = sequence if isinstance(sequence, str) else json.dumps(sequence, ensure_ascii=False)
+            results, errors = wfmt_engine.analyze([(requirement.id, raw_sequence, allowance_rate, improvement_potential)])
+            if requirement.id in errors:
+                return add_cache_headers(jsonify({'success': False, 'error': errors[requirement.id]}), 400)
+            result = results.get(requirement.id)
+            if result is None:
+                return add_cache_headers(jsonify({'success': False, 'error': '动作序列为空'}), 400)
+            if result['unknown_codes']:
+                return add_cache_headers(jsonify({
+                    'success': False,
+                    'error': f"无法识别的动作代码: {', '.join(result['unknown_codes'])}"
+                }), 400)
+
             # 更新WFMT相关字段
             requirement.wfmt_analysis = data.get('analysis_data')
-            requirement.standard_time = data.get('standard_time')
-            requirement.improvement_potential = data.get('improvement_potential')
-            requirement.wfmt_tmu_total = data.get('tmu_total')
-            requirement.wfmt_allowance_rate = data.get('allowance_rate', 15.0)  # 默认15%宽放率
-            
+            requirement.wfmt_action_sequence = raw_sequence
+            requirement.improvement_potential = improvement_potential
+            for field, value in wfmt_engine.result_fields(result, datetime.utcnow()).items():
+                setattr(requirement, field, value)
+
             db.session.commit()
             logger.info(f"用户 {session['user_id']} 为需求 {requirement.title} 更新了WFMT分析数据")
-            return add_cache_headers(jsonify({'success': True}))
+            return add_cache_headers(jsonify({'success': True, 'result': result}))
             
         except Exception as e:
             db.session.rollback()
@@ -897,11 +1298,40 @@ def api_wfmt_analysis(project_id):
                 'standard_time': req.standard_time,
                 'improvement_potential': req.improvement_potential,
                 'tmu_total': req.wfmt_tmu_total,
-                'allowance_rate': req.wfmt_allowance_rate
+                'allowance_rate': req.wfmt_allowance_rate,
+                'before_time': req.wfmt_before_time,
+                'after_time': req.wfmt_after_time,
+                'time_saved': req.wfmt_time_saved
             })
     
     return add_cache_headers(jsonify(wfmt_data))
 
+@app.route('/api/wfmt/<int:project_id>/recompute', methods=['POST'])
+@login_required
+def api_wfmt_recompute(project_id):
+    """按当前TMU表批量重新计算项目内所有动作序列
+
+    TMU表文件修改后可提交 {"reload_table": true} 先重新加载表。
+    """
+    project = Project.query.get_or_404(project_id)
+    try:
+        data = request.get_json(silent=True) or {}
+        table = wfmt_engine.reload_table() if data.get('reload_table') else wfmt_engine.get_table()
+        results, errors = wfmt_engine.recompute_project(db, Requirement, project_id, table)
+        invalid = {req_id: r['unknown_codes'] for req_id, r in results.items() if r['unknown_codes']}
+        logger.info(f"用户 {session['user_id']} 重新计算了项目 {project.name} 的WFMT标准时间，共 {len(results) - len(invalid)} 个需求")
+        return add_cache_headers(jsonify({
+            'success': True,
+            'table_version': table.version,
+            'updated_requirements': len(results) - len(invalid),
+            'invalid_sequences': {str(k): v for k, v in errors.items()},
+            'unknown_codes': {str(k): v for k, v in invalid.items()}
+        }))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"WFMT批量计算失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 # 综合分析报告API
 @app.route('/project/<int:project_id>/comprehensive-analysis')
 @login_required
@@ -917,23 +1347,22 @@ def comprehensive_analysis_api(project_id):
     """综合分析报告API"""
     try:
         project = Project.query.get_or_404(project_id)
-        requirements = Requirement.query.filter_by(project_id=project_id).all()
+        stats = project_stats.get_project_stats(project_id)
+        completion = stats['completion']
         
         # 数据质量分析
-        total_requirements = len(requirements)
-        requirements_with_kano = len([r for r in requirements if r.kano_category])
-        requirements_with_vsm = len([r for r in requirements if r.vsm_process_steps])
-        requirements_with_smart = len([r for r in requirements if r.smart_specific])
-        requirements_with_wfmt = len([r for r in requirements if r.standard_time is not None])
-        requirements_with_value = len([r for r in requirements if r.estimated_roi is not None])
+        total_requirements = stats['total']
+        
+        def completion_rate(key):
+            return (completion[key] / total_requirements * 100) if total_requirements > 0 else 0
         
         data_quality = {
             'total_requirements': total_requirements,
-            'kano_completion_rate': (requirements_with_kano / total_requirements * 100) if total_requirements > 0 else 0,
-            'vsm_completion_rate': (requirements_with_vsm / total_requirements * 100) if total_requirements > 0 else 0,
-            'smart_completion_rate': (requirements_with_smart / total_requirements * 100) if total_requirements > 0 else 0,
-            'wfmt_completion_rate': (requirements_with_wfmt / total_requirements * 100) if total_requirements > 0 else 0,
-            'value_completion_rate': (requirements_with_value / total_requirements * 100) if total_requirements > 0 else 0,
+            'kano_completion_rate': completion_rate('kano'),
+            'vsm_completion_rate': completion_rate('vsm'),
+            'smart_completion_rate': completion_rate('smart'),
+            'wfmt_completion_rate': completion_rate('wfmt'),
+            'value_completion_rate': completion_rate('value'),
         }
         
         # 计算整体完成率
@@ -948,8 +1377,8 @@ def comprehensive_analysis_api(project_id):
         data_quality['overall_completion_rate'] = overall_completion_rate
         
         # 价值分析
-        total_estimated_value = sum([r.estimated_roi or 0 for r in requirements])
-        total_actual_value = sum([r.actual_roi or 0 for r in requirements if r.actual_roi is not None])
+        total_estimated_value = stats['sum']['estimated_roi']
+        total_actual_value = stats['sum']['actual_roi']
         
         value_analysis = {
             'total_estimated_value': total_estimated_value,
@@ -958,14 +1387,9 @@ def comprehensive_analysis_api(project_id):
         }
         
         # 分类统计
-        priority_stats = {}
-        category_stats = {}
-        kano_stats = {}
-        
-        for req in requirements:
-            priority_stats[req.priority] = priority_stats.get(req.priority, 0) + 1
-            category_stats[req.category] = category_stats.get(req.category, 0) + 1
-            kano_stats[req.kano_category] = kano_stats.get(req.kano_category, 0) + 1
+        priority_stats = stats['priority']
+        category_stats = stats['category']
+        kano_stats = stats['kano_category']
         
         analysis_data = {
             'project_name': project.name,
@@ -994,6 +1418,203 @@ def comprehensive_analysis_api(project_id):
         logger.error(f"综合分析报告生成失败: {str(e)}")
         return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
 
+@app.route('/api/projects/<int:project_id>/stats')
+@login_required
+def api_project_stats(project_id):
+    """项目统计API，直接读取增量维护的project_stats表"""
+    Project.query.get_or_404(project_id)
+    return add_cache_headers(jsonify({'success': True, 'stats': project_stats.get_project_stats(project_id)}))
+
+@app.route('/api/search/<int:project_id>')
+@login_required
+def api_search_requirements(project_id):
+    """需求全文检索API
+
+    参数 q 为检索词（空格分隔，多个词同时命中），page、per_page 分页（每页最多100条）。
+    结果按相关度排序，标题和摘要中命中的词以<mark>标出。
+    """
+    Project.query.get_or_404(project_id)
+    query = (request.args.get('q') or '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    if not query:
+        return add_cache_headers(jsonify({'success': False, 'error': '缺少检索词 q'}), 400)
+    if page is None or per_page is None or page < 1 or not 1 <= per_page <= search_index.MAX_PER_PAGE:
+        return add_cache_headers(jsonify({'success': False, 'error': f'page 必须为正整数，per_page 必须在1到{search_index.MAX_PER_PAGE}之间'}), 400)
+    try:
+        result = search_index.search(project_id, query, page, per_page)
+        return add_cache_headers(jsonify({'success': True, 'query': query, **result}))
+    except Exception as e:
+        logger.error(f"需求检索失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/duplicates/<int:project_id>')
+@login_required
+def api_detect_duplicates(project_id):
+    """近似重复需求检测API
+
+    按标题和需求描述的MinHash签名做LSH分段匹配，参数 threshold 为相似度阈值（0~1，默认取配置），
+    limit 为最多返回的重复组数。
+    """
+    Project.query.get_or_404(project_id)
+    threshold = request.args.get('threshold', duplicate_detector.threshold, type=float)
+    limit = request.args.get('limit', 100, type=int)
+    if threshold is None or not 0 < threshold <= 1:
+        return add_cache_headers(jsonify({'success': False, 'error': 'threshold 必须在0到1之间'}), 400)
+    if limit is None or limit < 1:
+        return add_cache_headers(jsonify({'success': False, 'error': 'limit 必须为正整数'}), 400)
+    try:
+        result = duplicate_detector.detect_project(project_id, threshold, limit)
+        logger.info(f"用户 {session['user_id']} 检测了项目 {project_id} 的重复需求，发现 {result['duplicate_groups']} 组")
+        return add_cache_headers(jsonify({'success': True, **result}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"重复需求检测失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/duplicates/<int:project_id>/check', methods=['POST'])
+@login_required
+def api_check_duplicate(project_id):
+    """新建需求前检查是否与项目内已有需求近似重复
+
+    请求体 {"title", "scenario", "problem", "goal", "current_solution", "threshold"}，除title外均可选。
+    """
+    Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title') or '').strip()
+    if not title:
+        return add_cache_headers(jsonify({'success': False, 'error': '缺少需求标题 title'}), 400)
+    try:
+        threshold = float(data.get('threshold', duplicate_detector.threshold))
+    except (TypeError, ValueError):
+        threshold = None
+    if threshold is None or not 0 < threshold <= 1:
+        return add_cache_headers(jsonify({'success': False, 'error': 'threshold 必须在0到1之间'}), 400)
+    try:
+        text = duplicate_detector.requirement_text(title, data.get('scenario'), data.get('problem'),
+                                                   data.get('goal'), data.get('current_solution'))
+        similar = duplicate_detector.find_similar(project_id, text, threshold)
+        return add_cache_headers(jsonify({'success': True, 'threshold': threshold, 'similar': similar}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"重复需求检查失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/projects/<int:project_id>/changes')
+@login_required
+def api_project_changes(project_id):
+    """项目变更记录API
+
+    参数 since 为上次返回的 cursor，返回之后新增或修改（upserted，含当前数据）和删除（deleted，ID列表）的
+    需求、干系人和里程碑；limit 为每次最多读取的变更记录数，has_more 为真时用新游标继续读取。
+    不带 since 时只返回当前游标。reset 为真表示游标早于已清理的记录（或首次调用），需重新加载完整列表。
+    """
+    Project.query.get_or_404(project_id)
+    limit = request.args.get('limit', change_log.DEFAULT_LIMIT, type=int)
+    if limit is None or not 1 <= limit <= change_log.MAX_LIMIT:
+        return add_cache_headers(jsonify({'success': False, 'error': f'limit 必须在1到{change_log.MAX_LIMIT}之间'}), 400)
+    try:
+        if 'since' not in request.args:
+            return add_cache_headers(jsonify({'success': True, 'cursor': change_log.latest_cursor(), 'has_more': False,
+                                              'reset': True, **change_log.empty_changes()}))
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return add_cache_headers(jsonify({'success': False, 'error': 'since 必须为非负整数'}), 400)
+        change_log.prune_if_due()
+        result = change_log.changes_since(project_id, since, limit)
+        return add_cache_headers(jsonify({'success': True, **result}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"读取变更记录失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/projects/<int:project_id>/events')
+@login_required
+def api_project_events(project_id):
+    """项目变更事件流（Server-Sent Events）
+
+    项目中的需求、干系人、里程碑被修改并提交后推送 change 事件（entity、id、action），
+    一次提交中变化过多时合并为一个 bulk 事件；客户端落后太多时推送 reset 事件。
+    事件只用于通知，客户端收到后调用变更记录API按自己的游标读取数据。
+    """
+    Project.query.get_or_404(project_id)
+    stream = event_stream.broker.stream(project_id)
+    if stream is None:
+        logger.warning(f"事件流订阅者已满，拒绝用户 {session['user_id']} 订阅项目 {project_id}")
+        return add_cache_headers(jsonify({'success': False, 'error': '订阅者过多，请稍后重试'}), 503)
+    response = Response(stream, mimetype='text/event-stream')
+    # 禁止反向代理缓冲事件流
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/sync/<int:project_id>', methods=['GET', 'POST'])
+@login_required
+def api_sync(project_id):
+    """桌面端增量同步API
+
+    GET：参数 stakeholders / requirements 为上次返回的游标（首次同步留空），limit 为每类最多返回的记录数，
+    返回游标之后新增或修改的记录及新游标，has_more 为真时用新游标继续拉取。参数 deletions 为上次返回的
+    删除游标，deletions 中返回之后在服务器上删除的记录ID（reset 为真时为当前全部记录ID）。
+    POST：请求体 {"stakeholders": [...], "requirements": [...]}，每项为
+    {"key", "id", "base_updated_at", "deleted", "fields"}，在一个事务中执行，逐条返回结果，
+    服务器记录已被他人修改时返回 conflict 及服务器上的记录。
+    """
+    Project.query.get_or_404(project_id)
+    if request.method == 'GET':
+        limit = request.args.get('limit', sync_engine.DEFAULT_PAGE_SIZE, type=int)
+        if limit is None or not 1 <= limit <= sync_engine.MAX_PAGE_SIZE:
+            return add_cache_headers(jsonify({
+                'success': False, 'error': f'limit 必须在1到{sync_engine.MAX_PAGE_SIZE}之间'}), 400)
+        cursors = {kind: request.args.get(kind, '') for kind in sync_engine.SYNC_KINDS}
+        try:
+            changes = sync_engine.pull_changes(project_id, cursors, limit)
+            deletions = sync_engine.pull_deletions(project_id, request.args.get('deletions', ''), limit)
+        except ValueError as e:
+            return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 400)
+        except Exception as e:
+            logger.error(f"同步拉取失败: {str(e)}")
+            return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+        return add_cache_headers(jsonify({'success': True, 'changes': changes, 'deletions': deletions}))
+
+    data = request.get_json(silent=True) or {}
+    batch = {kind: data.get(kind) or [] for kind in sync_engine.SYNC_KINDS}
+    total = sum(len(items) for items in batch.values())
+    if total > sync_engine.MAX_PUSH_ITEMS:
+        return add_cache_headers(jsonify({
+            'success': False, 'error': f'单次最多同步 {sync_engine.MAX_PUSH_ITEMS} 条记录'}), 400)
+    try:
+        results = sync_engine.apply_changes(project_id, batch)
+        db.session.commit()
+        counts = {}
+        for items in results.values():
+            for item in items:
+                counts[item['status']] = counts.get(item['status'], 0) + 1
+        logger.info(f"用户 {session['user_id']} 同步了项目 {project_id} 的 {total} 条记录: {counts}")
+        return add_cache_headers(jsonify({'success': True, 'results': results}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"同步失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
+@app.route('/api/projects/<int:project_id>/stats/reconcile', methods=['POST'])
+@login_required
+def api_reconcile_project_stats(project_id):
+    """从需求表重新统计项目数据并报告偏差
+
+    请求体可选 {"fix": false} 只报告偏差，默认用重算结果修正统计表。
+    """
+    project = Project.query.get_or_404(project_id)
+    try:
+        data = request.get_json(silent=True) or {}
+        fix = bool(data.get('fix', True))
+        drift = project_stats.reconcile([project_id], fix=fix)
+        logger.info(f"用户 {session['user_id']} 对项目 {project.name} 的统计数据进行了对账，发现 {len(drift)} 处偏差")
+        return add_cache_headers(jsonify({'success': True, 'fixed': fix, 'drift': drift}))
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"项目统计对账失败: {str(e)}")
+        return add_cache_headers(jsonify({'success': False, 'error': str(e)}), 500)
+
 # 根据description字段解析九要素内容
 def parse_description_fields(description):
     """解析description字段中的九要素内容"""
@@ -1114,20 +1735,48 @@ def import_pdf_data(project_id):
         for page in pdf_reader.pages:
             text_content += page.extract_text() + "\n"
         
-        # 解析PDF内容并创建需求
+        duplicate_check = request.form.get('duplicate_check', duplicate_detector.import_check)
+        last_id = db.session.query(db.func.max(Requirement.id)).scalar() or 0
+
+        # 解析PDF内容并创建需求，重复检查（及跳过重复）与导入在同一事务内完成
         requirements_created = parse_pdf_content_and_create_requirements(project_id, text_content, pdf_file.filename)
+        duplicates = check_imported_duplicates(project_id, last_id, duplicate_check)
+        if duplicate_check == 'skip':
+            requirements_created -= len(duplicates)
+        db.session.commit()
         
         logger.info(f"用户 {session['user_id']} 从PDF文件 {pdf_file.filename} 导入了 {requirements_created} 个需求")
         return jsonify({
             'success': True, 
             'requirements_created': requirements_created,
+            'possible_duplicates' if duplicate_check != 'skip' else 'skipped_duplicates': duplicates,
             'message': f'成功导入 {requirements_created} 个需求'
         })
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"PDF导入失败: {str(e)}")
         return jsonify({'success': False, 'error': f'导入失败: {str(e)}'})
 
+def check_imported_duplicates(project_id, last_id, mode):
+    """导入后、提交前的重复检查：找出ID大于last_id的新需求中与导入前已有需求近似重复的条目
+
+    mode 为 report 时只返回重复列表，为 skip 时同时删除这些新需求（与导入在同一事务内，由调用方提交），
+    为 off 时不检查。
+    """
+    if mode not in duplicate_detector.IMPORT_CHECK_MODES or mode == 'off':
+        return []
+    new_ids = [row[0] for row in db.session.query(Requirement.id).filter(
+        Requirement.project_id == project_id, Requirement.id > last_id).all()]
+    if not new_ids:
+        return []
+    duplicates = duplicate_detector.check_new_requirements(project_id, new_ids)
+    if mode == 'skip' and duplicates:
+        for requirement in Requirement.query.filter(Requirement.id.in_([item['id'] for item in duplicates])).all():
+            db.session.delete(requirement)
+        db.session.flush()
+    return duplicates
+
 def parse_pdf_content_and_create_requirements(project_id, text_content, filename):
     """解析PDF内容并创建需求"""
     requirements_created = 0
@@ -1184,7 +1833,7 @@ def parse_kano_pdf(project_id, text_content):
                 requirements_created += 1
     
     if requirements_created > 0:
-        db.session.commit()
+        db.session.flush()
     
     return requirements_created
 
@@ -1228,6 +1877,11 @@ def parse_vsm_pdf(project_id, text_content):
                     title=title,
                     source='VSM分析PDF导入',
                     vsm_process_steps=line,
+                    vsm_process_steps_json=json.dumps([{
+                        'name': line,
+                        'process_time': cycle_time or 0,
+                        'wait_time': max(0, (lead_time or 0) - (cycle_time or 0)),
+                    }], ensure_ascii=False) if cycle_time or lead_time else None,
                     cycle_time=cycle_time,
                     lead_time=lead_time
                 )
@@ -1235,7 +1889,7 @@ def parse_vsm_pdf(project_id, text_content):
                 requirements_created += 1
     
     if requirements_created > 0:
-        db.session.commit()
+        db.session.flush()
     
     return requirements_created
 
@@ -1282,7 +1936,7 @@ def parse_smart_pdf(project_id, text_content):
                 requirements_created += 1
     
     if requirements_created > 0:
-        db.session.commit()
+        db.session.flush()
     
     return requirements_created
 
@@ -1340,7 +1994,7 @@ def parse_wfmt_pdf(project_id, text_content):
                 requirements_created += 1
     
     if requirements_created > 0:
-        db.session.commit()
+        db.session.flush()
     
     return requirements_created
 
@@ -1369,7 +2023,7 @@ def parse_general_pdf(project_id, text_content):
                 requirements_created += 1
     
     if requirements_created > 0:
-        db.session.commit()
+        db.session.flush()
     
     return requirements_created
 
@@ -1384,6 +2038,7 @@ def import_batch_pdf(project_id):
         
         total_requirements = 0
         import_results = []
+        duplicate_check = request.form.get('duplicate_check', duplicate_detector.import_check)
         
         for pdf_file in pdf_files:
             file_path = os.path.join(current_dir, pdf_file)
@@ -1394,15 +2049,22 @@ def import_batch_pdf(project_id):
                     for page in pdf_reader.pages:
                         text_content += page.extract_text() + "\n"
                 
+                last_id = db.session.query(db.func.max(Requirement.id)).scalar() or 0
                 requirements_created = parse_pdf_content_and_create_requirements(project_id, text_content, pdf_file)
+                duplicates = check_imported_duplicates(project_id, last_id, duplicate_check)
+                if duplicate_check == 'skip':
+                    requirements_created -= len(duplicates)
+                db.session.commit()
                 total_requirements += requirements_created
                 import_results.append({
                     'filename': pdf_file,
                     'requirements_created': requirements_created,
+                    'possible_duplicates' if duplicate_check != 'skip' else 'skipped_duplicates': duplicates,
                     'status': 'success'
                 })
                 
             except Exception as e:
+                db.session.rollback()
                 import_results.append({
                     'filename': pdf_file,
                     'requirements_created': 0,
@@ -1476,4 +2138,7 @@ def download_template(template_type):
     return response
 
 if __name__ == '__main__':
+    # 调试模式下应用运行在重载器的子进程中，后台对账只在该进程中启动
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        project_stats.start_reconciler(app)
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,387 @@
+# benchmarks/loadtest.py
+"""本地负载测试工具
+
+模拟多个分析师并发使用系统：每个虚拟用户先通过 /login 登录，然后按权重随机
+回放用户操作流程（打开项目、查看需求列表、看板拖动、提交实际价值、运行综合分析、
+导入PDF），最后按路由统计吞吐量、P50/P95/P99延迟和错误率。
+
+仅依赖标准库，运行前先启动应用（python app.py），例如:
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:5001 --project-id 1 --users 20 --duration 60
+"""
+import argparse
+import http.cookiejar
+import io
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='需求分析系统负载测试')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5001', help='被测服务地址')
+    parser.add_argument('--project-id', type=int, default=1, help='测试使用的项目ID')
+    parser.add_argument('--username', default='admin', help='登录用户名')
+    parser.add_argument('--password', default='admin123', help='登录密码')
+    parser.add_argument('--users', type=int, default=10, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=60, help='测试持续时间（秒）')
+    parser.add_argument('--ramp-up', type=float, default=5, help='所有用户启动完成所用时间（秒）')
+    parser.add_argument('--think-time', type=float, default=1.0, help='两次操作之间的平均思考时间（秒）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时时间（秒）')
+    parser.add_argument('--weights', help='操作权重，例如 open_project=3,import_pdf=0')
+    parser.add_argument('--pdf', help='import_pdf 使用的PDF文件，默认使用内置的小型PDF')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--json', help='把统计结果写入JSON文件')
+    return parser
+
+
+class RouteStats:
+    """单个路由的延迟样本和错误计数"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.status_counts = {}
+
+
+class Recorder:
+    """线程安全地汇总各路由的请求结果"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, route, latency, status, error):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.latencies.append(latency)
+            stats.status_counts[status] = stats.status_counts.get(status, 0) + 1
+            if error:
+                stats.errors += 1
+
+    def summary(self):
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        routes = {}
+        total_requests = 0
+        total_errors = 0
+        with self._lock:
+            items = sorted(self._routes.items())
+        for route, stats in items:
+            ordered = sorted(stats.latencies)
+            count = len(ordered)
+            total_requests += count
+            total_errors += stats.errors
+            routes[route] = {
+                'requests': count,
+                'throughput': count / elapsed if elapsed else 0,
+                'p50_ms': percentile(ordered, 50) * 1000,
+                'p95_ms': percentile(ordered, 95) * 1000,
+                'p99_ms': percentile(ordered, 99) * 1000,
+                'max_ms': ordered[-1] * 1000 if ordered else 0,
+                'error_rate': stats.errors / count if count else 0,
+                'status_counts': {str(k): v for k, v in stats.status_counts.items()},
+            }
+        return {
+            'duration': elapsed,
+            'requests': total_requests,
+            'throughput': total_requests / elapsed if elapsed else 0,
+            'error_rate': total_errors / total_requests if total_requests else 0,
+            'routes': routes,
+        }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# 默认操作权重：浏览为主，写操作和导入较少
+DEFAULT_WEIGHTS = {
+    'open_project': 25,
+    'list_requirements': 30,
+    'kanban_drag': 20,
+    'submit_actual_value': 10,
+    'comprehensive_analysis': 12,
+    'import_pdf': 3,
+}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """不自动跟随重定向，使每次请求只计一次"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+    def http_error_302(self, req, fp, code, msg, headers):
+        return fp
+
+    http_error_301 = http_error_303 = http_error_307 = http_error_302
+
+
+class VirtualUser:
+    """一个独立会话（独立Cookie）的虚拟用户"""
+
+    def __init__(self, args, recorder, rng, pdf_bytes):
+        self.args = args
+        self.recorder = recorder
+        self.rng = rng
+        self.pdf_bytes = pdf_bytes
+        self.requirements = []
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect()
+        )
+
+    def request(self, route, method, path, body=None, content_type=None, headers=None):
+        """发送请求并记录结果，返回 (状态码, 响应体)"""
+        url = self.args.base_url.rstrip('/') + path
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+        req = urllib.request.Request(url, data=body, method=method, headers=headers)
+        started = time.perf_counter()
+        status = 0
+        payload = b''
+        try:
+            with self.opener.open(req, timeout=self.args.timeout) as resp:
+                status = resp.status
+                payload = resp.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            payload = e.read()
+        except (urllib.error.URLError, OSError):
+            status = 0
+        latency = time.perf_counter() - started
+        # 部分接口出错时返回200和 {"success": false}
+        error = status == 0 or status >= 400 or b'"success":false' in payload[:200]
+        self.recorder.record(route, latency, status, error)
+        return status, payload
+
+    def get_json(self, route, path):
+        status, payload = self.request(route, 'GET', path)
+        if status != 200:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def send_json(self, route, method, path, data, headers=None):
+        return self.request(route, method, path, json.dumps(data).encode('utf-8'), 'application/json', headers)
+
+    def login(self):
+        body = urllib.parse.urlencode({'username': self.args.username, 'password': self.args.password})
+        status, _ = self.request('POST /login', 'POST', '/login', body.encode('utf-8'),
+                                 'application/x-www-form-urlencoded')
+        # 登录成功时重定向到首页
+        return status == 302
+
+    def pick_requirement(self):
+        if not self.requirements:
+            self.list_requirements()
+        return self.rng.choice(self.requirements) if self.requirements else None
+
+    # ---- 用户操作流程 ----
+
+    def open_project(self):
+        pid = self.args.project_id
+        self.request('GET /project/<id>', 'GET', f'/project/{pid}')
+        self.request('GET /api/stakeholders/<id>', 'GET', f'/api/stakeholders/{pid}')
+
+    def list_requirements(self):
+        pid = self.args.project_id
+        self.request('GET /project/<id>/requirements', 'GET', f'/project/{pid}/requirements')
+        data = self.get_json('GET /api/requirements/<id>', f'/api/requirements/{pid}')
+        if data:
+            self.requirements = data
+
+    def kanban_drag(self):
+        pid = self.args.project_id
+        self.request('GET /project/<id>/kanban', 'GET', f'/project/{pid}/kanban')
+        requirement = self.pick_requirement()
+        if requirement is None:
+            return
+        req_id = requirement['id']
+        headers = {'If-Match': f'"{requirement["version"]}"'} if requirement.get('version') else None
+        _, payload = self.send_json('PATCH /api/requirements/<req_id>', 'PATCH', f'/api/requirements/{req_id}', {
+            'status': self.rng.choice(['collected', 'analyzing', 'confirmed', 'rejected'])
+        }, headers)
+        # 成功时返回新版本，版本冲突（412）时返回当前版本，下次拖动同一需求时使用
+        try:
+            requirement['version'] = json.loads(payload)['version']
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    def submit_actual_value(self):
+        pid = self.args.project_id
+        self.request('GET /project/<id>/value-assessment', 'GET', f'/project/{pid}/value-assessment')
+        requirement = self.pick_requirement()
+        if requirement is None:
+            return
+        req_id = requirement['id']
+        self.send_json('POST /api/requirements/<req_id>/actual-value', 'POST',
+                       f'/api/requirements/{req_id}/actual-value', {
+                           'actual_business_value': self.rng.randint(1, 10),
+                           'actual_user_value': self.rng.randint(1, 10),
+                           'actual_technical_value': self.rng.randint(1, 10),
+                           'actual_effort': self.rng.randint(1, 10),
+                           'actual_value_assessor': self.args.username,
+                       })
+
+    def comprehensive_analysis(self):
+        pid = self.args.project_id
+        self.request('GET /project/<id>/comprehensive-analysis', 'GET', f'/project/{pid}/comprehensive-analysis')
+        self.request('GET /api/comprehensive-analysis/<id>', 'GET', f'/api/comprehensive-analysis/{pid}')
+
+    def import_pdf(self):
+        pid = self.args.project_id
+        boundary = uuid.uuid4().hex
+        body = io.BytesIO()
+        body.write(f'--{boundary}\r\n'.encode())
+        body.write(b'Content-Disposition: form-data; name="pdf_file"; filename="loadtest_import.pdf"\r\n')
+        body.write(b'Content-Type: application/pdf\r\n\r\n')
+        body.write(self.pdf_bytes)
+        body.write(f'\r\n--{boundary}--\r\n'.encode())
+        self.request('POST /api/import/pdf/<id>', 'POST', f'/api/import/pdf/{pid}', body.getvalue(),
+                     f'multipart/form-data; boundary={boundary}')
+
+
+def parse_weights(text):
+    weights = dict(DEFAULT_WEIGHTS)
+    if not text:
+        return weights
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in weights:
+            raise SystemExit(f'未知的操作: {name}，可选: {", ".join(weights)}')
+        weights[name] = float(value)
+    return weights
+
+
+def minimal_pdf(text_lines):
+    """生成一个只包含ASCII文本的最小PDF文件"""
+    content_lines = ['BT', '/F1 12 Tf', '72 720 Td', '14 TL']
+    for line in text_lines:
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        content_lines.append(f'({escaped}) Tj T*')
+    content_lines.append('ET')
+    stream = '\n'.join(content_lines).encode('latin-1')
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f'{number} 0 obj\n'.encode() + obj + b'\nendobj\n')
+    xref_offset = out.tell()
+    out.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+    for offset in offsets:
+        out.write(f'{offset:010d} 00000 n \n'.encode())
+    out.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode())
+    return out.getvalue()
+
+
+def default_pdf():
+    lines = []
+    for i in range(3):
+        lines += [
+            f'Load test imported requirement {i + 1}',
+            'The workshop supervisor needs to record inspection results on a mobile device',
+            'so that quality issues are visible to the planning team within minutes.',
+            '',
+        ]
+    return minimal_pdf(lines)
+
+
+def user_loop(user, weights, deadline, think_time):
+    names = list(weights)
+    values = [weights[n] for n in names]
+    if not user.login():
+        return
+    while time.perf_counter() < deadline:
+        name = user.rng.choices(names, values)[0]
+        started = time.perf_counter()
+        try:
+            getattr(user, name)()
+        except Exception as e:
+            # 响应格式异常等问题记为该操作流程的错误，虚拟用户继续运行
+            user.recorder.record(f'journey {name}: {type(e).__name__}', time.perf_counter() - started, 0, True)
+        if think_time > 0:
+            time.sleep(user.rng.expovariate(1.0 / think_time))
+
+
+def print_summary(summary):
+    print(f'\n持续时间: {summary["duration"]:.1f} 秒  请求总数: {summary["requests"]}  '
+          f'吞吐量: {summary["throughput"]:.1f} 请求/秒  错误率: {summary["error_rate"] * 100:.2f}%')
+    print(f'{"路由":<48}{"请求数":>8}{"请求/秒":>10}{"P50(ms)":>10}{"P95(ms)":>10}{"P99(ms)":>10}{"错误率":>9}')
+    for route, r in summary['routes'].items():
+        print(f'{route:<48}{r["requests"]:>8}{r["throughput"]:>10.2f}{r["p50_ms"]:>10.1f}'
+              f'{r["p95_ms"]:>10.1f}{r["p99_ms"]:>10.1f}{r["error_rate"] * 100:>8.1f}%')
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    weights = parse_weights(args.weights)
+    if args.pdf:
+        with open(args.pdf, 'rb') as f:
+            pdf_bytes = f.read()
+    else:
+        pdf_bytes = default_pdf()
+
+    seed_rng = random.Random(args.seed)
+    recorder = Recorder()
+    recorder.started_at = time.perf_counter()
+    deadline = recorder.started_at + args.ramp_up + args.duration
+
+    threads = []
+    for i in range(args.users):
+        user = VirtualUser(args, recorder, random.Random(seed_rng.random()), pdf_bytes)
+        thread = threading.Thread(target=user_loop, args=(user, weights, deadline, args.think_time),
+                                  name=f'virtual-user-{i + 1}', daemon=True)
+        threads.append(thread)
+        thread.start()
+        if args.users > 1 and args.ramp_up > 0:
+            time.sleep(args.ramp_up / args.users)
+
+    for thread in threads:
+        thread.join()
+    recorder.finished_at = time.perf_counter()
+
+    summary = recorder.summary()
+    summary.update({
+        'base_url': args.base_url,
+        'users': args.users,
+        'weights': weights,
+        'created_at': datetime.utcnow().isoformat(),
+    })
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.json}')
+    return 1 if summary['requests'] == 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# benchmarks/run_benchmarks.py
+"""Web应用路由基准测试
+
+对每种数据规模（默认1k/10k/100k条需求）生成独立的测试数据库，在独立进程中
+加载应用并用Flask测试客户端多次请求各个页面和API，统计耗时后写入JSON结果文件，
+便于在不同提交之间比较。
+
+用法:
+    python benchmarks/run_benchmarks.py                       # 运行全部规模
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --rounds 5
+    python benchmarks/run_benchmarks.py --compare results/a.json results/b.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, '.data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# 需要计时的路由，{project_id} 会被替换为测试项目ID
+ROUTES = [
+    ('index', '/'),
+    ('project_detail', '/project/{project_id}'),
+    ('stakeholder_management', '/project/{project_id}/stakeholders'),
+    ('api_stakeholders', '/api/stakeholders/{project_id}'),
+    ('requirement_collection', '/project/{project_id}/requirements'),
+    ('api_requirements', '/api/requirements/{project_id}'),
+    ('value_assessment', '/project/{project_id}/value-assessment'),
+    ('export_value_report', '/api/projects/{project_id}/value-report'),
+    ('requirement_analysis', '/project/{project_id}/requirement-analysis'),
+    ('roadmap_planning', '/project/{project_id}/roadmap'),
+    ('api_roadmap_data', '/api/roadmap/{project_id}'),
+    ('api_milestones', '/api/milestones/{project_id}'),
+    ('kano_analysis', '/project/{project_id}/kano'),
+    ('vsm_analysis', '/project/{project_id}/vsm'),
+    ('smart_goals', '/project/{project_id}/smart'),
+    ('wfmt_analysis', '/project/{project_id}/wfmt'),
+    ('api_wfmt_analysis', '/api/wfmt/{project_id}'),
+    ('kanban_view', '/project/{project_id}/kanban'),
+    ('comprehensive_analysis_api', '/api/comprehensive-analysis/{project_id}'),
+]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='需求分析系统路由基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='需求数量规模')
+    parser.add_argument('--rounds', type=int, default=5, help='每个路由的计时次数')
+    parser.add_argument('--warmup', type=int, default=1, help='计时前的预热次数')
+    parser.add_argument('--routes', nargs='+', help='只运行指定名称的路由')
+    parser.add_argument('--output', help='结果文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--regenerate', action='store_true', help='重新生成测试数据库')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='比较两个结果文件')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+def database_path(size):
+    return os.path.join(DATA_DIR, f'bench_{size}.db')
+
+
+def ensure_database(size, regenerate=False):
+    """生成指定规模的测试数据库（已存在时复用）"""
+    path = database_path(size)
+    if os.path.exists(path) and not regenerate:
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    print(f'生成 {size} 条需求的测试数据库...', flush=True)
+    subprocess.run([
+        sys.executable, os.path.join(PROJECT_ROOT, 'data_generator.py'),
+        '--database', f'sqlite:///{path}',
+        '--projects', '1',
+        '--requirements', str(size),
+        '--stakeholders', str(max(20, size // 500)),
+        '--milestones', str(max(12, size // 1000)),
+    ], cwd=PROJECT_ROOT, check=True)
+    return path
+
+
+def run_worker(size, args):
+    """在子进程中加载应用并计时，结果以JSON输出到stdout"""
+    os.environ['REQUIREMENTS_ANALYST_DATABASE_URI'] = f'sqlite:///{database_path(size)}'
+    sys.path.insert(0, PROJECT_ROOT)
+    os.chdir(PROJECT_ROOT)
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from app import app
+    from models import Project
+
+    with app.app_context():
+        project_id = Project.query.order_by(Project.id).first().id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'admin'
+        sess['username'] = 'admin'
+
+    results = {}
+    for name, template in ROUTES:
+        if args.routes and name not in args.routes:
+            continue
+        url = template.format(project_id=project_id)
+        for _ in range(args.warmup):
+            client.get(url)
+        timings = []
+        status = None
+        size_bytes = 0
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+            status = response.status_code
+            size_bytes = len(response.get_data())
+        results[name] = summarize(timings)
+        results[name].update({'url': url, 'status': status, 'response_bytes': size_bytes})
+    json.dump(results, sys.stdout)
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        'rounds': len(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': statistics.fmean(ordered),
+        'median': statistics.median(ordered),
+        'p95': ordered[p95_index],
+        'stddev': statistics.pstdev(ordered),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rounds': args.rounds,
+        'sizes': {}
+    }
+    for size in args.sizes:
+        ensure_database(size, args.regenerate)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', str(size),
+                   '--rounds', str(args.rounds), '--warmup', str(args.warmup)]
+        if args.routes:
+            command += ['--routes'] + args.routes
+        print(f'运行 {size} 条需求规模的基准测试...', flush=True)
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        report['sizes'][str(size)] = json.loads(completed.stdout)
+        print_table(size, report['sizes'][str(size)])
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f'{datetime.utcnow().strftime("%Y%m%d-%H%M%S")}-{commit}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'结果已写入 {output}')
+
+
+def print_table(size, results):
+    print(f'\n[{size} 条需求]')
+    print(f'{"路由":<30}{"中位数(ms)":>12}{"P95(ms)":>12}{"状态":>8}{"响应(KB)":>12}')
+    for name, r in results.items():
+        print(f'{name:<30}{r["median"] * 1000:>12.1f}{r["p95"] * 1000:>12.1f}'
+              f'{r["status"]:>8}{r["response_bytes"] / 1024:>12.1f}')
+
+
+def compare(baseline_path, current_path):
+    """逐路由比较两个结果文件的中位数耗时"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)
+
+    print(f'基准: {baseline["commit"]}  当前: {current["commit"]}')
+    for size, routes in current['sizes'].items():
+        base_routes = baseline['sizes'].get(size)
+        if not base_routes:
+            continue
+        print(f'\n[{size} 条需求]')
+        print(f'{"路由":<30}{"基准(ms)":>12}{"当前(ms)":>12}{"变化":>10}')
+        for name, r in routes.items():
+            if name not in base_routes:
+                continue
+            before = base_routes[name]['median'] * 1000
+            after = r['median'] * 1000
+            change = (after - before) / before * 100 if before else 0
+            print(f'{name:<30}{before:>12.1f}{after:>12.1f}{change:>+9.1f}%')
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        run_worker(args.worker, args)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
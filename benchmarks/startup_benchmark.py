@@ -0,0 +1,123 @@
+# benchmarks/startup_benchmark.py
+"""桌面端（xuQiu.py）冷启动基准测试
+
+每轮在新的Python进程中导入xuQiu、创建主窗口并处理完首次绘制，记录从进程启动到窗口
+可见的总耗时及各阶段耗时，然后依次切换到每个标签页，记录首次打开标签页的耗时。
+多轮取中位数，与启动预算比较，超出预算时返回非零退出码，可用于在提交之间检查启动回归。
+
+需要图形界面（Linux下可用 xvfb-run），例如:
+    python benchmarks/startup_benchmark.py --rounds 5 --budget-ms 1500
+    python benchmarks/startup_benchmark.py --data-dir D:/survey --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+
+# 从进程启动到主窗口完成首次绘制的默认预算
+DEFAULT_BUDGET_MS = 1500
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='桌面端冷启动基准测试')
+    parser.add_argument('--rounds', type=int, default=5, help='冷启动次数')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='窗口可见耗时预算（毫秒，按中位数判断）')
+    parser.add_argument('--data-dir', default=PROJECT_ROOT, help='xuQiu读取JSON数据文件的目录')
+    parser.add_argument('--no-tabs', action='store_true', help='不测量各标签页的首次打开耗时')
+    parser.add_argument('--json', help='把结果写入JSON文件')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    return parser
+
+
+def _elapsed_ms(since):
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def run_child(launched_at, measure_tabs):
+    """子进程：导入并启动应用，按阶段计时后以JSON输出到标准输出"""
+    sys.path.insert(0, PROJECT_ROOT)
+    started = time.perf_counter()
+    import tkinter as tk
+    import xuQiu
+    result = {'import_ms': _elapsed_ms(started)}
+
+    started = time.perf_counter()
+    root = tk.Tk()
+    app = xuQiu.StakeholderSurveyApp(root)
+    result['construct_ms'] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    root.update()
+    result['first_paint_ms'] = _elapsed_ms(started)
+    result['window_visible_ms'] = round((time.time() - launched_at) * 1000, 1)
+    result['heavy_modules_loaded'] = sorted(m for m in ('matplotlib', 'pandas') if m in sys.modules)
+
+    tabs = {}
+    if measure_tabs:
+        for tab_id in app.notebook.tabs()[1:]:
+            started = time.perf_counter()
+            app.notebook.select(tab_id)
+            root.update()
+            tabs[app.notebook.tab(tab_id, 'text')] = _elapsed_ms(started)
+    result['tabs_ms'] = tabs
+    root.destroy()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def run_round(args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', str(time.time())]
+    if args.no_tabs:
+        command.append('--no-tabs')
+    completed = subprocess.run(command, cwd=args.data_dir, capture_output=True, text=True, encoding='utf-8')
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip() or f'子进程退出码 {completed.returncode}')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(rounds):
+    def median(key):
+        return round(statistics.median(r[key] for r in rounds), 1)
+
+    summary = {key: median(key) for key in ('import_ms', 'construct_ms', 'first_paint_ms', 'window_visible_ms')}
+    tab_names = rounds[0]['tabs_ms'].keys()
+    summary['tabs_ms'] = {name: round(statistics.median(r['tabs_ms'][name] for r in rounds), 1) for name in tab_names}
+    summary['heavy_modules_loaded'] = rounds[0]['heavy_modules_loaded']
+    return summary
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child is not None:
+        run_child(args.child, not args.no_tabs)
+        return 0
+
+    rounds = []
+    for i in range(args.rounds):
+        rounds.append(run_round(args))
+        print(f"第 {i + 1} 轮: 窗口可见 {rounds[-1]['window_visible_ms']} ms")
+    summary = summarize(rounds)
+
+    print(f"\n导入 {summary['import_ms']} ms，创建窗口 {summary['construct_ms']} ms，"
+          f"首次绘制 {summary['first_paint_ms']} ms，窗口可见 {summary['window_visible_ms']} ms（中位数）")
+    for name, ms in summary['tabs_ms'].items():
+        print(f"  首次打开 {name}: {ms} ms")
+    if summary['heavy_modules_loaded']:
+        print(f"警告: 启动时已加载 {', '.join(summary['heavy_modules_loaded'])}")
+
+    passed = summary['window_visible_ms'] <= args.budget_ms
+    print(f"预算 {args.budget_ms} ms: {'通过' if passed else '超出'}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'budget_ms': args.budget_ms, 'passed': passed, 'summary': summary, 'rounds': rounds},
+                      f, ensure_ascii=False, indent=2)
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
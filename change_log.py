@@ -0,0 +1,271 @@
+# change_log.py
+"""项目变更记录
+
+需求、干系人和里程碑的新增、修改、删除由ORM事件写入change_log表（每条记录变化一行，
+删除也保留一行作为删除标记），客户端用上次拿到的记录id作为游标，只取之后的变化，
+不必重新拉取整个列表。ORM批量写入（db.update/db.delete/db.insert及Query.delete）在执行
+前后查出受影响的记录，同样写入变更记录。
+
+SQLite只允许一个写事务，change_log的自增id按提交顺序分配，游标之前的记录不会在之后
+才出现。超过保留期（[CHANGES] retention_days）的记录被定期清理，游标早于已清理的记录时
+返回reset，客户端需重新加载完整列表。
+
+写入的变更同时暂存在会话中，事务提交后作为事件发布给该项目的SSE订阅者（event_stream），
+回滚时丢弃。
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+
+import event_stream
+from database import db
+from models import Stakeholder, Requirement, Milestone, ChangeLog
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+DEFAULT_RETENTION_DAYS = 30
+# 清理过期记录的最小间隔（秒）
+PRUNE_INTERVAL = 3600
+
+# 记录变更的模型：实体名及返回给客户端的集合名
+TRACKED_MODELS = {
+    Requirement: ('requirement', 'requirements'),
+    Stakeholder: ('stakeholder', 'stakeholders'),
+    Milestone: ('milestone', 'milestones'),
+}
+ENTITY_MODELS = {entity: model for model, (entity, _) in TRACKED_MODELS.items()}
+
+retention_days = DEFAULT_RETENTION_DAYS
+_last_prune = 0.0
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def requirement_payload(r):
+    """与需求列表接口的字段一致，另加所属里程碑"""
+    return {
+        'id': r.id,
+        'title': r.title,
+        'description': r.description,
+        'priority': r.priority,
+        'status': r.status,
+        'category': r.category,
+        'requirement_type': r.requirement_type,
+        'source': r.source,
+        'estimated_roi': float(r.estimated_roi) if r.estimated_roi else 0,
+        'actual_roi': float(r.actual_roi) if r.actual_roi else 0,
+        'kano_category': r.kano_category,
+        'assigned_milestone_id': r.assigned_milestone_id,
+        'version': r.version,
+        'created_at': _isoformat(r.created_at),
+        'updated_at': _isoformat(r.updated_at),
+    }
+
+
+def stakeholder_payload(s):
+    return {
+        'id': s.id,
+        'name': s.name,
+        'role': s.role,
+        'influence': s.influence,
+        'interest': s.interest,
+        'requirements': s.requirements,
+        'contact_info': s.contact_info,
+        'notes': s.notes,
+        'updated_at': _isoformat(s.updated_at),
+    }
+
+
+def milestone_payload(m):
+    return {
+        'id': m.id,
+        'title': m.title,
+        'description': m.description,
+        'deadline': m.deadline.strftime('%Y-%m-%d') if m.deadline else None,
+        'requirements': m.requirements,
+        'status': m.status,
+        'updated_at': _isoformat(m.updated_at),
+    }
+
+
+PAYLOADS = {'requirement': requirement_payload, 'stakeholder': stakeholder_payload, 'milestone': milestone_payload}
+
+
+def configure(config):
+    """按config.ini的[CHANGES]配置设置变更记录保留天数（0表示不清理）"""
+    global retention_days
+    retention_days = config.getint('CHANGES', 'retention_days', fallback=DEFAULT_RETENTION_DAYS)
+
+
+def _write(session, connection, rows):
+    if rows:
+        now = datetime.utcnow()
+        connection.execute(ChangeLog.__table__.insert(), [dict(row, changed_at=now) for row in rows])
+        pending = session.info.setdefault('change_events', {})
+        for row in rows:
+            pending.setdefault(row['project_id'], []).append(
+                {'entity': row['entity'], 'id': row['entity_id'], 'action': row['action']})
+
+
+def _entry(project_id, entity, entity_id, action):
+    return {'project_id': project_id, 'entity': entity, 'entity_id': entity_id, 'action': action}
+
+
+def _record_flush(session, flush_context):
+    """记录本次flush中各实体的新增、修改和删除"""
+    rows = []
+    for obj in session.new:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked and obj.project_id is not None:
+            rows.append(_entry(obj.project_id, tracked[0], obj.id, 'insert'))
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            history = inspect(obj).attrs.project_id.history
+            project_id = history.deleted[0] if history.deleted else obj.project_id
+            rows.append(_entry(project_id, tracked[0], obj.id, 'delete'))
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if not tracked or not session.is_modified(obj, include_collections=False):
+            continue
+        history = inspect(obj).attrs.project_id.history
+        if history.deleted and history.deleted[0] != obj.project_id:
+            # 移到其他项目：原项目中视为删除，新项目中视为新增
+            rows.append(_entry(history.deleted[0], tracked[0], obj.id, 'delete'))
+            rows.append(_entry(obj.project_id, tracked[0], obj.id, 'insert'))
+        else:
+            rows.append(_entry(obj.project_id, tracked[0], obj.id, 'update'))
+    _write(session, session.connection(), rows)
+
+
+def _record_bulk(orm_execute_state):
+    """ORM批量写入：执行前查出受影响的记录（新增则执行后按id查出），执行后写入变更记录"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_insert or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    tracked = TRACKED_MODELS.get(mapper.class_) if mapper is not None else None
+    # 其他表的语句在条件中引用需求等实体时bind_mapper同样指向该实体，按目标表区分
+    if tracked is None or orm_execute_state.statement.table.name != mapper.class_.__tablename__:
+        return None
+
+    session = orm_execute_state.session
+    connection = session.connection()
+    table = mapper.class_.__table__
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+    entity = tracked[0]
+
+    if orm_execute_state.is_insert:
+        last_id = connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0
+        result = orm_execute_state.invoke_statement()
+        affected = connection.execute(db.select(table.c.id, table.c.project_id).where(table.c.id > last_id)).all()
+        _write(session, connection, [_entry(project_id, entity, record_id, 'insert') for record_id, project_id in affected])
+        return result
+
+    if orm_execute_state.is_update and rows and all('id' in row for row in rows):
+        # 按主键的批量更新
+        ids = [row['id'] for row in rows]
+        affected = []
+        for start in range(0, len(ids), 500):
+            affected.extend(connection.execute(db.select(table.c.id, table.c.project_id).where(
+                table.c.id.in_(ids[start:start + 500]))).all())
+    else:
+        query = db.select(table.c.id, table.c.project_id)
+        whereclause = orm_execute_state.statement.whereclause
+        if whereclause is not None:
+            query = query.where(whereclause)
+        affected = connection.execute(query).all()
+    result = orm_execute_state.invoke_statement()
+    action = 'delete' if orm_execute_state.is_delete else 'update'
+    _write(session, connection, [_entry(project_id, entity, record_id, action) for record_id, project_id in affected])
+    return result
+
+
+def _publish_events(session):
+    """事务提交后向各项目的订阅者发布本事务中的变更"""
+    for project_id, events in session.info.pop('change_events', {}).items():
+        event_stream.broker.publish(project_id, events)
+
+
+def _discard_events(session):
+    session.info.pop('change_events', None)
+
+
+def latest_cursor():
+    return db.session.query(db.func.max(ChangeLog.id)).scalar() or 0
+
+
+def prune(now=None):
+    """删除超过保留期的变更记录（始终保留最新的一条，以便判断游标是否早于已清理的记录）"""
+    global _last_prune
+    if retention_days <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    latest = latest_cursor()
+    deleted = ChangeLog.query.filter(ChangeLog.changed_at < now - timedelta(days=retention_days),
+                                     ChangeLog.id < latest).delete(synchronize_session=False)
+    db.session.commit()
+    _last_prune = time.time()
+    return deleted
+
+
+def prune_if_due():
+    if retention_days > 0 and time.time() - _last_prune >= PRUNE_INTERVAL:
+        prune()
+
+
+def cursor_expired(since):
+    """游标是否早于已清理的变更记录（之间的变化已无法读取）"""
+    oldest = db.session.query(db.func.min(ChangeLog.id)).scalar()
+    return oldest is not None and since < oldest - 1
+
+
+def empty_changes():
+    return {collection: {'upserted': [], 'deleted': []} for _, collection in TRACKED_MODELS.values()}
+
+
+def changes_since(project_id, since, limit=DEFAULT_LIMIT):
+    """返回游标之后项目内各实体的变化
+
+    同一实体的多次变化合并为一次：最后一次为删除（或实体已不存在）时列入deleted，
+    否则列入upserted并返回当前数据。返回 {"cursor", "has_more", "reset", 集合名: {"upserted", "deleted"}}。
+    """
+    changes = empty_changes()
+    if cursor_expired(since):
+        return dict(changes, cursor=latest_cursor(), has_more=False, reset=True)
+
+    entries = ChangeLog.query.filter(ChangeLog.project_id == project_id, ChangeLog.id > since) \
+        .order_by(ChangeLog.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    final = {}
+    for entry in entries:
+        final[(entry.entity, entry.entity_id)] = entry.action
+    for entity, model in ENTITY_MODELS.items():
+        collection = TRACKED_MODELS[model][1]
+        ids = [entity_id for (name, entity_id), action in final.items() if name == entity and action != 'delete']
+        records = {}
+        for start in range(0, len(ids), 500):
+            records.update((record.id, record) for record in model.query.filter(
+                model.project_id == project_id, model.id.in_(ids[start:start + 500])).all())
+        for (name, entity_id), action in final.items():
+            if name != entity:
+                continue
+            if entity_id in records:
+                changes[collection]['upserted'].append(PAYLOADS[entity](records[entity_id]))
+            else:
+                changes[collection]['deleted'].append(entity_id)
+    return dict(changes, cursor=entries[-1].id if entries else since, has_more=has_more, reset=False)
+
+
+def init_change_log(config):
+    """注册记录变更的ORM事件"""
+    configure(config)
+    event.listen(db.session, 'after_flush', _record_flush)
+    event.listen(db.session, 'do_orm_execute', _record_bulk)
+    event.listen(db.session, 'after_commit', _publish_events)
+    event.listen(db.session, 'after_rollback', _discard_events)
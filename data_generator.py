@@ -0,0 +1,266 @@
+# data_generator.py
+"""生成用于性能测试的模拟数据
+
+用法:
+    python data_generator.py --database sqlite:////tmp/bench.db --projects 3 --requirements 10000
+
+每个项目会生成干系人、里程碑和需求，需求的九要素、价值评估、KANO、VSM、
+SMART和WFMT字段都会填充接近真实的中文内容。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+SCENARIOS = ['车间巡检', '订单排产', '来料检验', '设备点检', '工艺变更', '质量追溯', '仓库盘点',
+             '客户投诉处理', '供应商评审', '生产日报', '能耗统计', '模具管理', '换线准备', '首件确认']
+SUBJECTS = ['班组长', '工艺工程师', '质检员', '仓管员', '计划员', '设备维修员', '车间主任', '采购专员']
+PAIN_POINTS = ['需要手工录入多张纸质表单', '数据分散在多个Excel文件中', '审批流程依赖线下签字',
+               '无法实时查看设备状态', '问题反馈周期过长', '统计口径不一致', '重复填写相同信息',
+               '历史记录难以检索', '交接班信息容易遗漏']
+GOALS = ['录入时间缩短50%', '数据准确率提升到99%', '审批周期缩短到1天以内', '异常响应时间缩短到30分钟',
+         '实现数据自动汇总', '减少重复录入工作', '支持移动端实时查询']
+SOLUTIONS = ['开发移动端采集页面', '对接MES系统接口', '建立统一的数据看板', '增加自动提醒功能',
+             '实现电子化审批流程', '提供扫码录入功能', '自动生成统计报表']
+VALUES = ['降低人工成本', '提升交付准时率', '减少质量事故', '提高管理透明度', '缩短生产周期']
+SOURCES = ['生产技术部', '质量部', '设备部', '计划部', '仓储物流部', '信息中心']
+CATEGORIES = ['business', 'functional', 'non_functional', 'technical', 'user']
+REQUIREMENT_TYPES = ['functional', 'non_functional', 'business', 'user']
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+STATUSES = ['collected', 'analyzing', 'confirmed', 'rejected', 'completed']
+KANO_CATEGORIES = ['must_be', 'one_dimensional', 'attractive', 'indifferent', 'reverse']
+KANO_ANSWERS = ['like', 'must-be', 'neutral', 'live-with', 'dislike']
+VSM_STEPS = ['需求收集', '需求评审', '方案设计', '开发实现', '测试验证', '上线部署', '培训推广']
+# 常用MTM-1动作代码，与wfmt_engine中的TMU表对应
+MOTION_CODES = ['R10A', 'R20B', 'R30C', 'G1A', 'G1B', 'G4A', 'M10A', 'M20B', 'M30C',
+                'P1SE', 'P2SS', 'RL1', 'AP1', 'T45S', 'EF', 'ET']
+ROLES = ['项目经理', '业务分析师', '系统架构师', '车间主任', '质量经理', '一线操作员', '采购经理']
+SURNAMES = ['张', '李', '王', '刘', '陈', '杨', '赵', '黄', '周', '吴']
+ASSESSORS = ['张经理', '李工程师', '王业务', '刘主管', '陈分析师']
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='生成需求分析系统的性能测试数据')
+    parser.add_argument('--database', default=os.environ.get('REQUIREMENTS_ANALYST_DATABASE_URI'),
+                        help='SQLAlchemy数据库URI，默认使用应用配置的数据库')
+    parser.add_argument('--projects', type=int, default=3, help='项目数量')
+    parser.add_argument('--requirements', type=int, default=1000, help='每个项目的需求数量')
+    parser.add_argument('--stakeholders', type=int, default=20, help='每个项目的干系人数量')
+    parser.add_argument('--milestones', type=int, default=12, help='每个项目的里程碑数量')
+    parser.add_argument('--dependency-rate', type=float, default=0.2, help='带依赖关系的需求比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--batch-size', type=int, default=5000, help='批量插入的行数')
+    return parser
+
+
+def make_requirement(rng, project_id, req_id, now, milestone_ids):
+    scenario = rng.choice(SCENARIOS)
+    subject = rng.choice(SUBJECTS)
+    business = rng.randint(1, 10)
+    user = rng.randint(1, 10)
+    technical = rng.randint(1, 10)
+    effort = rng.randint(1, 10)
+    created_at = now - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+
+    row = {
+        'id': req_id,
+        'project_id': project_id,
+        'title': f'{scenario}{rng.choice(SOLUTIONS)}（{req_id}）',
+        'requirement_type': rng.choice(REQUIREMENT_TYPES),
+        'scenario': f'{subject}在{scenario}时{rng.choice(PAIN_POINTS)}',
+        'problem': rng.choice(PAIN_POINTS),
+        'current_solution': f'目前通过纸质表单和Excel完成{scenario}',
+        'goal': rng.choice(GOALS),
+        'expected_solution': rng.choice(SOLUTIONS),
+        'value': rng.choice(VALUES),
+        'priority_level': rng.choice(PRIORITIES),
+        'other_info': '',
+        'source': rng.choice(SOURCES),
+        'category': rng.choice(CATEGORIES),
+        'priority': rng.choice(PRIORITIES),
+        'status': rng.choice(STATUSES),
+        'acceptance_criteria': f'{rng.choice(GOALS)}，并通过{subject}验收',
+        'created_at': created_at,
+        'updated_at': created_at,
+        'estimated_business_value': business,
+        'estimated_user_value': user,
+        'estimated_technical_value': technical,
+        'estimated_effort': effort,
+        'estimated_roi': (business + user + technical) / effort,
+        'value_assessor': rng.choice(ASSESSORS),
+        'value_assessment_date': created_at,
+        'assigned_milestone_id': rng.choice(milestone_ids) if milestone_ids and rng.random() < 0.6 else None,
+        'target_user_group': subject,
+    }
+
+    # 部分需求已有实际价值评估
+    if rng.random() < 0.4:
+        a_business = max(1, min(10, business + rng.randint(-2, 2)))
+        a_user = max(1, min(10, user + rng.randint(-2, 2)))
+        a_technical = max(1, min(10, technical + rng.randint(-2, 2)))
+        a_effort = max(1, min(10, effort + rng.randint(-2, 3)))
+        row.update({
+            'actual_business_value': a_business,
+            'actual_user_value': a_user,
+            'actual_technical_value': a_technical,
+            'actual_effort': a_effort,
+            'actual_roi': (a_business + a_user + a_technical) / a_effort,
+            'actual_value_assessor': rng.choice(ASSESSORS),
+            'actual_value_assessment_date': created_at + timedelta(days=rng.randint(10, 120)),
+        })
+
+    # KANO调查数据：每个受访者的[正向答案, 反向答案]
+    survey = [[rng.choice(KANO_ANSWERS), rng.choice(KANO_ANSWERS)] for _ in range(rng.randint(5, 30))]
+    row.update({
+        'kano_category': rng.choice(KANO_CATEGORIES),
+        'kano_positive_answer': survey[0][0],
+        'kano_negative_answer': survey[0][1],
+        'kano_survey_data': json.dumps(survey, ensure_ascii=False),
+        'kano_priority_score': round(rng.uniform(1, 10), 1),
+        'kano_positive_question': f'如果系统提供{row["expected_solution"]}，您感觉如何？',
+        'kano_negative_question': f'如果系统不提供{row["expected_solution"]}，您感觉如何？',
+        'kano_survey_completed': True,
+    })
+
+    # VSM流程步骤
+    steps = []
+    for name in rng.sample(VSM_STEPS, rng.randint(3, len(VSM_STEPS))):
+        steps.append({
+            'name': name,
+            'process_time': round(rng.uniform(0.5, 16), 1),
+            'wait_time': round(rng.uniform(0, 72), 1),
+            'inventory': rng.randint(0, 20),
+            'operators': rng.randint(1, 5),
+        })
+    process_time = sum(s['process_time'] for s in steps)
+    lead_time = process_time + sum(s['wait_time'] for s in steps)
+    row.update({
+        'vsm_process_steps': '->'.join(s['name'] for s in steps),
+        'vsm_process_steps_json': json.dumps(steps, ensure_ascii=False),
+        'cycle_time': round(max(s['process_time'] / s['operators'] for s in steps), 1),
+        'lead_time': round(lead_time, 1),
+        'process_efficiency': round(process_time / lead_time * 100, 2),
+        'vsm_analyzed': True,
+    })
+
+    # SMART目标
+    row.update({
+        'smart_specific': f'在{scenario}中{row["expected_solution"]}',
+        'smart_measurable': row['goal'],
+        'smart_achievable': rng.random() < 0.85,
+        'smart_relevant': row['value'],
+        'smart_timebound': (now + timedelta(days=rng.randint(30, 365))).date(),
+        'smart_target_level': rng.choice(['basic', 'challenge', 'ideal']),
+        'smart_goal_set': True,
+    })
+
+    # WFMT动作序列
+    sequence = [rng.choice(MOTION_CODES) for _ in range(rng.randint(5, 25))]
+    tmu_total = len(sequence) * rng.uniform(8, 20)
+    allowance = rng.choice([10.0, 12.0, 15.0, 20.0])
+    standard_time = tmu_total * 0.036 * (1 + allowance / 100)
+    row.update({
+        'wfmt_action_sequence': json.dumps(sequence),
+        'wfmt_tmu_total': round(tmu_total, 1),
+        'wfmt_allowance_rate': allowance,
+        'standard_time': round(standard_time, 2),
+        'improvement_potential': round(rng.uniform(5, 40), 1),
+        'wfmt_analyzed': True,
+    })
+    return row
+
+
+def add_dependencies(rng, rows, rate):
+    """为部分需求生成依赖关系文本（只依赖编号更小的需求，避免产生环），返回对应的依赖边"""
+    edges = []
+    for i, row in enumerate(rows):
+        if i == 0 or rng.random() >= rate:
+            continue
+        targets = sorted({rows[rng.randrange(0, i)]['id'] for _ in range(rng.randint(1, 3))})
+        row['dependencies'] = '依赖需求 ' + '、'.join(f'#{t}' for t in targets)
+        edges.extend({'project_id': row['project_id'], 'requirement_id': row['id'], 'depends_on_id': t}
+                     for t in targets)
+    return edges
+
+
+def generate(db, args):
+    """按参数生成数据，返回生成的项目ID列表"""
+    from models import Project, Stakeholder, Requirement, Milestone, RequirementDependency
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    project_ids = []
+    next_req_id = (db.session.query(db.func.max(Requirement.id)).scalar() or 0) + 1
+
+    for p in range(args.projects):
+        project = Project(name=f'性能测试项目{p + 1}', description=f'自动生成的测试数据，包含{args.requirements}条需求')
+        db.session.add(project)
+        db.session.flush()
+        project_ids.append(project.id)
+
+        db.session.execute(db.insert(Stakeholder), [{
+            'project_id': project.id,
+            'name': f'{rng.choice(SURNAMES)}{rng.choice(ROLES)}{i + 1}',
+            'role': rng.choice(ROLES),
+            'influence': rng.randint(1, 5),
+            'interest': rng.randint(1, 5),
+            'requirements': rng.choice(SCENARIOS),
+            'contact_info': f'user{i + 1}@company.com',
+            'notes': '',
+        } for i in range(args.stakeholders)])
+
+        milestones = [Milestone(
+            project_id=project.id,
+            title=f'第{i + 1}期：{rng.choice(SCENARIOS)}上线',
+            description='自动生成的里程碑',
+            deadline=(now + timedelta(days=30 * (i + 1))).date(),
+            status=rng.choice(['planned', 'in_progress', 'completed', 'delayed']),
+        ) for i in range(args.milestones)]
+        db.session.add_all(milestones)
+        db.session.flush()
+        milestone_ids = [m.id for m in milestones]
+
+        rows = [make_requirement(rng, project.id, next_req_id + i, now, milestone_ids)
+                for i in range(args.requirements)]
+        next_req_id += args.requirements
+        edges = add_dependencies(rng, rows, args.dependency_rate)
+
+        for start in range(0, len(rows), args.batch_size):
+            db.session.execute(db.insert(Requirement), rows[start:start + args.batch_size])
+        for start in range(0, len(edges), args.batch_size):
+            db.session.execute(db.insert(RequirementDependency), edges[start:start + args.batch_size])
+
+        # 里程碑的需求ID列表与assigned_milestone_id保持一致
+        assigned = {}
+        for row in rows:
+            if row['assigned_milestone_id']:
+                assigned.setdefault(row['assigned_milestone_id'], []).append(row['id'])
+        for milestone in milestones:
+            milestone.requirements = ','.join(map(str, assigned.get(milestone.id, [])))
+
+        db.session.commit()
+    return project_ids
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.database:
+        os.environ['REQUIREMENTS_ANALYST_DATABASE_URI'] = args.database
+
+    from app import app
+    from database import db
+
+    started = time.perf_counter()
+    with app.app_context():
+        project_ids = generate(db, args)
+    elapsed = time.perf_counter() - started
+    print(f'已生成 {len(project_ids)} 个项目，每个项目 {args.requirements} 条需求，用时 {elapsed:.1f} 秒')
+    print(f'项目ID: {", ".join(map(str, project_ids))}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,38 @@
 # database.py
+import os
+
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# 轻量级迁移：create_all 不会修改已存在的表，后续新增的列在COLUMN_MIGRATIONS中补齐（表名, 列名, 列定义），
+# 新增的索引、触发器在MIGRATIONS中补齐（语句需可重复执行）
+COLUMN_MIGRATIONS = [
+    ('requirements', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+]
+
+MIGRATIONS = [
+    'CREATE INDEX IF NOT EXISTS ix_requirements_project_updated ON requirements (project_id, updated_at)',
+    # 需求行版本号：任何方式修改需求而未同时修改version时加1（ORM修改、批量语句都会触发），供If-Match检查
+    'CREATE TRIGGER IF NOT EXISTS requirements_version AFTER UPDATE ON requirements '
+    'WHEN new.version = old.version BEGIN '
+    'UPDATE requirements SET version = old.version + 1 WHERE id = new.id; END',
+]
+
+def migrate():
+    """为已有数据库补齐COLUMN_MIGRATIONS中的列，并执行MIGRATIONS中的语句"""
+    with db.engine.begin() as connection:
+        for table, column, definition in COLUMN_MIGRATIONS:
+            existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+            if column not in existing:
+                connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        for statement in MIGRATIONS:
+            connection.exec_driver_sql(statement)
+
 def init_db(app):
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///requirements_analyst.db'
+    # 可通过环境变量指定数据库（测试、基准测试时使用独立的数据库文件）
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('REQUIREMENTS_ANALYST_DATABASE_URI',
+                                                           'sqlite:///requirements_analyst.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
        
@@ -13,5 +41,6 @@ def init_db(app):
     
     with app.app_context():
         db.create_all()
+        migrate()
     
     return db
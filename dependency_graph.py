@@ -0,0 +1,322 @@
+# dependency_graph.py
+import logging
+import re
+from datetime import date
+
+import numpy as np
+from sqlalchemy import event, inspect
+
+from data_version import VersionedCache, project_data_version
+from database import db
+from models import Requirement, RequirementDependency, Milestone
+
+logger = logging.getLogger(__name__)
+
+DONE_STATUSES = ('completed', 'implemented', 'validated')
+
+_DEPENDENCY_ID = re.compile(r'#(\d+)')
+
+_graph_cache = VersionedCache()
+
+
+def parse_dependency_ids(text):
+    """从dependencies文本（如“依赖需求 #12、#15”）中提取需求ID"""
+    if not text:
+        return []
+    return [int(i) for i in _DEPENDENCY_ID.findall(text)]
+
+
+def _expand(ptr, nodes):
+    """返回CSR结构中一组节点的全部边下标及每条边所属的节点"""
+    starts = ptr[nodes]
+    lengths = ptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total), np.repeat(nodes, lengths)
+
+
+def _csr(src, dst, n):
+    order = np.argsort(src, kind='stable')
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=ptr[1:])
+    return ptr, dst[order]
+
+
+class ProjectGraph:
+    """项目需求依赖图
+
+    节点为需求，边从被依赖的需求指向依赖方；邻接表以CSR数组保存。构建时按层
+    （Kahn算法，每层一次数组运算）完成拓扑排序，同时计算以工作量为权重的最早完成点，
+    并从里程碑截止日期反推最晚完成点和松弛量。
+    """
+
+    def __init__(self, nodes, edges, deadlines, days_per_point=1.0, today=None):
+        self.ids = np.asarray([node['id'] for node in nodes], dtype=np.int64)
+        self.titles = [node['title'] for node in nodes]
+        self.index = {int(req_id): i for i, req_id in enumerate(self.ids)}
+        self.days_per_point = days_per_point
+        self.today = today or date.today()
+        n = len(nodes)
+        self.effort = np.asarray([0 if node['status'] in DONE_STATUSES else max(node['effort'] or 0, 0)
+                                  for node in nodes], dtype=float)
+
+        pairs = [(self.index[a], self.index[b]) for a, b in edges if a in self.index and b in self.index and a != b]
+        src = np.asarray([p[0] for p in pairs], dtype=np.int64)
+        dst = np.asarray([p[1] for p in pairs], dtype=np.int64)
+        self.edge_count = len(pairs)
+        self.succ_ptr, self.succ = _csr(src, dst, n)
+        self.pred_ptr, self.pred = _csr(dst, src, n)
+
+        # 截止日期换算为距今天的工作量点数
+        self.deadline = np.full(n, np.inf)
+        self.deadline_dates = [None] * n
+        for i, node in enumerate(nodes):
+            deadline = deadlines.get(node['milestone_id'])
+            if deadline is not None and node['status'] not in DONE_STATUSES:
+                self.deadline[i] = (deadline - self.today).days / days_per_point
+                self.deadline_dates[i] = deadline
+
+        self._analyze()
+
+    def _analyze(self):
+        n = len(self.ids)
+        indegree = np.bincount(self.succ, minlength=n) if self.edge_count else np.zeros(n, dtype=np.int64)
+        start = np.zeros(n)
+        self.level = np.full(n, -1, dtype=np.int64)
+        levels = []
+        frontier = np.flatnonzero(indegree == 0)
+        while frontier.size:
+            self.level[frontier] = len(levels)
+            levels.append(frontier)
+            # 本层节点的开始点已确定，推进到后继节点
+            edges, sources = _expand(self.succ_ptr, frontier)
+            targets = self.succ[edges]
+            np.maximum.at(start, targets, start[sources] + self.effort[sources])
+            decrement = np.bincount(targets, minlength=n)
+            indegree -= decrement
+            frontier = np.flatnonzero((decrement > 0) & (indegree == 0))
+
+        self.levels = levels
+        self.order = np.concatenate(levels) if levels else np.empty(0, dtype=np.int64)
+        self.earliest_finish = start + self.effort
+        unordered = np.flatnonzero(self.level < 0)
+        self.earliest_finish[unordered] = np.nan
+        self.cycles = self._find_cycles(unordered)
+        in_cycle = {i for cycle in self.cycles for i in cycle}
+        self.blocked = [i for i in unordered.tolist() if i not in in_cycle]
+
+        # 反向逐层计算最晚完成点：不晚于自身截止日期，也不晚于后继的最晚开始点
+        latest = self.deadline.copy()
+        for frontier in reversed(levels):
+            edges, sources = _expand(self.succ_ptr, frontier)
+            if edges.size:
+                targets = self.succ[edges]
+                np.minimum.at(latest, sources, latest[targets] - self.effort[targets])
+        self.latest_finish = latest
+        self.slack = latest - self.earliest_finish
+
+    def _find_cycles(self, candidates):
+        """在拓扑排序剩余的节点中用Tarjan算法找出强连通分量（即依赖环）"""
+        remaining = set(candidates.tolist())
+        if not remaining:
+            return []
+        index, low, on_stack, stack, cycles = {}, {}, set(), [], []
+        counter = 0
+        for root in sorted(remaining):
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, pos = work.pop()
+                if pos == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                successors = [int(s) for s in self.succ[self.succ_ptr[node]:self.succ_ptr[node + 1]] if s in remaining]
+                if pos < len(successors):
+                    work.append((node, pos + 1))
+                    nxt = successors[pos]
+                    if nxt not in index:
+                        work.append((nxt, 0))
+                    elif nxt in on_stack:
+                        low[node] = min(low[node], index[nxt])
+                    continue
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component))
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return cycles
+
+    def critical_path(self):
+        """工作量累计最长的依赖链"""
+        if not self.order.size:
+            return []
+        ordered_finish = np.where(np.isnan(self.earliest_finish), -np.inf, self.earliest_finish)
+        node = int(np.argmax(ordered_finish))
+        path = [node]
+        while True:
+            start = self.earliest_finish[node] - self.effort[node]
+            preds = self.pred[self.pred_ptr[node]:self.pred_ptr[node + 1]]
+            matches = [int(p) for p in preds if np.isclose(self.earliest_finish[p], start)]
+            if not matches:
+                break
+            node = matches[0]
+            path.append(node)
+        return path[::-1]
+
+    def related(self, req_id, downstream=True):
+        """返回某个需求的全部下游（依赖它的）或上游（它依赖的）需求ID"""
+        ptr, adjacency = (self.succ_ptr, self.succ) if downstream else (self.pred_ptr, self.pred)
+        seen = np.zeros(len(self.ids), dtype=bool)
+        frontier = np.asarray([self.index[req_id]], dtype=np.int64)
+        seen[frontier] = True
+        while frontier.size:
+            edges, _ = _expand(ptr, frontier)
+            targets = np.unique(adjacency[edges])
+            frontier = targets[~seen[targets]]
+            seen[frontier] = True
+        seen[self.index[req_id]] = False
+        return self.ids[seen].tolist()
+
+    def node_info(self, i):
+        finish = self.earliest_finish[i]
+        slack = self.slack[i]
+        return {
+            'id': int(self.ids[i]),
+            'title': self.titles[i],
+            'effort': float(self.effort[i]),
+            'level': int(self.level[i]),
+            'earliest_finish': None if np.isnan(finish) else round(float(finish), 2),
+            'deadline': self.deadline_dates[i].strftime('%Y-%m-%d') if self.deadline_dates[i] else None,
+            'slack': None if not np.isfinite(slack) else round(float(slack), 2),
+        }
+
+    def summary(self):
+        path = self.critical_path()
+        at_risk = np.flatnonzero(np.isfinite(self.slack) & (self.slack < 0))
+        return {
+            'requirements': len(self.ids),
+            'edge_count': self.edge_count,
+            'levels': len(self.levels),
+            'days_per_point': self.days_per_point,
+            'topological_order': self.ids[self.order].tolist(),
+            'cycles': [self.ids[cycle].tolist() for cycle in self.cycles],
+            'blocked_by_cycle': self.ids[self.blocked].tolist() if self.blocked else [],
+            'critical_path': {
+                'requirements': [self.node_info(i) for i in path],
+                'total_effort': float(self.effort[path].sum()) if path else 0.0,
+            },
+            'at_risk': [self.node_info(i) for i in at_risk[np.argsort(self.slack[at_risk])]],
+            'edges': [[int(self.ids[s]), int(self.ids[d])]
+                      for s in range(len(self.ids))
+                      for d in self.succ[self.succ_ptr[s]:self.succ_ptr[s + 1]]],
+        }
+
+
+def build_project_graph(project_id, days_per_point=1.0):
+    """从数据库读取节点、依赖边和里程碑截止日期并构建依赖图"""
+    nodes = [{
+        'id': row.id, 'title': row.title, 'status': row.status,
+        'effort': row.estimated_effort, 'milestone_id': row.assigned_milestone_id,
+    } for row in Requirement.query.with_entities(
+        Requirement.id, Requirement.title, Requirement.status,
+        Requirement.estimated_effort, Requirement.assigned_milestone_id
+    ).filter(Requirement.project_id == project_id).order_by(Requirement.id)]
+    edges = RequirementDependency.query.with_entities(
+        RequirementDependency.depends_on_id, RequirementDependency.requirement_id
+    ).filter(RequirementDependency.project_id == project_id).all()
+    deadlines = dict(Milestone.query.with_entities(Milestone.id, Milestone.deadline).filter(
+        Milestone.project_id == project_id).all())
+    return ProjectGraph(nodes, [tuple(edge) for edge in edges], deadlines, days_per_point)
+
+
+def get_project_graph(project_id, days_per_point=1.0):
+    """返回项目依赖图，数据版本不变时复用缓存"""
+    version = (project_data_version(project_id), date.today())
+    return _graph_cache.get_or_build((project_id, days_per_point), version,
+                                     lambda: build_project_graph(project_id, days_per_point))
+
+
+def prerequisites(project_id):
+    """返回 {需求ID: [依赖的需求ID]}"""
+    result = {}
+    for requirement_id, depends_on_id in RequirementDependency.query.with_entities(
+            RequirementDependency.requirement_id, RequirementDependency.depends_on_id).filter(
+            RequirementDependency.project_id == project_id):
+        result.setdefault(requirement_id, []).append(depends_on_id)
+    return result
+
+
+def _edge_rows(connection, project_id, requirement_id, text):
+    targets = {i for i in parse_dependency_ids(text) if i != requirement_id}
+    if not targets:
+        return []
+    table = Requirement.__table__
+    valid = connection.execute(db.select(table.c.id).where(
+        table.c.project_id == project_id, table.c.id.in_(targets))).scalars().all()
+    return [{'project_id': project_id, 'requirement_id': requirement_id, 'depends_on_id': target}
+            for target in sorted(valid)]
+
+
+def rebuild_project_edges(project_id):
+    """按dependencies文本重新生成项目的全部依赖边"""
+    table = RequirementDependency.__table__
+    rows = Requirement.query.with_entities(Requirement.id, Requirement.dependencies).filter(
+        Requirement.project_id == project_id, Requirement.dependencies.isnot(None)).all()
+    existing = {row.id for row in Requirement.query.with_entities(Requirement.id).filter(
+        Requirement.project_id == project_id)}
+    edges = [{'project_id': project_id, 'requirement_id': row.id, 'depends_on_id': target}
+             for row in rows
+             for target in sorted(set(parse_dependency_ids(row.dependencies)))
+             if target in existing and target != row.id]
+    db.session.execute(table.delete().where(table.c.project_id == project_id))
+    if edges:
+        db.session.execute(table.insert(), edges)
+    db.session.commit()
+    return len(edges)
+
+
+def _sync_edges(session, flush_context):
+    """需求新增、删除或dependencies文本变化时同步依赖边"""
+    table = RequirementDependency.__table__
+    connection = None
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Requirement):
+            continue
+        if obj not in session.new and not inspect(obj).attrs.dependencies.history.has_changes():
+            continue
+        connection = connection or session.connection()
+        connection.execute(table.delete().where(table.c.requirement_id == obj.id))
+        rows = _edge_rows(connection, obj.project_id, obj.id, obj.dependencies)
+        if rows:
+            connection.execute(table.insert(), rows)
+    for obj in session.deleted:
+        if isinstance(obj, Requirement):
+            connection = connection or session.connection()
+            connection.execute(table.delete().where(
+                (table.c.requirement_id == obj.id) | (table.c.depends_on_id == obj.id)))
+
+
+def init_dependency_graph(app):
+    """注册依赖边同步钩子；已有数据库首次启用时按dependencies文本回填依赖边"""
+    event.listen(db.session, 'after_flush', _sync_edges)
+    with app.app_context():
+        has_edges = db.session.query(RequirementDependency.id).first() is not None
+        if not has_edges:
+            project_ids = [row[0] for row in db.session.query(Requirement.project_id).filter(
+                Requirement.dependencies.isnot(None), Requirement.dependencies != '').distinct()]
+            for project_id in project_ids:
+                count = rebuild_project_edges(project_id)
+                logger.info(f"已为项目 {project_id} 回填 {count} 条需求依赖边")
@@ -0,0 +1,206 @@
+# kano_engine.py
+import json
+import math
+from datetime import datetime
+
+import numpy as np
+
+# KANO问卷的五个标准答案，顺序与评价表的行列一致
+ANSWERS = ('like', 'must-be', 'neutral', 'live-with', 'dislike')
+
+# 兼容中文问卷答案
+ANSWER_ALIASES = {
+    'like': 0, '喜欢': 0, '我喜欢': 0,
+    'must-be': 1, 'must_be': 1, 'expect': 1, '理所当然': 1, '必须的': 1,
+    'neutral': 2, '无所谓': 2, '中立': 2,
+    'live-with': 3, 'live_with': 3, 'tolerate': 3, '能忍受': 3, '可以忍受': 3,
+    'dislike': 4, '不喜欢': 4, '我不喜欢': 4,
+}
+
+# 分类编码，名称与Requirement.kano_category保持一致
+CATEGORIES = ('attractive', 'one_dimensional', 'must_be', 'indifferent', 'reverse', 'questionable')
+A, O, M, I, R, Q = range(len(CATEGORIES))
+
+# 标准KANO评价表：行为正向（功能具备）答案，列为反向（功能不具备）答案
+EVALUATION_TABLE = np.array([
+    #  like must-be neutral live-with dislike
+    [Q, A, A, A, O],  # like
+    [R, I, I, I, M],  # must-be
+    [R, I, I, I, M],  # neutral
+    [R, I, I, I, M],  # live-with
+    [R, R, R, R, Q],  # dislike
+], dtype=np.int8)
+
+# 票数相同时的判定优先级：M > O > A > I > R > Q
+_TIE_BREAK = np.array([3, 4, 5, 2, 1, 0], dtype=np.int64)
+
+
+def answer_index(answer):
+    """把答案文本转换为评价表下标，无法识别时返回-1"""
+    if answer is None:
+        return -1
+    return ANSWER_ALIASES.get(str(answer).strip().lower(), -1)
+
+
+def parse_survey_data(raw):
+    """解析kano_survey_data字段
+
+    支持 [[正向, 反向], ...] 和 [{"functional": ..., "dysfunctional": ...}, ...] 两种格式。
+    """
+    if not raw:
+        return []
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return []
+    pairs = []
+    for item in data if isinstance(data, list) else []:
+        if isinstance(item, dict):
+            pairs.append((item.get('functional'), item.get('dysfunctional')))
+        elif isinstance(item, (list, tuple)) and len(item) >= 2:
+            pairs.append((item[0], item[1]))
+    return pairs
+
+
+def classify(functional, dysfunctional):
+    """对单个受访者的答案进行分类"""
+    f, d = answer_index(functional), answer_index(dysfunctional)
+    if f < 0 or d < 0:
+        return None
+    return CATEGORIES[EVALUATION_TABLE[f, d]]
+
+
+def evaluate(surveys):
+    """批量评估多个需求的KANO调查
+
+    surveys 为 {requirement_id: [(正向答案, 反向答案), ...]}。
+    所有答案展开为一维数组后，通过评价表查表和bincount一次完成分类计数，
+    返回 {requirement_id: 结果字典}。
+    """
+    requirement_ids = list(surveys)
+    if not requirement_ids:
+        return {}
+
+    owner, functional, dysfunctional = [], [], []
+    for row, req_id in enumerate(requirement_ids):
+        for f, d in surveys[req_id]:
+            owner.append(row)
+            functional.append(answer_index(f))
+            dysfunctional.append(answer_index(d))
+
+    owner = np.asarray(owner, dtype=np.int64)
+    functional = np.asarray(functional, dtype=np.int64)
+    dysfunctional = np.asarray(dysfunctional, dtype=np.int64)
+    valid = (functional >= 0) & (dysfunctional >= 0)
+
+    n = len(requirement_ids)
+    k = len(CATEGORIES)
+    categories = EVALUATION_TABLE[functional[valid], dysfunctional[valid]]
+    counts = np.bincount(owner[valid] * k + categories, minlength=n * k).reshape(n, k)
+
+    # Better/Worse系数（Berger等）：分母不计反向和可疑答案
+    denominator = counts[:, [A, O, M, I]].sum(axis=1).astype(float)
+    safe = np.where(denominator > 0, denominator, 1.0)
+    better = np.where(denominator > 0, (counts[:, A] + counts[:, O]) / safe, 0.0)
+    worse = np.where(denominator > 0, -(counts[:, O] + counts[:, M]) / safe, 0.0)
+    # 优先级分数：Better/Worse向量长度归一化到0-10
+    priority = np.sqrt(better ** 2 + worse ** 2) / math.sqrt(2) * 10
+
+    # 主分类为票数最多的类别（不含可疑答案），票数相同时按M>O>A>I>R选择
+    ranked = counts * (k + 1) + _TIE_BREAK
+    ranked[:, Q] = -1
+    dominant = np.argmax(ranked, axis=1)
+    responses = counts.sum(axis=1)
+
+    results = {}
+    for row, req_id in enumerate(requirement_ids):
+        total = int(responses[row])
+        results[req_id] = {
+            'requirement_id': req_id,
+            'responses': total,
+            'category': CATEGORIES[dominant[row]] if total - counts[row, Q] > 0 else None,
+            'distribution': {CATEGORIES[c]: int(counts[row, c]) for c in range(k)},
+            'better': round(float(better[row]), 4),
+            'worse': round(float(worse[row]), 4),
+            'priority_score': round(float(priority[row]), 2),
+        }
+    return results
+
+
+def category_distribution(results):
+    """统计各分类的需求数量"""
+    distribution = {name: 0 for name in CATEGORIES}
+    for result in results.values():
+        if result['category']:
+            distribution[result['category']] += 1
+    return distribution
+
+
+def _requirement_id(value):
+    """请求中的requirement_id，允许数字字符串，无法转换为整数时抛出ValueError"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError(f'无效的 requirement_id: {value!r}')
+
+
+def merge_responses(existing_raw, new_pairs, mode='append'):
+    """合并新的调查答案并返回序列化后的kano_survey_data"""
+    pairs = [] if mode == 'replace' else parse_survey_data(existing_raw)
+    pairs.extend(new_pairs)
+    return json.dumps([list(p) for p in pairs], ensure_ascii=False)
+
+
+def evaluate_project(db, Requirement, project_id, responses=None, mode='append', write=True):
+    """评估项目内所有带调查数据的需求，并批量写回分类和优先级分数
+
+    responses 为可选的新答案列表 [{"requirement_id", "functional", "dysfunctional"}, ...]，
+    会先按mode（append/replace）合并到kano_survey_data；格式不正确时抛出ValueError。
+    没有调查数据的需求以kano_positive_answer/kano_negative_answer（单次问答）作为一份答案。
+    所有答案都无法识别的需求没有分类，不写回。
+    """
+    rows = db.session.query(Requirement.id, Requirement.kano_survey_data, Requirement.kano_positive_answer,
+                            Requirement.kano_negative_answer).filter(Requirement.project_id == project_id).all()
+    raw_by_id = {row.id: row.kano_survey_data for row in rows}
+    single_answers = {row.id: (row.kano_positive_answer, row.kano_negative_answer) for row in rows
+                      if row.kano_positive_answer and row.kano_negative_answer}
+
+    survey_updates = []
+    if responses:
+        if not isinstance(responses, list) or not all(isinstance(item, dict) for item in responses):
+            raise ValueError('responses 必须为对象列表')
+        grouped = {}
+        for item in responses:
+            req_id = _requirement_id(item.get('requirement_id'))
+            if req_id in raw_by_id:
+                grouped.setdefault(req_id, []).append((item.get('functional'), item.get('dysfunctional')))
+        for req_id, pairs in grouped.items():
+            raw_by_id[req_id] = merge_responses(raw_by_id[req_id], pairs, mode)
+            survey_updates.append({'id': req_id, 'kano_survey_data': raw_by_id[req_id]})
+
+    surveys = {}
+    for req_id, raw in raw_by_id.items():
+        pairs = parse_survey_data(raw) or ([single_answers[req_id]] if req_id in single_answers else [])
+        if pairs:
+            surveys[req_id] = pairs
+    results = evaluate(surveys)
+
+    if write:
+        now = datetime.utcnow()
+        updates = {row['id']: row for row in survey_updates}
+        for req_id, result in results.items():
+            if result['category'] is None:
+                continue
+            row = updates.setdefault(req_id, {'id': req_id})
+            row.update({
+                'kano_category': result['category'],
+                'kano_priority_score': result['priority_score'],
+                'kano_survey_completed': result['responses'] > 0,
+                'kano_survey_date': now,
+            })
+        if updates:
+            db.session.execute(db.update(Requirement), list(updates.values()))
+            db.session.commit()
+
+    return results
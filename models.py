@@ -33,6 +33,9 @@ class Stakeholder(db.Model):
 
 class Requirement(db.Model):
     __tablename__ = 'requirements'
+    __table_args__ = (
+        db.Index('ix_requirements_project_updated', 'project_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
@@ -56,6 +59,8 @@ class Requirement(db.Model):
     acceptance_criteria = db.Column(db.Text)  # 验收标准
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 行版本号，每次修改由数据库触发器加1（见database.py），ORM在更新后重新读取
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', server_onupdate=db.FetchedValue())
     
     # 价值评估字段
     estimated_business_value = db.Column(db.Integer, default=5)  # 预估业务价值 (1-10)
@@ -212,3 +217,53 @@ class Milestone(db.Model):
     
     # 关系
     assigned_requirements = db.relationship('Requirement', backref='milestone', lazy=True)
+
+class RequirementDependency(db.Model):
+    """需求依赖关系边，由Requirement.dependencies文本解析得到"""
+    __tablename__ = 'requirement_dependencies'
+    __table_args__ = (
+        db.UniqueConstraint('requirement_id', 'depends_on_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    requirement_id = db.Column(db.Integer, db.ForeignKey('requirements.id'), nullable=False, index=True)  # 依赖方
+    depends_on_id = db.Column(db.Integer, db.ForeignKey('requirements.id'), nullable=False, index=True)   # 被依赖的需求
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ProjectStat(db.Model):
+    """项目统计物化表，每个项目每个统计项一行，由project_stats模块增量维护"""
+    __tablename__ = 'project_stats'
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'dimension', 'key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    dimension = db.Column(db.String(30), nullable=False)  # total, status, priority, category, kano_category, completion, sum
+    key = db.Column(db.String(50), nullable=False, default='')  # 分组取值，空值记为''
+    value = db.Column(db.Float, nullable=False, default=0)
+
+class RequirementSignature(db.Model):
+    """需求文本的MinHash签名，用于近似重复检测，由duplicate_detector模块在需求写入时同步更新"""
+    __tablename__ = 'requirement_signatures'
+    
+    requirement_id = db.Column(db.Integer, db.ForeignKey('requirements.id'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # NUM_PERM个uint32
+    source_updated_at = db.Column(db.DateTime)  # 计算签名时需求的updated_at
+
+class ChangeLog(db.Model):
+    """需求、干系人和里程碑的变更记录（含删除），由change_log模块通过ORM事件写入，id即增量同步的游标"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_project_id', 'project_id', 'id'),
+        {'sqlite_autoincrement': True},  # id不重复使用，保证游标单调递增
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False)  # 不设外键：项目删除后删除记录仍保留
+    entity = db.Column(db.String(20), nullable=False)  # requirement, stakeholder, milestone
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,94 @@
+# query_fixtures.py
+"""pytest插件：提供已登录的测试客户端及SQL查询数量断言
+
+在conftest.py中通过 pytest_plugins = ['query_fixtures'] 启用，例如:
+
+    def test_roadmap_queries(seeded_project, assert_max_queries):
+        assert_max_queries(f'/api/roadmap/{seeded_project}', 2)
+"""
+import importlib
+import os
+
+import pytest
+
+from query_inspector import QueryCounter
+
+
+@pytest.fixture(scope='session')
+def flask_app(tmp_path_factory):
+    """使用临时SQLite数据库加载应用"""
+    db_path = tmp_path_factory.mktemp('db') / 'requirements_analyst_test.db'
+    os.environ['REQUIREMENTS_ANALYST_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app_module = importlib.import_module('app')
+    app_module.app.config['TESTING'] = True
+    return app_module.app
+
+
+@pytest.fixture
+def client(flask_app):
+    """已登录的测试客户端"""
+    test_client = flask_app.test_client()
+    with test_client.session_transaction() as sess:
+        sess['user_id'] = 'admin'
+        sess['username'] = 'admin'
+    return test_client
+
+
+@pytest.fixture
+def seeded_project(flask_app):
+    """创建一个带干系人、里程碑和需求的项目，返回项目ID"""
+    from database import db
+    from models import Project, Stakeholder, Requirement, Milestone
+
+    with flask_app.app_context():
+        project = Project(name='查询数量测试项目')
+        db.session.add(project)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(Stakeholder(project_id=project.id, name=f'干系人{i}'))
+        requirements = [Requirement(project_id=project.id, title=f'需求{i}') for i in range(20)]
+        db.session.add_all(requirements)
+        db.session.flush()
+        for i in range(4):
+            members = requirements[i * 5:(i + 1) * 5]
+            milestone = Milestone(project_id=project.id, title=f'里程碑{i}',
+                                  requirements=','.join(str(r.id) for r in members))
+            db.session.add(milestone)
+            db.session.flush()
+            for r in members:
+                r.assigned_milestone_id = milestone.id
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+@pytest.fixture
+def count_queries(flask_app):
+    """返回一个上下文管理器，统计代码块内执行的SQL语句"""
+    from database import db
+
+    def _count_queries():
+        with flask_app.app_context():
+            engine = db.engine
+        return QueryCounter(engine)
+
+    return _count_queries
+
+
+@pytest.fixture
+def assert_max_queries(client, count_queries):
+    """请求指定URL并断言SQL语句数不超过上限"""
+
+    def _assert_max_queries(url, max_queries, method='GET', **kwargs):
+        with count_queries() as counter:
+            response = client.open(url, method=method, **kwargs)
+        assert response.status_code < 500, f'{method} {url} 返回 {response.status_code}'
+        assert counter.count <= max_queries, (
+            f'{method} {url} 执行了 {counter.count} 条SQL，超过上限 {max_queries}\n{counter.report()}'
+        )
+        return response
+
+    return _assert_max_queries
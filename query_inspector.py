@@ -0,0 +1,147 @@
+# query_inspector.py
+import logging
+import os
+import re
+import threading
+import traceback
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，用于从调用栈中筛选出业务代码帧
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_NAMED_PARAM = re.compile(r':\w+|%\(\w+\)s')
+_WHITESPACE = re.compile(r'\s+')
+_SELECT_LIST = re.compile(r'^SELECT .+? FROM ', re.IGNORECASE)
+
+
+class NPlusOneQueryError(Exception):
+    """同一条SQL在单个请求内重复执行次数超过阈值"""
+
+
+def normalize_sql(statement):
+    """归一化SQL语句，使参数不同但结构相同的语句落入同一分组"""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _NAMED_PARAM.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def shorten_sql(sql):
+    """省略SELECT列清单，便于在日志中阅读"""
+    return _SELECT_LIST.sub('SELECT ... FROM ', sql, count=1)
+
+
+def stack_excerpt(limit=6):
+    """截取调用栈中属于本项目代码的最后若干帧"""
+    frames = []
+    for frame in traceback.extract_stack()[:-1]:
+        if frame.filename.startswith('<'):
+            continue
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(PROJECT_ROOT) or 'site-packages' in filename:
+            continue
+        if filename in (__file__, os.path.join(PROJECT_ROOT, 'instrumentation.py')):
+            continue
+        frames.append(frame)
+    return ''.join(traceback.format_list(frames[-limit:]))
+
+
+class QueryGroup:
+    """归一化后相同的一组SQL语句"""
+
+    __slots__ = ('count', 'stack')
+
+    def __init__(self):
+        self.count = 0
+        self.stack = None
+
+
+class QueryInspector:
+    """开发/测试模式下按请求检测N+1查询
+
+    mode为'warn'时记录警告日志，为'raise'时抛出NPlusOneQueryError。
+    """
+
+    def __init__(self, threshold=5, mode='warn'):
+        self.threshold = threshold
+        self.mode = mode
+
+    def record(self, groups, statement):
+        key = normalize_sql(statement)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = QueryGroup()
+        group.count += 1
+        # 仅在首次越过阈值时截取调用栈，避免每条语句都付出开销
+        if group.count == self.threshold + 1:
+            group.stack = stack_excerpt()
+
+    def offenders(self, groups):
+        return sorted(
+            ((sql, group) for sql, group in groups.items() if group.count > self.threshold),
+            key=lambda item: item[1].count,
+            reverse=True
+        )
+
+    def check(self, groups, endpoint):
+        offenders = self.offenders(groups)
+        if not offenders:
+            return
+        message = format_offenders(endpoint, offenders)
+        if self.mode == 'raise':
+            raise NPlusOneQueryError(message)
+        logger.warning(message)
+
+
+def format_offenders(endpoint, offenders):
+    lines = [f"检测到疑似N+1查询 (端点: {endpoint})"]
+    for sql, group in offenders:
+        lines.append(f"  重复 {group.count} 次: {shorten_sql(sql)}")
+        if group.stack:
+            lines.append('  调用位置:')
+            lines.extend('    ' + line for line in group.stack.rstrip().splitlines())
+    return '\n'.join(lines)
+
+
+class QueryCounter:
+    """统计代码块内执行的SQL语句，用于测试中断言查询数量
+
+    用法:
+        with QueryCounter(db.engine) as counter:
+            client.get('/api/roadmap/1')
+        assert counter.count <= 3
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.groups = {}
+        self._inspector = QueryInspector(threshold=0)
+        self._lock = threading.Lock()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+            self._inspector.record(self.groups, statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'after_cursor_execute', self._after_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'after_cursor_execute', self._after_cursor_execute)
+        return False
+
+    def report(self):
+        """按重复次数列出本次统计到的语句"""
+        lines = [f"共执行 {self.count} 条SQL语句"]
+        for sql, group in sorted(self.groups.items(), key=lambda item: item[1].count, reverse=True):
+            lines.append(f"  {group.count} x {shorten_sql(sql)}")
+        return '\n'.join(lines)
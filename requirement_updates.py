@@ -0,0 +1,257 @@
+# requirement_updates.py
+"""需求的轻量修改（看板拖动卡片）和批量修改、删除
+
+只修改请求中给出的状态、优先级和所属里程碑，用带版本条件的UPDATE语句写入，不加载整行。
+requirements.version 为行版本号，任何修改都会使其加1（见database.py中的触发器）；客户端提交
+自己看到的版本，与当前版本不一致时整批不写入并返回当前版本，避免并发修改被静默覆盖。
+
+批量修改和删除按条件（filter）或ID列表（ids）选出项目内的需求，各执行一条UPDATE/DELETE语句，
+变更记录和项目统计由各自的批量语句钩子维护。
+
+需求所属的里程碑以 requirements.assigned_milestone_id 为准，milestones.requirements 中的需求ID列表
+由 sync_milestone_lists 按其重写，修改所属里程碑的操作在同一事务中同时更新两者。
+"""
+import re
+from datetime import datetime
+
+from database import db
+from models import Requirement, Milestone, RequirementDependency, RequirementSignature
+
+PATCH_FIELDS = ('status', 'priority', 'assigned_milestone_id')
+PRIORITIES = ('low', 'medium', 'high', 'critical')
+STATUS_MAX_LENGTH = 20
+# 批量修改一次最多的需求数
+MAX_BATCH_ITEMS = 500
+# 批量修改、删除时可用作条件的字段
+FILTER_FIELDS = ('status', 'priority', 'category', 'requirement_type', 'source', 'kano_category',
+                 'assigned_milestone_id')
+# 批量修改、删除时ids的数量上限
+MAX_BULK_IDS = 5000
+
+_ETAG_PATTERN = re.compile(r'^(?:W/)?"?(\d+)"?$')
+
+
+def format_etag(version):
+    return f'"{version}"'
+
+
+def parse_version(value):
+    """解析If-Match请求头或请求中的version，返回整数版本号；为空或 * 时返回None（不检查版本）"""
+    if value is None or value == '*':
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    match = _ETAG_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f'无效的版本号: {value}')
+    return int(match.group(1))
+
+
+def clean_fields(data):
+    """从请求数据中取出可修改的字段并校验，返回 {字段: 值}"""
+    fields = {field: data[field] for field in PATCH_FIELDS if field in data}
+    if not fields:
+        raise ValueError(f'至少需要提供以下字段之一: {", ".join(PATCH_FIELDS)}')
+    if 'status' in fields:
+        status = fields['status']
+        if not isinstance(status, str) or not status or len(status) > STATUS_MAX_LENGTH:
+            raise ValueError(f'status 必须为1到{STATUS_MAX_LENGTH}个字符')
+    if 'priority' in fields and fields['priority'] not in PRIORITIES:
+        raise ValueError(f'priority 必须为 {"/".join(PRIORITIES)} 之一')
+    milestone_id = fields.get('assigned_milestone_id')
+    if milestone_id is not None and (not isinstance(milestone_id, int) or isinstance(milestone_id, bool)):
+        raise ValueError('assigned_milestone_id 必须为整数或null')
+    return fields
+
+
+def clean_item(data):
+    """批量修改中的一项：{"id", "version", 要修改的字段}"""
+    if not isinstance(data, dict) or not isinstance(data.get('id'), int):
+        raise ValueError('每一项都需要整数 id')
+    return {'id': data['id'], 'version': parse_version(data.get('version')), 'fields': clean_fields(data)}
+
+
+def _check_milestones(project_id, items):
+    milestone_ids = {item['fields']['assigned_milestone_id'] for item in items
+                     if item['fields'].get('assigned_milestone_id') is not None}
+    if milestone_ids:
+        found = {row[0] for row in db.session.query(Milestone.id).filter(
+            Milestone.project_id == project_id, Milestone.id.in_(milestone_ids)).all()}
+        missing = sorted(milestone_ids - found)
+        if missing:
+            raise ValueError(f'里程碑不存在或不属于该项目: {missing}')
+
+
+def sync_milestone_lists(milestone_ids):
+    """按需求的assigned_milestone_id重写这些里程碑的需求ID列表（在当前会话中执行，由调用方提交）"""
+    milestone_ids = {milestone_id for milestone_id in milestone_ids if milestone_id is not None}
+    if not milestone_ids:
+        return
+    grouped = {row[0]: [] for row in db.session.query(Milestone.id).filter(Milestone.id.in_(milestone_ids))}
+    if not grouped:
+        return
+    for req_id, milestone_id in db.session.query(Requirement.id, Requirement.assigned_milestone_id).filter(
+            Requirement.assigned_milestone_id.in_(list(grouped))).order_by(Requirement.id):
+        grouped[milestone_id].append(req_id)
+    db.session.execute(db.update(Milestone), [
+        {'id': milestone_id, 'requirements': ','.join(map(str, ids))} for milestone_id, ids in grouped.items()])
+
+
+def assign_milestone(milestone, requirement_ids):
+    """把里程碑的需求设为requirement_ids（只取同一项目内的需求）：列表外原属该里程碑的需求取消分配，
+    列表内的需求从原里程碑移入，并重写涉及的各里程碑的需求ID列表"""
+    db.session.flush()
+    requirement_ids = {int(req_id) for req_id in requirement_ids}
+    previous = {row[0] for row in db.session.query(Requirement.assigned_milestone_id).filter(
+        Requirement.project_id == milestone.project_id, Requirement.id.in_(requirement_ids))} if requirement_ids else set()
+    db.session.execute(db.update(Requirement).where(
+        Requirement.assigned_milestone_id == milestone.id, Requirement.id.notin_(requirement_ids))
+        .values(assigned_milestone_id=None, version=Requirement.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False))
+    if requirement_ids:
+        db.session.execute(db.update(Requirement).where(
+            Requirement.project_id == milestone.project_id, Requirement.id.in_(requirement_ids),
+            db.or_(Requirement.assigned_milestone_id.is_(None), Requirement.assigned_milestone_id != milestone.id))
+            .values(assigned_milestone_id=milestone.id, version=Requirement.version + 1, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False))
+    sync_milestone_lists(previous | {milestone.id})
+
+
+def _current_versions(project_id, ids):
+    return dict(db.session.query(Requirement.id, Requirement.version).filter(
+        Requirement.project_id == project_id, Requirement.id.in_(ids)).all())
+
+
+def _conflicts(items, current):
+    """版本不一致（或已删除）的项，返回 [{"id", "version"}]，version为当前版本，已删除时为None"""
+    return [{'id': item['id'], 'version': current.get(item['id'])} for item in items
+            if item['id'] not in current or (item['version'] is not None and item['version'] != current[item['id']])]
+
+
+def apply_patches(project_id, items):
+    """在当前会话中修改一批需求（由调用方提交事务，有冲突时由调用方回滚）
+
+    items为clean_item的结果。修改内容相同的需求合并为一条UPDATE，版本条件写在WHERE中，
+    检查版本之后被其他事务修改的需求同样视为冲突。修改了所属里程碑时同时重写涉及的里程碑的需求ID列表。
+    返回 (results, conflicts)：没有冲突时results为 [{"id", "version", "updated_at", 修改的字段}]，
+    有冲突时results为None，不应提交。
+    """
+    ids = [item['id'] for item in items]
+    if len(set(ids)) != len(ids):
+        raise ValueError('同一需求只能出现一次')
+    _check_milestones(project_id, items)
+
+    conflicts = _conflicts(items, _current_versions(project_id, ids))
+    if conflicts:
+        return None, conflicts
+
+    # 修改所属里程碑时，原里程碑和新里程碑的需求ID列表都要重写
+    moved = [item['id'] for item in items if 'assigned_milestone_id' in item['fields']]
+    milestone_ids = {item['fields']['assigned_milestone_id'] for item in items if 'assigned_milestone_id' in item['fields']}
+    if moved:
+        milestone_ids.update(row[0] for row in db.session.query(Requirement.assigned_milestone_id).filter(
+            Requirement.id.in_(moved)))
+
+    groups = {}
+    for item in items:
+        groups.setdefault(tuple(sorted(item['fields'].items())), []).append(item)
+    now = datetime.utcnow()
+    for key, group in groups.items():
+        checked = [(item['id'], item['version']) for item in group if item['version'] is not None]
+        unchecked = [item['id'] for item in group if item['version'] is None]
+        conditions = []
+        if checked:
+            conditions.append(db.tuple_(Requirement.id, Requirement.version).in_(checked))
+        if unchecked:
+            conditions.append(Requirement.id.in_(unchecked))
+        statement = db.update(Requirement).where(Requirement.project_id == project_id, db.or_(*conditions)) \
+            .values(**dict(key), version=Requirement.version + 1, updated_at=now) \
+            .execution_options(synchronize_session=False)
+        if db.session.execute(statement).rowcount != len(group):
+            # 检查版本之后被其他事务修改或删除，返回这一组需求的当前版本
+            current = _current_versions(project_id, [item['id'] for item in group])
+            return None, [{'id': item['id'], 'version': current.get(item['id'])} for item in group]
+    sync_milestone_lists(milestone_ids)
+
+    fields = {item['id']: item['fields'] for item in items}
+    rows = db.session.query(Requirement.id, Requirement.version, Requirement.updated_at).filter(
+        Requirement.id.in_(ids)).all()
+    results = {record_id: dict(fields[record_id], id=record_id, version=version,
+                               updated_at=updated_at.isoformat() if updated_at else None)
+               for record_id, version, updated_at in rows}
+    return [results[record_id] for record_id in ids], []
+
+
+def _column_condition(column, value):
+    """条件值为列表时匹配其中任一值（列表中的null匹配空值），null匹配空值"""
+    if isinstance(value, list):
+        values = [v for v in value if v is not None]
+        condition = column.in_(values)
+        return db.or_(condition, column.is_(None)) if len(values) != len(value) else condition
+    if value is None:
+        return column.is_(None)
+    return column == value
+
+
+def bulk_criteria(project_id, data):
+    """按请求中的filter（{字段: 值或值列表}）和ids生成WHERE条件，两者同时给出时取交集，始终限定在项目内"""
+    ids = data.get('ids')
+    filters = data.get('filter')
+    if ids is None and not filters:
+        raise ValueError('需要提供 filter 或 ids')
+    conditions = [Requirement.project_id == project_id]
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or \
+                not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError('ids 必须为非空的整数列表')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'ids 最多{MAX_BULK_IDS}个')
+        conditions.append(Requirement.id.in_(ids))
+    if filters:
+        if not isinstance(filters, dict):
+            raise ValueError('filter 必须为对象')
+        unknown = sorted(set(filters) - set(FILTER_FIELDS))
+        if unknown:
+            raise ValueError(f'不支持的筛选字段: {unknown}，可用字段: {", ".join(FILTER_FIELDS)}')
+        for field, value in filters.items():
+            conditions.append(_column_condition(getattr(Requirement, field), value))
+    return db.and_(*conditions)
+
+
+def _milestones_of(criteria):
+    """选出的需求当前所属的里程碑ID"""
+    return {row[0] for row in db.session.query(Requirement.assigned_milestone_id).filter(
+        criteria, Requirement.assigned_milestone_id.isnot(None)).distinct()}
+
+
+def bulk_update(project_id, data):
+    """把选出的需求的字段设为data["set"]中的值（一条UPDATE），修改所属里程碑时同时重写涉及的里程碑的需求ID列表，
+    返回修改的需求数"""
+    criteria = bulk_criteria(project_id, data)
+    fields = clean_fields(data.get('set') or {})
+    _check_milestones(project_id, [{'fields': fields}])
+    milestone_ids = _milestones_of(criteria) | {fields['assigned_milestone_id']} \
+        if 'assigned_milestone_id' in fields else set()
+    statement = db.update(Requirement).where(criteria) \
+        .values(**fields, version=Requirement.version + 1, updated_at=datetime.utcnow()) \
+        .execution_options(synchronize_session=False)
+    updated = db.session.execute(statement).rowcount
+    sync_milestone_lists(milestone_ids)
+    return updated
+
+
+def bulk_delete(project_id, data):
+    """删除选出的需求（一条DELETE），连同以其为端点的依赖边和其重复检测签名，并从所属里程碑的需求ID列表中移除，
+    返回删除的需求数"""
+    criteria = bulk_criteria(project_id, data)
+    milestone_ids = _milestones_of(criteria)
+    targets = db.select(Requirement.id).where(criteria)
+    edges = RequirementDependency.__table__
+    db.session.execute(edges.delete().where(
+        edges.c.requirement_id.in_(targets) | edges.c.depends_on_id.in_(targets)))
+    signatures = RequirementSignature.__table__
+    db.session.execute(signatures.delete().where(signatures.c.requirement_id.in_(targets)))
+    statement = db.delete(Requirement).where(criteria).execution_options(synchronize_session=False)
+    deleted = db.session.execute(statement).rowcount
+    sync_milestone_lists(milestone_ids)
+    return deleted
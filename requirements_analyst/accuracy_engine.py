@@ -0,0 +1,136 @@
+# accuracy_engine.py
+import numpy as np
+
+from data_version import VersionedCache, project_data_version
+
+# 评估人样本数少于该值时不参与“最佳提案人”评选（没有人达到时不限制）
+MIN_ASSESSOR_SAMPLES = 3
+# 趋势判断至少需要的带日期样本数，以及每30天准确率变化超过多少个百分点才视为改善或下降
+MIN_TREND_POINTS = 3
+TREND_THRESHOLD = 1.0
+
+TREND_LABELS = {
+    'improving': '↑ 改善',
+    'declining': '↓ 下降',
+    'stable': '→ 稳定',
+    'insufficient': '— 数据不足',
+}
+
+_accuracy_cache = VersionedCache()
+
+
+def _metrics(count, ape_sum, bias_sum):
+    """由误差合计得到准确率、MAPE和偏差（均为百分比）"""
+    count = np.asarray(count, dtype=float)
+    safe = np.maximum(count, 1)
+    mape = ape_sum / safe * 100
+    return 100 - mape, mape, bias_sum / safe * 100
+
+
+def _grouped(labels, ape, bias):
+    """按标签分组汇总，返回按准确率从高到低排序的列表"""
+    if len(labels) == 0:
+        return []
+    names, inverse = np.unique(labels, return_inverse=True)
+    counts = np.bincount(inverse)
+    accuracy, mape, mean_bias = _metrics(counts, np.bincount(inverse, weights=ape),
+                                         np.bincount(inverse, weights=bias))
+    order = np.lexsort((-counts, -accuracy))
+    return [{
+        'name': str(names[i]),
+        'count': int(counts[i]),
+        'accuracy': round(float(accuracy[i]), 2),
+        'mape': round(float(mape[i]), 2),
+        'bias': round(float(mean_bias[i]), 2),
+    } for i in order]
+
+
+def _trend(dates, ape, bias):
+    """按实际价值评估日期计算月度序列，并用最小二乘斜率判断准确率趋势"""
+    dated = np.array([d is not None for d in dates], dtype=bool)
+    if dated.sum() == 0:
+        return {'direction': 'insufficient', 'label': TREND_LABELS['insufficient'],
+                'slope_per_30_days': None, 'series': []}
+
+    points = np.array([d for d in dates if d is not None], dtype='datetime64[s]')
+    ape, bias = ape[dated], bias[dated]
+    months, inverse = np.unique(points.astype('datetime64[M]'), return_inverse=True)
+    counts = np.bincount(inverse)
+    accuracy, mape, mean_bias = _metrics(counts, np.bincount(inverse, weights=ape),
+                                         np.bincount(inverse, weights=bias))
+    series = [{
+        'period': str(months[i]),
+        'count': int(counts[i]),
+        'accuracy': round(float(accuracy[i]), 2),
+        'mape': round(float(mape[i]), 2),
+        'bias': round(float(mean_bias[i]), 2),
+    } for i in range(len(months))]
+
+    days = (points - points.min()).astype(float) / 86400
+    slope = None
+    direction = 'insufficient'
+    if len(points) >= MIN_TREND_POINTS and days.max() > 0:
+        slope = float(np.polyfit(days, (1 - ape) * 100, 1)[0]) * 30
+        if slope > TREND_THRESHOLD:
+            direction = 'improving'
+        elif slope < -TREND_THRESHOLD:
+            direction = 'declining'
+        else:
+            direction = 'stable'
+    return {
+        'direction': direction,
+        'label': TREND_LABELS[direction],
+        'slope_per_30_days': None if slope is None else round(slope, 2),
+        'series': series,
+    }
+
+
+def analyze(rows):
+    """计算预估准确性指标
+
+    rows 为 [(预估评估人, 分类, 预估ROI, 实际ROI, 实际价值评估日期), ...]，只传入实际ROI大于0、
+    预估ROI不为空的需求。单个需求的绝对百分比误差 = |实际-预估|/实际，准确率 = 1 - 绝对百分比误差，
+    偏差 = (预估-实际)/实际（正数表示高估）；结果均以百分比表示。
+    """
+    n = len(rows)
+    assessors = np.array([row[0] or '未记录' for row in rows], dtype=object)
+    categories = np.array([row[1] or '未分类' for row in rows], dtype=object)
+    estimated = np.array([row[2] for row in rows], dtype=float)
+    actual = np.array([row[3] for row in rows], dtype=float)
+    dates = [row[4] for row in rows]
+
+    relative = (estimated - actual) / actual if n else np.zeros(0)
+    ape = np.abs(relative)
+    accuracy, mape, bias = _metrics(n, ape.sum(), relative.sum())
+    if n == 0:
+        accuracy = 0.0
+
+    by_assessor = _grouped(assessors, ape, relative)
+    qualified = [item for item in by_assessor if item['count'] >= MIN_ASSESSOR_SAMPLES] or by_assessor
+    return {
+        'assessed': n,
+        'overall': {
+            'count': n,
+            'accuracy': round(float(accuracy), 2),
+            'mape': round(float(mape), 2),
+            'bias': round(float(bias), 2),
+            'median_ape': round(float(np.median(ape) * 100), 2) if n else 0.0,
+        },
+        'best_performer': qualified[0]['name'] if qualified else None,
+        'by_assessor': by_assessor,
+        'by_category': _grouped(categories, ape, relative),
+        'trend': _trend(dates, ape, relative),
+    }
+
+
+def analyze_project(db, Requirement, project_id):
+    """计算项目的预估准确性指标，按项目数据版本缓存"""
+    def build():
+        rows = db.session.query(
+            Requirement.value_assessor, Requirement.category, Requirement.estimated_roi,
+            Requirement.actual_roi, Requirement.actual_value_assessment_date
+        ).filter(Requirement.project_id == project_id, Requirement.actual_roi > 0,
+                 Requirement.estimated_roi.isnot(None)).all()
+        return analyze(rows)
+
+    return _accuracy_cache.get_or_build(project_id, project_data_version(project_id), build)
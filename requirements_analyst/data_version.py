@@ -0,0 +1,61 @@
+# data_version.py
+import threading
+from collections import OrderedDict
+
+from database import db
+from models import Requirement, RequirementDependency, Milestone
+
+
+def project_data_version(project_id):
+    """返回项目数据的版本标识
+
+    由需求、依赖边和里程碑的数量与最后修改时间组成，一条聚合查询即可得到
+    （需求表上有 (project_id, updated_at) 索引）。批量更新同样会刷新updated_at，
+    因此任何写入都会使版本变化。
+    """
+    def aggregate(column, where):
+        return db.select(column).where(where).scalar_subquery()
+
+    row = db.session.execute(db.select(
+        aggregate(db.func.count(Requirement.id), Requirement.project_id == project_id),
+        aggregate(db.func.max(Requirement.updated_at), Requirement.project_id == project_id),
+        aggregate(db.func.count(RequirementDependency.id), RequirementDependency.project_id == project_id),
+        aggregate(db.func.max(RequirementDependency.id), RequirementDependency.project_id == project_id),
+        aggregate(db.func.count(Milestone.id), Milestone.project_id == project_id),
+        aggregate(db.func.max(Milestone.updated_at), Milestone.project_id == project_id),
+    )).one()
+    return '|'.join('' if value is None else str(value) for value in row)
+
+
+class VersionedCache:
+    """按数据版本失效的进程内缓存
+
+    每个键只保留最近一次构建的结果，版本变化时重新构建；超过max_entries时淘汰最久未使用的键。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, version, builder):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = builder()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,351 @@
+# duplicate_detector.py
+import logging
+import re
+import time
+
+import numpy as np
+from sqlalchemy import event, inspect
+
+from database import db
+from models import Requirement, RequirementSignature
+
+# MinHash签名长度及LSH分段：16段×8行，两条需求的Jaccard相似度约0.7以上时大概率至少有一段完全相同
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# 字符n-gram长度（中文按字切分，3个字符兼顾区分度和对少量改写的容忍）
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+
+# 导入时的重复检查方式：off 不检查，report 只在结果中报告，skip 删除与已有需求重复的新需求
+IMPORT_CHECK_MODES = ('off', 'report', 'skip')
+
+# 一次计算的shingle数上限（shingle数×NUM_PERM 的中间矩阵约4MB，可留在CPU缓存内）
+_CHUNK_SHINGLES = 4096
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+# 固定种子的哈希参数，保证存储的签名在进程重启后仍可比较
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_SHINGLE_BASE = np.uint64(1000003)
+
+threshold = DEFAULT_THRESHOLD
+import_check = 'report'
+
+logger = logging.getLogger(__name__)
+
+
+def configure(config):
+    """按config.ini的[DUPLICATES]配置设置相似度阈值和导入时的检查方式"""
+    global threshold, import_check
+    threshold = config.getfloat('DUPLICATES', 'threshold', fallback=DEFAULT_THRESHOLD)
+    mode = config.get('DUPLICATES', 'import_check', fallback='report').strip().lower()
+    import_check = mode if mode in IMPORT_CHECK_MODES else 'report'
+
+
+def requirement_text(title, scenario=None, problem=None, goal=None, current_solution=None):
+    """用于比较的文本：标题 + 需求描述（与Requirement.description的组成一致）"""
+    return ' '.join(part for part in (title, scenario, problem, goal, current_solution) if part)
+
+
+def normalize(text):
+    """转小写并去掉空白和标点"""
+    return re.sub(r'[\W_]+', '', (text or '').lower())
+
+
+def shingle_hashes(text):
+    """字符n-gram的64位哈希（按码点多项式滚动计算），文本短于n时整段作为一个shingle"""
+    text = normalize(text)
+    if not text:
+        return np.zeros(0, dtype=np.uint64)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    size = min(SHINGLE_SIZE, len(codes))
+    hashes = np.zeros(len(codes) - size + 1, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * _SHINGLE_BASE + codes[offset:len(codes) - size + 1 + offset]
+    return np.unique(hashes)
+
+
+def signatures(texts):
+    """批量计算MinHash签名，返回 (len(texts), NUM_PERM) 的uint32矩阵；空文本的签名全为最大值
+
+    每个shingle经 NUM_PERM 个 (a·x + b) >> 32 哈希（乘法移位哈希族，a为奇数），
+    按需求分段取最小值；分块计算以限制中间矩阵大小。
+    """
+    result = np.full((len(texts), NUM_PERM), _EMPTY, dtype=np.uint32)
+    hashes = [shingle_hashes(text) for text in texts]
+    start = 0
+    while start < len(hashes):
+        stop, size = start, 0
+        while stop < len(hashes) and (stop == start or size + len(hashes[stop]) <= _CHUNK_SHINGLES):
+            size += len(hashes[stop])
+            stop += 1
+        rows = [i for i in range(start, stop) if len(hashes[i])]
+        if rows:
+            shingles = np.concatenate([hashes[i] for i in rows])
+            hashed = np.multiply(shingles[:, None], _A)
+            hashed += _B
+            hashed >>= np.uint64(32)
+            offsets = np.cumsum([0] + [len(hashes[i]) for i in rows[:-1]])
+            result[rows] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = stop
+    return result
+
+
+def band_keys(sigs):
+    """每个签名按BANDS段计算64位分段哈希，返回 (n, BANDS) 的uint64矩阵"""
+    bands = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    return (bands * _BAND_MIX).sum(axis=2)
+
+
+def similarity(sigs_a, sigs_b):
+    """按签名估计Jaccard相似度（相同位置取值相等的比例）"""
+    return (sigs_a == sigs_b).mean(axis=-1)
+
+
+def candidate_pairs(sigs):
+    """LSH候选对：任意一段分段哈希相同的签名。每个桶内按下标顺序连接相邻成员，
+    避免桶内两两组合，候选对数量与需求数成线性关系。返回 (i, j) 数组，i < j"""
+    index = np.flatnonzero(~(sigs == _EMPTY).all(axis=1))
+    if len(index) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    keys = band_keys(sigs[index])
+    pairs = []
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        same = keys[order[1:], band] == keys[order[:-1], band]
+        pairs.append(np.stack([index[order[:-1][same]], index[order[1:][same]]], axis=1))
+    pairs = np.concatenate(pairs)
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0) if len(pairs) else pairs
+
+
+def find_pairs(sigs, min_similarity):
+    """候选对中估计相似度不低于阈值的对，返回 (pairs, similarities)"""
+    pairs = candidate_pairs(sigs)
+    if not len(pairs):
+        return pairs, np.zeros(0)
+    scores = similarity(sigs[pairs[:, 0]], sigs[pairs[:, 1]])
+    keep = scores >= min_similarity
+    return pairs[keep], scores[keep]
+
+
+def clusters(ids, sigs, min_similarity):
+    """按相似对做并查集聚类，返回 [[下标, ...], ...]（每组至少2个，组内按需求ID排序）"""
+    pairs, _ = find_pairs(sigs, min_similarity)
+    parent = list(range(len(ids)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = root(int(i)), root(int(j))
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i in np.unique(pairs) if len(pairs) else []:
+        groups.setdefault(root(int(i)), []).append(int(i))
+    return [sorted(members, key=lambda k: ids[k]) for members in groups.values()]
+
+
+# 参与比较的需求字段，修改其中之一（或移到其他项目）时重新计算签名
+TEXT_FIELDS = ('title', 'scenario', 'problem', 'goal', 'current_solution')
+
+
+def _signature_rows(requirements):
+    """[(id, project_id, updated_at, title, scenario, problem, goal, current_solution), ...] 对应的签名行"""
+    sigs = signatures([requirement_text(*row[3:]) for row in requirements])
+    return [{'requirement_id': row[0], 'project_id': row[1], 'signature': sigs[k].tobytes(),
+             'source_updated_at': row[2]} for k, row in enumerate(requirements)]
+
+
+def _sync_signatures(session, flush_context):
+    """需求新增、删除或比较文本变化时在同一事务内更新签名"""
+    table = RequirementSignature.__table__
+    changed = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, Requirement) and (
+        obj in session.new or any(inspect(obj).attrs[field].history.has_changes()
+                                  for field in TEXT_FIELDS + ('project_id',)))]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Requirement)]
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    ids = [obj.id for obj in changed] + deleted
+    connection.execute(table.delete().where(table.c.requirement_id.in_(ids)))
+    if changed:
+        connection.execute(table.insert(), _signature_rows([
+            (obj.id, obj.project_id, obj.updated_at, *(getattr(obj, field) for field in TEXT_FIELDS))
+            for obj in changed]))
+
+
+def missing_signatures(project_id):
+    """项目内还没有签名（或签名属于其他项目）的需求ID，例如直接用SQL写入的需求"""
+    return [row[0] for row in db.session.query(Requirement.id).outerjoin(
+        RequirementSignature, RequirementSignature.requirement_id == Requirement.id).filter(
+        Requirement.project_id == project_id,
+        db.or_(RequirementSignature.project_id.is_(None), RequirementSignature.project_id != project_id)).all()]
+
+
+def _requirement_rows(ids):
+    rows = []
+    for start in range(0, len(ids), 500):
+        rows.extend(db.session.query(Requirement.id, Requirement.project_id, Requirement.updated_at,
+                                     *(getattr(Requirement, field) for field in TEXT_FIELDS)).filter(
+            Requirement.id.in_(ids[start:start + 500])).all())
+    return rows
+
+
+def backfill_signatures(project_id):
+    """为项目内缺少签名的需求计算并保存签名（由调用方提交事务），返回补算的数量"""
+    missing = missing_signatures(project_id)
+    table = RequirementSignature.__table__
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        db.session.execute(table.delete().where(table.c.requirement_id.in_(chunk)))
+        db.session.execute(table.insert(), _signature_rows(_requirement_rows(chunk)))
+    return len(missing)
+
+
+def load_signatures(project_id):
+    """读取项目内需求的签名，缺少签名的需求在内存中临时计算（不写入数据库）
+
+    返回 (按ID排序的需求ID数组, 签名矩阵, 临时计算的签名数)。
+    """
+    stored = db.session.query(RequirementSignature.requirement_id, RequirementSignature.signature).join(
+        Requirement, Requirement.id == RequirementSignature.requirement_id).filter(
+        Requirement.project_id == project_id, RequirementSignature.project_id == project_id).all()
+    ids = [row[0] for row in stored]
+    sigs = np.frombuffer(b''.join(row[1] for row in stored), dtype=np.uint32).reshape(len(stored), NUM_PERM)
+    missing = missing_signatures(project_id)
+    if missing:
+        computed = _signature_rows(_requirement_rows(missing))
+        ids += [row['requirement_id'] for row in computed]
+        sigs = np.concatenate([sigs, np.frombuffer(b''.join(row['signature'] for row in computed),
+                                                   dtype=np.uint32).reshape(len(computed), NUM_PERM)])
+    ids = np.array(ids, dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    return ids[order], sigs[order], len(missing)
+
+
+def init_duplicate_detector(app):
+    """注册签名同步钩子；为已有数据库中缺少签名的需求回填签名"""
+    event.listen(db.session, 'after_flush', _sync_signatures)
+    with app.app_context():
+        project_ids = [row[0] for row in db.session.query(Requirement.project_id).outerjoin(
+            RequirementSignature, RequirementSignature.requirement_id == Requirement.id).filter(
+            db.or_(RequirementSignature.project_id.is_(None),
+                   RequirementSignature.project_id != Requirement.project_id)).distinct()]
+        for project_id in project_ids:
+            count = backfill_signatures(project_id)
+            db.session.commit()
+            logger.info(f"已为项目 {project_id} 回填 {count} 条需求签名")
+
+
+def _titles(ids):
+    titles = {}
+    ids = [int(i) for i in ids]
+    for start in range(0, len(ids), 500):
+        titles.update(db.session.query(Requirement.id, Requirement.title).filter(
+            Requirement.id.in_(ids[start:start + 500])).all())
+    return titles
+
+
+def detect_project(project_id, min_similarity=None, limit=100):
+    """检测项目内的近似重复需求，返回重复组（按组大小降序，每组以ID最小的需求为代表）"""
+    started = time.perf_counter()
+    min_similarity = threshold if min_similarity is None else min_similarity
+    ids, sigs, computed = load_signatures(project_id)
+    groups = clusters(ids, sigs, min_similarity)
+    groups.sort(key=lambda members: (-len(members), ids[members[0]]))
+
+    shown = groups[:limit]
+    titles = _titles(ids[[k for members in shown for k in members]]) if shown else {}
+    result = []
+    for members in shown:
+        scores = similarity(sigs[members], sigs[members[0]])
+        result.append({
+            'representative_id': int(ids[members[0]]),
+            'size': len(members),
+            'members': [{'id': int(ids[k]), 'title': titles.get(int(ids[k])),
+                         'similarity': round(float(score), 4)} for k, score in zip(members, scores)],
+        })
+    return {
+        'threshold': min_similarity,
+        'requirements': int(len(ids)),
+        'signatures_computed': computed,
+        'duplicate_groups': len(groups),
+        'duplicate_requirements': int(sum(len(members) - 1 for members in groups)),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'groups': result,
+    }
+
+
+def find_similar(project_id, text, min_similarity=None, limit=10):
+    """查找与给定文本相似的已有需求（用于新建或导入前检查）"""
+    min_similarity = threshold if min_similarity is None else min_similarity
+    ids, sigs, _ = load_signatures(project_id)
+    query = signatures([text])
+    if not len(ids) or (query == _EMPTY).all():
+        return []
+    candidates = np.flatnonzero((band_keys(sigs) == band_keys(query)).any(axis=1))
+    scores = similarity(sigs[candidates], query[0])
+    keep = scores >= min_similarity
+    candidates, scores = candidates[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')[:limit]
+    titles = _titles(ids[candidates[order]])
+    return [{'id': int(ids[candidates[k]]), 'title': titles.get(int(ids[candidates[k]])),
+             'similarity': round(float(scores[k]), 4)} for k in order]
+
+
+def _band_matches(keys, query_keys):
+    """分段哈希至少一段相同的 (查询下标, 已有下标) 对：每段对已有签名排序后二分查找，
+    一次取出桶内全部成员"""
+    pairs = []
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        left = np.searchsorted(sorted_keys, query_keys[:, band], side='left')
+        right = np.searchsorted(sorted_keys, query_keys[:, band], side='right')
+        counts = right - left
+        if not counts.sum():
+            continue
+        queries = np.repeat(np.arange(len(query_keys)), counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(left, counts)
+        pairs.append(np.stack([queries, order[positions]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def check_new_requirements(project_id, new_ids, min_similarity=None):
+    """检查新导入的需求是否与导入前已有的需求重复（同批导入的需求之间不互相比较）
+
+    每条新需求与分段哈希相同的全部已有需求比较，返回 [{"id", "title", "duplicate_of", "similarity"}, ...]，
+    每个新需求只报告最相似的一条，duplicate_of 一定是导入前已有的需求。
+    """
+    min_similarity = threshold if min_similarity is None else min_similarity
+    ids, sigs, _ = load_signatures(project_id)
+    batch = np.isin(ids, np.array(list(new_ids), dtype=np.int64))
+    nonempty = ~(sigs == _EMPTY).all(axis=1)
+    new_index = np.flatnonzero(batch & nonempty)
+    old_index = np.flatnonzero(~batch & nonempty)
+    if not len(new_index) or not len(old_index):
+        return []
+    pairs = _band_matches(band_keys(sigs[old_index]), band_keys(sigs[new_index]))
+    if not len(pairs):
+        return []
+    newer, older = new_index[pairs[:, 0]], old_index[pairs[:, 1]]
+    scores = similarity(sigs[newer], sigs[older])
+    best = {}
+    for i, j, score in zip(newer, older, scores):
+        req_id = int(ids[i])
+        if score >= min_similarity and (req_id not in best or score > best[req_id][1]):
+            best[req_id] = (int(ids[j]), float(score))
+    titles = _titles(list(best))
+    return [{'id': req_id, 'title': titles.get(req_id), 'duplicate_of': older, 'similarity': round(score, 4)}
+            for req_id, (older, score) in sorted(best.items())]
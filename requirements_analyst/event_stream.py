@@ -0,0 +1,137 @@
+# event_stream.py
+"""项目变更事件的进程内发布/订阅（Server-Sent Events）
+
+每个有订阅者的项目对应一个通道：最近的事件保存在环形缓冲区中，由一个条件变量通知等待者。
+订阅者只记录自己读到的序号，不为每个订阅者建立队列或后台线程；发布事件只是向缓冲区追加
+并唤醒该项目的等待者，与订阅者数量无关，空闲订阅者只在心跳间隔醒来一次。
+事件由change_log模块在事务提交后发布，只通知发生了变化，客户端收到后用变更记录接口
+（/api/projects/<id>/changes）按自己的游标读取具体数据，因此断线重连或事件被挤出缓冲区时
+都不会漏掉数据。每个进程只能收到本进程内提交的写入。
+
+部署要求：打开的事件流在整个连接期间占用一个请求处理单元。生产环境须用serve.py启动
+（gevent协程WSGI服务器，线程库已打补丁，空闲订阅者只占一个协程），订阅者上限取
+[EVENTS] max_subscribers；用开发服务器或其他线程模式的WSGI服务器运行时每个订阅者占用
+一个线程，上限改取较小的 [EVENTS] threaded_max_subscribers，避免事件流占满线程池。
+"""
+import json
+import sys
+import threading
+from collections import deque
+
+DEFAULT_HEARTBEAT_SECONDS = 15
+# 协程服务器（serve.py）下每个进程的订阅者上限
+DEFAULT_MAX_SUBSCRIBERS = 500
+# 线程模式服务器下的订阅者上限，每个订阅者占用一个线程
+DEFAULT_THREADED_MAX_SUBSCRIBERS = 20
+# 每个项目保留的最近事件数，订阅者落后超过该数量时收到reset事件
+BUFFER_SIZE = 256
+# 一次提交中单个项目的事件超过该数量时合并为一个批量事件
+MAX_EVENTS_PER_COMMIT = 100
+# 浏览器断线后重连的等待时间（毫秒）
+RETRY_MS = 3000
+
+
+class Channel:
+    """单个项目的事件通道"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=BUFFER_SIZE)
+        self.seq = 0
+        self.subscribers = 0
+
+    def publish(self, events):
+        with self.condition:
+            for event in events:
+                self.seq += 1
+                self.events.append((self.seq, event))
+            self.condition.notify_all()
+
+    def read(self, after, timeout):
+        """等待序号after之后的事件，返回 (事件列表, 最新序号, 是否有事件已被挤出缓冲区)"""
+        with self.condition:
+            if self.seq <= after:
+                self.condition.wait(timeout)
+            if self.seq <= after:
+                return [], after, False
+            lost = self.events[0][0] > after + 1
+            return [event for seq, event in self.events if seq > after], self.seq, lost
+
+
+class EventBroker:
+    """按项目分发变更事件"""
+
+    def __init__(self, heartbeat=DEFAULT_HEARTBEAT_SECONDS, max_subscribers=DEFAULT_MAX_SUBSCRIBERS):
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def publish(self, project_id, events):
+        """向项目的订阅者发布事件（没有订阅者时直接丢弃）"""
+        channel = self._channels.get(project_id)
+        if channel is None or not events:
+            return
+        if len(events) > MAX_EVENTS_PER_COMMIT:
+            events = [{'action': 'bulk', 'count': len(events)}]
+        channel.publish(events)
+
+    def _acquire(self, project_id):
+        with self._lock:
+            channel = self._channels.get(project_id)
+            if channel is None:
+                channel = self._channels[project_id] = Channel()
+            channel.subscribers += 1
+            self.subscribers += 1
+            return channel
+
+    def _release(self, project_id, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            self.subscribers -= 1
+            if channel.subscribers == 0 and self._channels.get(project_id) is channel:
+                del self._channels[project_id]
+
+    def stream(self, project_id):
+        """返回项目的SSE响应体生成器，订阅者已满时返回None"""
+        if self.subscribers >= self.max_subscribers:
+            return None
+        return self._stream(project_id)
+
+    def _stream(self, project_id):
+        # 在生成器开始执行时才登记订阅，响应未开始发送就被关闭时不会留下计数
+        channel = self._acquire(project_id)
+        try:
+            after = channel.seq
+            yield f'retry: {RETRY_MS}\n\n'
+            while True:
+                events, after, lost = channel.read(after, self.heartbeat)
+                if lost:
+                    yield 'event: reset\ndata: {}\n\n'
+                elif events:
+                    yield ''.join(f'event: change\ndata: {json.dumps(event)}\n\n' for event in events)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            # 客户端断开时写入失败，生成器被关闭
+            self._release(project_id, channel)
+
+
+broker = EventBroker(max_subscribers=DEFAULT_THREADED_MAX_SUBSCRIBERS)
+
+
+def cooperative():
+    """是否运行在gevent协程服务器下（threading已被monkey patch，等待事件时不占用线程）"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def configure(config):
+    """按config.ini的[EVENTS]配置设置心跳间隔和每个进程的订阅者上限（按是否为协程服务器取不同的上限）"""
+    broker.heartbeat = config.getfloat('EVENTS', 'heartbeat_seconds', fallback=DEFAULT_HEARTBEAT_SECONDS)
+    if cooperative():
+        broker.max_subscribers = config.getint('EVENTS', 'max_subscribers', fallback=DEFAULT_MAX_SUBSCRIBERS)
+    else:
+        broker.max_subscribers = config.getint('EVENTS', 'threaded_max_subscribers',
+                                               fallback=DEFAULT_THREADED_MAX_SUBSCRIBERS)
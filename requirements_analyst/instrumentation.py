@@ -0,0 +1,333 @@
+# instrumentation.py
+import os
+import threading
+import time
+
+from flask import (g, request, session, has_request_context, make_response, abort, current_app,
+                   jsonify, send_file)
+from sqlalchemy import event
+
+from query_inspector import QueryInspector
+from slow_log import SlowRequestLog, StackSampler, ProfileStore
+
+# 延迟直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = 'requirements_analyst'
+
+
+class RequestTrace:
+    """单次请求的性能跟踪数据，保存在 flask.g 中"""
+
+    def __init__(self, record_statements=False, inspector=None):
+        self.start_time = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        # 是否记录每条SQL语句（供慢请求日志等使用）
+        self.record_statements = record_statements
+        self.queries = []
+        # N+1检测器及按归一化SQL分组的计数
+        self.inspector = inspector
+        self.statement_groups = {}
+        # 统计采样分析器收集的折叠栈计数
+        self.samples = None
+
+    def add_query(self, statement, parameters, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        if self.record_statements:
+            self.queries.append((statement, parameters, duration))
+        if self.inspector is not None:
+            self.inspector.record(self.statement_groups, statement)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+
+class RouteMetrics:
+    """单个端点的累计指标"""
+
+    __slots__ = ('request_count', 'status_counts', 'bucket_counts', 'latency_sum',
+                 'sql_count', 'sql_time', 'response_bytes')
+
+    def __init__(self, bucket_count):
+        self.request_count = 0
+        self.status_counts = {}
+        self.bucket_counts = [0] * bucket_count
+        self.latency_sum = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """按端点汇总请求数、延迟直方图、SQL统计和响应大小"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, duration, sql_count, sql_time, response_size):
+        key = (endpoint, method)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics(len(self.buckets))
+            metrics.request_count += 1
+            metrics.status_counts[status] = metrics.status_counts.get(status, 0) + 1
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    metrics.bucket_counts[i] += 1
+                    break
+            metrics.latency_sum += duration
+            metrics.sql_count += sql_count
+            metrics.sql_time += sql_time
+            metrics.response_bytes += response_size
+
+    def snapshot(self):
+        """返回当前指标的副本，便于在锁外渲染"""
+        with self._lock:
+            result = {}
+            for key, m in self._routes.items():
+                copy = RouteMetrics(len(self.buckets))
+                copy.request_count = m.request_count
+                copy.status_counts = dict(m.status_counts)
+                copy.bucket_counts = list(m.bucket_counts)
+                copy.latency_sum = m.latency_sum
+                copy.sql_count = m.sql_count
+                copy.sql_time = m.sql_time
+                copy.response_bytes = m.response_bytes
+                result[key] = copy
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render_prometheus(self):
+        """按Prometheus文本格式输出全部指标"""
+        routes = sorted(self.snapshot().items())
+        lines = []
+
+        name = f'{METRIC_PREFIX}_http_requests_total'
+        lines.append(f'# HELP {name} 按端点和状态码统计的请求数')
+        lines.append(f'# TYPE {name} counter')
+        for (endpoint, method), m in routes:
+            for status, count in sorted(m.status_counts.items()):
+                lines.append(f'{name}{{{_labels(endpoint, method)},status="{status}"}} {count}')
+
+        name = f'{METRIC_PREFIX}_http_request_duration_seconds'
+        lines.append(f'# HELP {name} 请求处理延迟')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, method), m in routes:
+            labels = _labels(endpoint, method)
+            cumulative = 0
+            for bound, count in zip(self.buckets, m.bucket_counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {m.request_count}')
+            lines.append(f'{name}_sum{{{labels}}} {m.latency_sum:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {m.request_count}')
+
+        simple_counters = (
+            ('sql_queries_total', '每个端点执行的SQL语句总数', lambda m: str(m.sql_count)),
+            ('sql_duration_seconds_total', '每个端点SQL执行总耗时', lambda m: f'{m.sql_time:.6f}'),
+            ('http_response_bytes_total', '每个端点响应体总字节数', lambda m: str(m.response_bytes)),
+        )
+        for suffix, help_text, getter in simple_counters:
+            name = f'{METRIC_PREFIX}_{suffix}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (endpoint, method), m in routes:
+                lines.append(f'{name}{{{_labels(endpoint, method)}}} {getter(m)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(endpoint, method):
+    endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+    return f'endpoint="{endpoint}",method="{method}"'
+
+
+metrics_registry = MetricsRegistry()
+
+
+def current_trace():
+    """返回当前请求的跟踪对象，不在请求上下文或未启用时返回None"""
+    if not has_request_context():
+        return None
+    return g.get('request_trace')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_trace() is None:
+        return
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    if trace is None:
+        return
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    trace.add_query(statement, parameters, time.perf_counter() - start_times.pop())
+
+
+def _start_trace():
+    extensions = current_app.extensions
+    trace = RequestTrace(record_statements='slow_request_log' in extensions,
+                         inspector=extensions.get('query_inspector'))
+    sampler = extensions.get('stack_sampler')
+    if sampler is not None:
+        trace.samples = sampler.start()
+    g.request_trace = trace
+
+
+def _stop_sampler(exc=None):
+    sampler = current_app.extensions.get('stack_sampler')
+    if sampler is not None:
+        sampler.stop()
+
+
+def _request_context():
+    """慢请求日志中记录的请求信息"""
+    view_args = request.view_args or {}
+    return {
+        'route': request.endpoint or 'unmatched',
+        'path': request.path,
+        'method': request.method,
+        'project_id': view_args.get('project_id'),
+        'user': session.get('user_id')
+    }
+
+
+def _finish_trace(response):
+    trace = g.pop('request_trace', None)
+    if trace is None:
+        return response
+    _stop_sampler()
+    if request.endpoint == 'metrics':
+        return response
+    duration = trace.elapsed
+
+    slow_log = current_app.extensions.get('slow_request_log')
+    if slow_log is not None:
+        context = _request_context()
+        context['status'] = response.status_code
+        slow_log.record_slow_queries(context, trace)
+        if slow_log.is_slow(duration):
+            profile_name = None
+            profile_store = current_app.extensions.get('profile_store')
+            if profile_store is not None and trace.samples and profile_store.should_keep():
+                profile_name = profile_store.save(context['route'], trace.samples)
+            slow_log.record_request(context, trace, duration, profile_name)
+
+    if trace.inspector is not None:
+        trace.inspector.check(trace.statement_groups, request.endpoint or request.path)
+
+    if current_app.config['METRICS_ENABLED']:
+        response_size = response.calculate_content_length() or 0
+        metrics_registry.observe(
+            request.endpoint or 'unmatched',
+            request.method,
+            response.status_code,
+            duration,
+            trace.sql_count,
+            trace.sql_time,
+            response_size
+        )
+    return response
+
+
+def init_instrumentation(app, db, config):
+    """根据config.ini中的[INSTRUMENTATION]配置安装请求与SQL性能埋点
+
+    metrics_enabled 开启 /metrics 指标统计；query_inspection 为 warn 或 raise 时
+    在开发/测试环境中检测N+1查询；slow_request_threshold_ms 大于0时记录慢请求日志，
+    profile_sample_rate 大于0时对每N个慢请求保存一份采样剖析结果。
+    全部未启用时不注册任何钩子，对请求处理没有额外开销。
+    """
+    section = 'INSTRUMENTATION'
+    metrics_enabled = config.getboolean(section, 'metrics_enabled', fallback=False)
+    inspection_mode = config.get(section, 'query_inspection', fallback='off').strip().lower()
+    app.config['METRICS_ENABLED'] = metrics_enabled
+
+    if inspection_mode in ('warn', 'raise'):
+        threshold = config.getint(section, 'n_plus_one_threshold', fallback=5)
+        app.extensions['query_inspector'] = QueryInspector(threshold=threshold, mode=inspection_mode)
+
+    slow_threshold_ms = config.getfloat(section, 'slow_request_threshold_ms', fallback=0)
+    if slow_threshold_ms > 0:
+        app.extensions['slow_request_log'] = SlowRequestLog(
+            config.get(section, 'slow_log_file', fallback=os.path.join(app.instance_path, 'logs', 'slow_requests.log')),
+            slow_threshold_ms,
+            slow_query_ms=config.getfloat(section, 'slow_query_threshold_ms', fallback=0),
+            max_bytes=config.getint(section, 'slow_log_max_bytes', fallback=10 * 1024 * 1024),
+            backup_count=config.getint(section, 'slow_log_backup_count', fallback=5)
+        )
+
+        sample_rate = config.getint(section, 'profile_sample_rate', fallback=0)
+        if sample_rate > 0:
+            app.extensions['stack_sampler'] = StackSampler(
+                interval=config.getfloat(section, 'profile_interval_ms', fallback=5) / 1000.0
+            )
+            app.extensions['profile_store'] = ProfileStore(
+                config.get(section, 'profile_dir', fallback=os.path.join(app.instance_path, 'profiles')),
+                sample_every=sample_rate
+            )
+            admin_users = config.get(section, 'admin_users', fallback='admin')
+            app.config['INSTRUMENTATION_ADMIN_USERS'] = {u.strip() for u in admin_users.split(',') if u.strip()}
+            app.add_url_rule('/admin/profiles', 'list_profiles', list_profiles)
+            app.add_url_rule('/admin/profiles/<name>', 'download_profile', download_profile)
+
+    hooks_needed = (metrics_enabled or 'query_inspector' in app.extensions
+                    or 'slow_request_log' in app.extensions)
+    if not hooks_needed:
+        return
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
+    if 'stack_sampler' in app.extensions:
+        app.teardown_request(_stop_sampler)
+
+    if metrics_enabled:
+        allowed_hosts = config.get(section, 'metrics_allowed_hosts', fallback='127.0.0.1,::1')
+        app.config['METRICS_ALLOWED_HOSTS'] = {h.strip() for h in allowed_hosts.split(',') if h.strip()}
+        app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+
+
+def _require_admin():
+    if session.get('user_id') not in current_app.config['INSTRUMENTATION_ADMIN_USERS']:
+        abort(403)
+
+
+def list_profiles():
+    """列出已保存的慢请求剖析文件（仅管理员）"""
+    _require_admin()
+    return jsonify(current_app.extensions['profile_store'].list_profiles())
+
+
+def download_profile(name):
+    """下载指定的剖析文件（仅管理员）"""
+    _require_admin()
+    path = current_app.extensions['profile_store'].path_for(name)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=name)
+
+
+def metrics_endpoint():
+    """Prometheus指标端点，仅允许本机访问"""
+    if request.remote_addr not in current_app.config['METRICS_ALLOWED_HOSTS']:
+        abort(403)
+    response = make_response(metrics_registry.render_prometheus())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
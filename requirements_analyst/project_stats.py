@@ -0,0 +1,360 @@
+# project_stats.py
+"""项目统计物化表
+
+project_stats 中每个项目每个统计项一行（dimension + key），需求新增、修改、删除时
+由ORM事件按差值增量更新，仪表盘读取时只需读取该项目的几十行数据。
+ORM批量写入（db.update/db.insert）无法得到旧值，执行后直接重算受影响的项目；
+定期对账任务从需求表重新统计并报告、修正偏差。
+
+用法:
+    python project_stats.py --reconcile              # 重算全部项目并修正偏差
+    python project_stats.py --reconcile --dry-run    # 只报告偏差
+"""
+import argparse
+import logging
+import sys
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, inspect
+
+import event_stream
+from database import db
+from models import Requirement, ProjectStat
+
+logger = logging.getLogger(__name__)
+
+# 影响统计结果的需求字段
+TRACKED_FIELDS = ('project_id', 'status', 'priority', 'category', 'kano_category', 'vsm_process_steps',
+                  'smart_specific', 'standard_time', 'estimated_roi', 'actual_roi')
+COUNT_DIMENSIONS = ('status', 'priority', 'category', 'kano_category')
+COMPLETION_KEYS = ('kano', 'vsm', 'smart', 'wfmt', 'value', 'actual_value')
+
+
+def _key(value):
+    return '' if value is None else str(value)
+
+
+def contributions(values):
+    """单个需求对各统计项的贡献 {(dimension, key): 值}"""
+    result = {('total', ''): 1}
+    for dimension in COUNT_DIMENSIONS:
+        result[(dimension, _key(values[dimension]))] = 1
+    completion = {
+        'kano': bool(values['kano_category']),
+        'vsm': bool(values['vsm_process_steps']),
+        'smart': bool(values['smart_specific']),
+        'wfmt': values['standard_time'] is not None,
+        'value': values['estimated_roi'] is not None,
+        # actual_roi默认为0，大于0才表示已评估实际价值（与accuracy_engine一致）
+        'actual_value': (values['actual_roi'] or 0) > 0,
+    }
+    for key, done in completion.items():
+        if done:
+            result[('completion', key)] = 1
+    result[('sum', 'estimated_roi')] = values['estimated_roi'] or 0
+    result[('sum', 'actual_roi')] = values['actual_roi'] or 0
+    return result
+
+
+def _add(deltas, project_id, values, sign):
+    if project_id is None:
+        return
+    for (dimension, key), value in contributions(values).items():
+        deltas[(project_id, dimension, key)] += sign * value
+
+
+def apply_deltas(connection, deltas):
+    """按差值更新统计行，行不存在时插入"""
+    table = ProjectStat.__table__
+    for (project_id, dimension, key), delta in deltas.items():
+        if not delta:
+            continue
+        where = (table.c.project_id == project_id) & (table.c.dimension == dimension) & (table.c.key == key)
+        result = connection.execute(table.update().where(where).values(value=table.c.value + delta))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(project_id=project_id, dimension=dimension, key=key, value=delta))
+
+
+def compute_stats(connection, project_ids=None):
+    """从需求表重新统计，返回 {project_id: {(dimension, key): 值}}"""
+    table = Requirement.__table__
+    c = table.c
+
+    def scoped(query):
+        return query.where(c.project_id.in_(project_ids)) if project_ids is not None else query
+
+    stats = defaultdict(dict)
+    for dimension in COUNT_DIMENSIONS:
+        column = c[dimension]
+        query = scoped(db.select(c.project_id, column, db.func.count()).group_by(c.project_id, column))
+        for project_id, key, count in connection.execute(query):
+            stats[project_id][(dimension, _key(key))] = count
+
+    def flag(condition):
+        return db.func.sum(db.case((condition, 1), else_=0))
+
+    query = scoped(db.select(
+        c.project_id,
+        db.func.count(),
+        flag(db.func.coalesce(c.kano_category, '') != ''),
+        flag(db.func.coalesce(c.vsm_process_steps, '') != ''),
+        flag(db.func.coalesce(c.smart_specific, '') != ''),
+        flag(c.standard_time.isnot(None)),
+        flag(c.estimated_roi.isnot(None)),
+        flag(c.actual_roi > 0),
+        db.func.coalesce(db.func.sum(c.estimated_roi), 0),
+        db.func.coalesce(db.func.sum(c.actual_roi), 0),
+    ).group_by(c.project_id))
+    for row in connection.execute(query):
+        project_id = row[0]
+        stats[project_id][('total', '')] = row[1]
+        for key, count in zip(COMPLETION_KEYS, row[2:8]):
+            if count:
+                stats[project_id][('completion', key)] = count
+        stats[project_id][('sum', 'estimated_roi')] = row[8]
+        stats[project_id][('sum', 'actual_roi')] = row[9]
+    return stats
+
+
+def write_stats(connection, project_id, values):
+    table = ProjectStat.__table__
+    connection.execute(table.delete().where(table.c.project_id == project_id))
+    rows = [{'project_id': project_id, 'dimension': dimension, 'key': key, 'value': value}
+            for (dimension, key), value in values.items()]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def stored_stats(connection, project_ids=None):
+    table = ProjectStat.__table__
+    query = db.select(table.c.project_id, table.c.dimension, table.c.key, table.c.value)
+    if project_ids is not None:
+        query = query.where(table.c.project_id.in_(project_ids))
+    stats = defaultdict(dict)
+    for project_id, dimension, key, value in connection.execute(query):
+        stats[project_id][(dimension, key)] = value
+    return stats
+
+
+def reconcile(project_ids=None, fix=True):
+    """重新统计并与物化表比较，返回偏差列表；fix为True时用重算结果覆盖"""
+    connection = db.session.connection()
+    actual = compute_stats(connection, project_ids)
+    stored = stored_stats(connection, project_ids)
+    drift = []
+    for project_id in sorted(set(actual) | set(stored)):
+        expected, current = actual.get(project_id, {}), stored.get(project_id, {})
+        found = len(drift)
+        for dimension, key in sorted(set(expected) | set(current)):
+            a, b = expected.get((dimension, key), 0), current.get((dimension, key), 0)
+            if abs(a - b) > 1e-6:
+                drift.append({'project_id': project_id, 'dimension': dimension, 'key': key,
+                              'stored': b, 'actual': a})
+        if fix and len(drift) > found:
+            write_stats(connection, project_id, expected)
+    if fix:
+        db.session.commit()
+    return drift
+
+
+def get_project_stats(project_id):
+    """读取项目统计 {dimension: {key: 值}}，计数为0的分组不返回，空值分组的键为''"""
+    table = ProjectStat.__table__
+    rows = db.session.execute(db.select(table.c.dimension, table.c.key, table.c.value).where(
+        table.c.project_id == project_id)).all()
+    stats = {'total': 0, 'completion': {key: 0 for key in COMPLETION_KEYS},
+             'sum': {'estimated_roi': 0.0, 'actual_roi': 0.0}}
+    stats.update({dimension: {} for dimension in COUNT_DIMENSIONS})
+    for dimension, key, value in rows:
+        if dimension == 'total':
+            stats['total'] = int(value)
+        elif dimension == 'sum':
+            stats['sum'][key] = value
+        elif value:
+            stats[dimension][key] = int(value)
+    return stats
+
+
+def _old_values(obj, state):
+    """从属性历史中取出flush前的字段值，历史不完整时返回None"""
+    values = {}
+    for field in TRACKED_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+        elif history.unchanged:
+            values[field] = history.unchanged[0]
+        elif history.added:
+            return None
+        else:
+            values[field] = getattr(obj, field)
+    return values
+
+
+def _current_values(obj):
+    return {field: getattr(obj, field) for field in TRACKED_FIELDS}
+
+
+def _track_flush(session, flush_context):
+    """按本次flush中需求的增删改计算统计差值"""
+    deltas = defaultdict(float)
+    recompute = set()
+    for obj in session.new:
+        if isinstance(obj, Requirement):
+            _add(deltas, obj.project_id, _current_values(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Requirement):
+            _add(deltas, obj.project_id, _current_values(obj), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Requirement):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in TRACKED_FIELDS):
+            continue
+        old = _old_values(obj, state)
+        if old is None:
+            recompute.update(p for p in (obj.project_id,) if p is not None)
+            continue
+        _add(deltas, old['project_id'], old, -1)
+        _add(deltas, obj.project_id, _current_values(obj), 1)
+
+    if deltas or recompute:
+        connection = session.connection()
+        apply_deltas(connection, {k: v for k, v in deltas.items() if k[0] not in recompute})
+        _recompute(connection, recompute)
+
+
+def _recompute(connection, project_ids):
+    if not project_ids:
+        return
+    project_ids = sorted(project_ids)
+    actual = compute_stats(connection, project_ids)
+    for project_id in project_ids:
+        write_stats(connection, project_id, actual.get(project_id, {}))
+
+
+def _track_bulk(orm_execute_state):
+    """ORM批量写入需求后重算受影响的项目"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_insert or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Requirement or \
+            orm_execute_state.statement.table.name != Requirement.__tablename__:
+        return None
+
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+    session = orm_execute_state.session
+    connection = session.connection()
+    table = Requirement.__table__
+    if orm_execute_state.is_insert and rows and all('project_id' in row for row in rows):
+        project_ids = {row['project_id'] for row in rows}
+    elif rows and all('id' in row for row in rows):
+        ids = [row['id'] for row in rows]
+        project_ids = set()
+        for start in range(0, len(ids), 500):
+            project_ids.update(connection.execute(db.select(table.c.project_id).where(
+                table.c.id.in_(ids[start:start + 500])).distinct()).scalars())
+    else:
+        # 条件更新/删除无法确定影响范围，执行前后都按全部项目处理
+        project_ids = None
+
+    if project_ids is None:
+        project_ids = set(connection.execute(db.select(table.c.project_id).distinct()).scalars())
+        result = orm_execute_state.invoke_statement()
+        project_ids.update(connection.execute(db.select(table.c.project_id).distinct()).scalars())
+    else:
+        result = orm_execute_state.invoke_statement()
+    _recompute(connection, project_ids)
+    return result
+
+
+class Reconciler:
+    """后台定期对账线程
+
+    gevent服务器（serve.py）下定时线程是协程，对账本身交给hub的线程池在系统线程中执行，
+    重新统计期间不占用处理请求的hub。
+    """
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='project-stats-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if event_stream.cooperative():
+                    import gevent
+                    gevent.get_hub().threadpool.apply(self._reconcile)
+                else:
+                    self._reconcile()
+            except Exception as e:
+                logger.error(f"项目统计对账失败: {str(e)}")
+
+    def _reconcile(self):
+        with self.app.app_context():
+            drift = reconcile()
+            if drift:
+                logger.warning(f"项目统计存在 {len(drift)} 处偏差，已按需求表重算: {drift[:10]}")
+
+
+def init_project_stats(app, config):
+    """注册增量统计钩子，首次启用时填充统计表，并按[STATS]配置准备定期对账
+
+    对账线程不在这里启动：数据生成、基准测试和测试等脚本也会导入app，只有提供服务的进程
+    才通过start_reconciler启动。
+    """
+    event.listen(db.session, 'after_flush', _track_flush)
+    event.listen(db.session, 'do_orm_execute', _track_bulk)
+
+    with app.app_context():
+        if db.session.query(ProjectStat.id).first() is None and db.session.query(Requirement.id).first() is not None:
+            reconcile()
+
+    interval = config.getfloat('STATS', 'reconcile_interval_minutes', fallback=0)
+    if interval > 0:
+        app.extensions['stats_reconciler'] = Reconciler(app, interval * 60)
+
+
+def start_reconciler(app):
+    """在提供服务的进程中启动定期对账线程（[STATS]未启用对账时不做任何事）"""
+    reconciler = app.extensions.get('stats_reconciler')
+    if reconciler is not None:
+        reconciler.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='项目统计对账')
+    parser.add_argument('--reconcile', action='store_true', help='从需求表重新统计并修正偏差')
+    parser.add_argument('--project', type=int, action='append', help='只处理指定项目')
+    parser.add_argument('--dry-run', action='store_true', help='只报告偏差，不修改统计表')
+    args = parser.parse_args(argv)
+    if not args.reconcile:
+        parser.print_help()
+        return 0
+
+    from app import app
+
+    with app.app_context():
+        drift = reconcile(args.project, fix=not args.dry_run)
+    for item in drift:
+        print(f"项目 {item['project_id']} {item['dimension']}/{item['key'] or '-'}: "
+              f"统计表 {item['stored']}，实际 {item['actual']}")
+    print(f'共 {len(drift)} 处偏差' + ('' if args.dry_run else '，已修正'))
+    return 1 if drift and args.dry_run else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
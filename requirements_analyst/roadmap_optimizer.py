@@ -0,0 +1,229 @@
+# roadmap_optimizer.py
+import time
+from datetime import datetime
+
+import numpy as np
+
+# 已完成的需求视为依赖已满足，不再参与规划
+DONE_STATUSES = ('completed', 'implemented', 'validated')
+EXCLUDED_STATUSES = DONE_STATUSES + ('rejected',)
+
+# 动态规划的状态表规模上限（候选需求数×容量），超过时使用贪心算法
+DP_LIMIT = 5000000
+
+
+def knapsack_dp(weights, values, capacity):
+    """0/1背包动态规划，返回选中标记数组
+
+    按容量维度向量化：每个物品只做一次数组移位和比较，keep 记录各容量下是否选中该物品，
+    最后从最优容量回溯得到选择结果。
+    """
+    n = len(weights)
+    dp = np.zeros(capacity + 1)
+    keep = np.zeros((n, capacity + 1), dtype=bool)
+    for i in range(n):
+        w = weights[i]
+        if w > capacity:
+            continue
+        candidate = dp[:capacity + 1 - w] + values[i]
+        better = candidate > dp[w:]
+        keep[i, w:] = better
+        dp[w:] = np.where(better, candidate, dp[w:])
+
+    selected = np.zeros(n, dtype=bool)
+    c = int(np.argmax(dp))
+    for i in range(n - 1, -1, -1):
+        if keep[i, c]:
+            selected[i] = True
+            c -= weights[i]
+    return selected
+
+
+def knapsack_greedy(weights, values, capacity):
+    """按价值密度（线性松弛的最优顺序）贪心装入，返回 (选中标记, 线性松弛上界)"""
+    n = len(weights)
+    density = np.where(weights > 0, values / np.maximum(weights, 1), np.inf)
+    order = np.argsort(-density, kind='stable')
+    selected = np.zeros(n, dtype=bool)
+    remaining = capacity
+    bound = 0.0
+    fractional_done = False
+    for i in order:
+        w = weights[i]
+        if w <= remaining:
+            selected[i] = True
+            remaining -= w
+            if not fractional_done:
+                bound += values[i]
+        elif not fractional_done:
+            bound += values[i] * remaining / w
+            fractional_done = True
+    return selected, float(bound)
+
+
+def select(weights, values, capacity, method='auto'):
+    """在给定容量下选择价值最大的一组需求，返回 (选中标记, 使用的方法)"""
+    weights = np.asarray(weights, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    if method == 'dp' or (method == 'auto' and len(weights) * (capacity + 1) <= DP_LIMIT):
+        return knapsack_dp(weights, values, capacity), 'dp'
+    return knapsack_greedy(weights, values, capacity)[0], 'greedy'
+
+
+def optimize(items, milestones, method='auto'):
+    """按截止日期顺序依次为各里程碑选择需求
+
+    items 为 [{"id", "title", "effort", "value", "depends_on", "due_date", "pinned"}, ...]，
+    milestones 为按截止日期排序的 [{"id", "title", "deadline", "capacity"}, ...]。
+    pinned 不为None的需求保留原有分配、不参与规划，值为其所在里程碑在milestones中的下标
+    （-1表示在已完成的里程碑中），只用于判断依赖它的需求能否排入。
+    需求只有在其依赖都已完成或已排入更早（或同一）里程碑后才能排入；
+    有期望完成日期的需求只能排入截止日期不晚于该日期的里程碑。
+    """
+    started = time.perf_counter()
+    by_id = {item['id']: item for item in items}
+    pinned = {item['id']: item['pinned'] for item in items if item.get('pinned') is not None}
+    scheduled = dict(pinned)
+    used_methods = set()
+    plan = []
+
+    for k, milestone in enumerate(milestones):
+        capacity = int(milestone['capacity'])
+        chosen = []
+        considered = set()
+        # 容量为0的里程碑不参与规划
+        while milestone['capacity'] > 0:
+            eligible = [item for item in items
+                        if item['id'] not in scheduled and item['id'] not in considered
+                        and item['value'] > 0 and _due_ok(item, milestone)
+                        and all(dep not in by_id or scheduled.get(dep, k + 1) <= k for dep in item['depends_on'])]
+            if not eligible:
+                break
+            considered.update(item['id'] for item in eligible)
+            selected, used = select([item['effort'] for item in eligible],
+                                    [item['value'] for item in eligible], capacity, method)
+            used_methods.add(used)
+            picked = [item for item, keep in zip(eligible, selected) if keep]
+            if not picked:
+                break
+            for item in picked:
+                scheduled[item['id']] = k
+                capacity -= item['effort']
+            chosen.extend(picked)
+
+        plan.append({
+            'id': milestone['id'],
+            'title': milestone['title'],
+            'deadline': milestone['deadline'].strftime('%Y-%m-%d') if milestone['deadline'] else None,
+            'capacity': int(milestone['capacity']),
+            'used_effort': int(sum(item['effort'] for item in chosen)),
+            'total_value': round(sum(item['value'] for item in chosen), 4),
+            'requirements': [{'id': item['id'], 'title': item['title'], 'effort': item['effort'],
+                              'estimated_roi': round(item['value'], 4)} for item in chosen],
+        })
+
+    unscheduled = []
+    for item in items:
+        if item['id'] in scheduled:
+            continue
+        if any(dep in by_id and dep not in scheduled for dep in item['depends_on']):
+            reason = 'dependency'
+        elif not any(_due_ok(item, m) for m in milestones):
+            reason = 'due_date'
+        else:
+            reason = 'capacity'
+        unscheduled.append({'id': item['id'], 'title': item['title'], 'reason': reason})
+
+    return {
+        'method': '+'.join(sorted(used_methods)) or method,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'total_value': round(sum(m['total_value'] for m in plan), 4),
+        'total_effort': sum(m['used_effort'] for m in plan),
+        'scheduled_requirements': len(scheduled) - len(pinned),
+        'pinned_requirements': len(pinned),
+        'milestones': plan,
+        'unscheduled': unscheduled,
+    }
+
+
+def _due_ok(item, milestone):
+    if not item['due_date']:
+        return True
+    return milestone['deadline'] is not None and milestone['deadline'] <= item['due_date']
+
+
+def load_items(db, Requirement, project_id, prerequisites=None):
+    """读取项目内待规划的需求
+
+    prerequisites 为依赖边 {需求ID: [依赖的需求ID]}（见dependency_graph.prerequisites）。
+    依赖的需求已完成、已拒绝或不在本项目中时视为已满足。
+    """
+    rows = db.session.query(
+        Requirement.id, Requirement.title, Requirement.status, Requirement.estimated_effort,
+        Requirement.estimated_roi, Requirement.expected_completion_date, Requirement.assigned_milestone_id
+    ).filter(Requirement.project_id == project_id).order_by(Requirement.id).all()
+
+    done = {row.id for row in rows if row.status in DONE_STATUSES}
+    items = []
+    for row in rows:
+        if row.status in EXCLUDED_STATUSES:
+            continue
+        depends_on = prerequisites.get(row.id, [])
+        items.append({
+            'id': row.id,
+            'title': row.title,
+            'effort': max(int(row.estimated_effort or 0), 0),
+            'value': float(row.estimated_roi or 0),
+            'depends_on': [dep for dep in depends_on if dep not in done and dep != row.id],
+            'due_date': row.expected_completion_date,
+            'milestone_id': row.assigned_milestone_id,
+        })
+    return items
+
+
+def optimize_project(db, Requirement, Milestone, project_id, capacities, default_capacity=0,
+                     method='auto', apply=False, prerequisites=None):
+    """为项目生成里程碑规划方案，apply为True时写回需求的assigned_milestone_id和里程碑需求列表
+
+    只规划容量大于0的未完成里程碑：未分配的需求和已分配到这些里程碑的需求参与规划，
+    手工分配到已完成里程碑或容量为0的里程碑的需求保留原有分配，写回时也不修改。
+    """
+    all_milestones = Milestone.query.filter_by(project_id=project_id).all()
+    completed = {m.id for m in all_milestones if m.status == 'completed'}
+    milestones = [m for m in all_milestones if m.status != 'completed']
+    # 截止日期为空的里程碑排在最后
+    milestones.sort(key=lambda m: (m.deadline is None, m.deadline or datetime.max.date(), m.id))
+    targets = [{
+        'id': m.id,
+        'title': m.title,
+        'deadline': m.deadline,
+        'capacity': capacities.get(m.id, default_capacity),
+    } for m in milestones]
+    positions = {target['id']: k for k, target in enumerate(targets) if target['capacity'] <= 0}
+    positions.update((milestone_id, -1) for milestone_id in completed)
+
+    items = load_items(db, Requirement, project_id, prerequisites or {})
+    for item in items:
+        item['pinned'] = positions.get(item['milestone_id'])
+    result = optimize(items, targets, method)
+
+    if apply:
+        assignment = {req['id']: m['id'] for m in result['milestones'] for req in m['requirements']}
+        updates = [{'id': item['id'], 'assigned_milestone_id': assignment.get(item['id'])}
+                   for item in items if item['pinned'] is None]
+        if updates:
+            db.session.execute(db.update(Requirement), updates)
+            db.session.flush()
+
+        # 里程碑的需求列表与assigned_milestone_id保持一致
+        grouped = {m.id: [] for m in all_milestones}
+        for req_id, milestone_id in db.session.query(Requirement.id, Requirement.assigned_milestone_id).filter(
+                Requirement.project_id == project_id, Requirement.assigned_milestone_id.isnot(None)):
+            if milestone_id in grouped:
+                grouped[milestone_id].append(req_id)
+        if grouped:
+            db.session.execute(db.update(Milestone), [
+                {'id': milestone_id, 'requirements': ','.join(map(str, sorted(ids)))}
+                for milestone_id, ids in grouped.items()])
+        db.session.commit()
+    return result
@@ -0,0 +1,145 @@
+# roi_engine.py
+import numpy as np
+
+PERCENTILES = (10, 50, 90)
+
+# 没有足够历史数据时使用的默认误差分布（实际值/预估值的三角分布参数）
+DEFAULT_VALUE_FACTOR = (0.7, 1.0, 1.2)
+DEFAULT_EFFORT_FACTOR = (0.8, 1.0, 1.5)
+MIN_HISTORY = 5
+MIN_SPREAD = 0.05
+
+# 组合汇总逐次抽样的最大样本数（需求数×试验次数），超过时改用正态近似
+EXACT_PORTFOLIO_BUDGET = 5000000
+_CHUNK_SAMPLES = 1000000
+
+
+def _triangular_params(ratios):
+    """用历史误差比的P10/P50/P90作为三角分布的下限/众数/上限"""
+    left, mode, right = np.percentile(ratios, PERCENTILES)
+    if right - left < MIN_SPREAD:
+        left, right = mode - MIN_SPREAD, mode + MIN_SPREAD
+    left = max(left, 0.0)
+    return float(left), float(min(max(mode, left), right)), float(right)
+
+
+def calibrate(history):
+    """根据历史 预估/实际 数据标定价值和工作量的误差分布
+
+    history 为 [(预估价值合计, 预估工作量, 实际价值合计, 实际工作量), ...]，
+    只使用预估和实际工作量、价值都大于0的记录。
+    """
+    data = np.asarray(history, dtype=float).reshape(-1, 4)
+    data = data[(data > 0).all(axis=1)]
+    if len(data) < MIN_HISTORY:
+        return {
+            'source': 'default',
+            'samples': int(len(data)),
+            'value': dict(zip(('left', 'mode', 'right'), DEFAULT_VALUE_FACTOR)),
+            'effort': dict(zip(('left', 'mode', 'right'), DEFAULT_EFFORT_FACTOR)),
+        }
+    value_ratio = data[:, 2] / data[:, 0]
+    effort_ratio = data[:, 3] / data[:, 1]
+    return {
+        'source': 'history',
+        'samples': int(len(data)),
+        'value': dict(zip(('left', 'mode', 'right'), _triangular_params(value_ratio))),
+        'effort': dict(zip(('left', 'mode', 'right'), _triangular_params(effort_ratio))),
+    }
+
+
+def _draw(rng, params, size):
+    return rng.triangular(params['left'], params['mode'], params['right'], size=size).astype(np.float32)
+
+
+def _percentiles(samples):
+    return dict(zip(('p10', 'p50', 'p90'), (round(float(v), 4) for v in np.percentile(samples, PERCENTILES))))
+
+
+def simulate(values, efforts, calibration, trials=10000, seed=None):
+    """对一组需求做ROI蒙特卡洛模拟
+
+    每个需求的实际价值 = 预估价值 × 价值误差系数，实际工作量 = 预估工作量 × 工作量误差系数，
+    误差系数按标定的三角分布独立抽样。由于误差系数与需求无关，单个需求的ROI分位数等于
+    预估ROI乘以 价值系数/工作量系数 的分位数，因此只需抽样一次系数即可得到全部需求的
+    P10/P50/P90；组合汇总需要逐需求抽样，需求数×试验次数较小时分块精确抽样，
+    较大时按中心极限定理用正态分布近似各次试验的价值和工作量合计。
+    """
+    rng = np.random.default_rng(seed)
+    values = np.asarray(values, dtype=np.float32)
+    efforts = np.asarray(efforts, dtype=np.float32)
+    n = len(values)
+
+    value_factor = _draw(rng, calibration['value'], trials)
+    effort_factor = _draw(rng, calibration['effort'], trials)
+    ratio = value_factor / effort_factor
+    ratio_quantiles = np.percentile(ratio, PERCENTILES)
+
+    estimated_roi = np.divide(values, efforts, out=np.zeros(n, dtype=np.float32), where=efforts > 0)
+    roi_quantiles = np.outer(estimated_roi, ratio_quantiles)
+    roi_mean = estimated_roi * float(ratio.mean())
+
+    if n * trials <= EXACT_PORTFOLIO_BUDGET:
+        total_value = np.zeros(trials, dtype=np.float32)
+        total_effort = np.zeros(trials, dtype=np.float32)
+        chunk = max(1, _CHUNK_SAMPLES // trials)
+        for start in range(0, n, chunk):
+            stop = min(n, start + chunk)
+            total_value += values[start:stop] @ _draw(rng, calibration['value'], (stop - start, trials))
+            total_effort += efforts[start:stop] @ _draw(rng, calibration['effort'], (stop - start, trials))
+        method = 'exact'
+    else:
+        total_value = rng.normal(values.sum() * value_factor.mean(),
+                                 np.sqrt((values ** 2).sum()) * value_factor.std(), trials)
+        total_effort = rng.normal(efforts.sum() * effort_factor.mean(),
+                                  np.sqrt((efforts ** 2).sum()) * effort_factor.std(), trials)
+        method = 'normal_approximation'
+
+    portfolio_roi = np.divide(total_value, total_effort, out=np.zeros(trials), where=total_effort > 0)
+    portfolio = {
+        'method': method,
+        'requirements': n,
+        'estimated_value': round(float(values.sum()), 2),
+        'estimated_effort': round(float(efforts.sum()), 2),
+        'total_value': _percentiles(total_value),
+        'total_effort': _percentiles(total_effort),
+        'roi': _percentiles(portfolio_roi),
+        'roi_mean': round(float(portfolio_roi.mean()), 4),
+    }
+    return estimated_roi, roi_quantiles, roi_mean, portfolio
+
+
+def simulate_project(db, Requirement, project_id, trials=10000, seed=None):
+    """按项目历史误差标定后模拟项目内所有需求的ROI分布
+
+    项目内历史记录不足时使用全部项目的历史记录，仍不足时使用默认分布。
+    """
+    estimated_value = (Requirement.estimated_business_value + Requirement.estimated_user_value +
+                       Requirement.estimated_technical_value)
+    actual_value = (Requirement.actual_business_value + Requirement.actual_user_value +
+                    Requirement.actual_technical_value)
+    history_query = db.session.query(estimated_value, Requirement.estimated_effort,
+                                     actual_value, Requirement.actual_effort).filter(Requirement.actual_effort > 0)
+
+    calibration = calibrate(history_query.filter(Requirement.project_id == project_id).all())
+    if calibration['source'] == 'default':
+        calibration = calibrate(history_query.all())
+        if calibration['source'] == 'history':
+            calibration['source'] = 'all_projects'
+
+    rows = db.session.query(Requirement.id, Requirement.title, estimated_value, Requirement.estimated_effort).filter(
+        Requirement.project_id == project_id, Requirement.estimated_effort > 0).order_by(Requirement.id).all()
+    values = [row[2] or 0 for row in rows]
+    efforts = [row[3] for row in rows]
+    estimated_roi, quantiles, mean, portfolio = simulate(values, efforts, calibration, trials, seed)
+
+    results = [{
+        'requirement_id': row[0],
+        'title': row[1],
+        'estimated_roi': round(float(estimated_roi[i]), 4),
+        'roi_mean': round(float(mean[i]), 4),
+        'p10': round(float(quantiles[i, 0]), 4),
+        'p50': round(float(quantiles[i, 1]), 4),
+        'p90': round(float(quantiles[i, 2]), 4),
+    } for i, row in enumerate(rows)]
+    return calibration, portfolio, results
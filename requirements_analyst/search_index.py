@@ -0,0 +1,241 @@
+# search_index.py
+import html
+import logging
+import re
+import sqlite3
+
+from database import db
+from models import Requirement
+
+logger = logging.getLogger(__name__)
+
+# 参与检索的字段：标题、九要素、验收标准，以及合并为一列的各类分析说明
+INDEXED_FIELDS = ('title', 'scenario', 'problem', 'current_solution', 'goal', 'expected_solution',
+                  'value', 'other_info', 'acceptance_criteria')
+NOTE_FIELDS = ('vsm_improvement_actions', 'user_feedback', 'competitor_analysis', 'current_state_analysis',
+               'risk_assessment', 'cost_benefit_analysis', 'alternative_solutions', 'success_metrics')
+SEARCH_COLUMNS = INDEXED_FIELDS + ('notes',)
+
+# bm25列权重，与 project_key + SEARCH_COLUMNS 一一对应（标题命中权重最高）
+BM25_WEIGHTS = (0, 10.0, 2.0, 2.0, 1.0, 2.0, 1.0, 1.0, 0.5, 1.0, 0.5)
+
+MAX_PER_PAGE = 100
+SNIPPET_CHARS = 60
+
+# trigram分词器只能直接匹配不少于3个字符的词。索引时每列末尾补两个空格，使任何1~2个字符的词
+# 都是某个trigram的开头，检索短词时从词表中按前缀取出这些trigram，以OR方式匹配
+TRIGRAM_LENGTH = 3
+PAD = '  '
+# 短词展开的trigram数超过该值时（常见单字），该词改用LIKE过滤
+MAX_EXPANSION = 1000
+
+_COLUMNS_SQL = ', '.join(('rowid', 'project_key') + SEARCH_COLUMNS)
+
+
+def project_key(project_id):
+    """项目过滤词：项目ID作为索引列写成 #ID#，检索时与检索词一起在索引内求交集，
+    避免逐行读取项目ID（至少3个字符，满足trigram分词）"""
+    return f'#{int(project_id)}#'
+
+
+def _values_sql(row):
+    """按 rowid, project_key, SEARCH_COLUMNS 顺序取需求行的字段，分析说明以空格合并"""
+    notes = " || ' ' || ".join(f"coalesce({row}.{field}, '')" for field in NOTE_FIELDS)
+    texts = [f"coalesce({row}.{field}, '')" for field in INDEXED_FIELDS] + [notes]
+    return ', '.join([f'{row}.id', f"'#' || {row}.project_id || '#'"] + [f"{text} || '{PAD}'" for text in texts])
+
+
+# 全文索引表、词表及同步触发器（语句可重复执行）；update触发器只在检索字段或项目变化时重建该行索引
+SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts USING fts5("
+    f"project_key, {', '.join(SEARCH_COLUMNS)}, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts_vocab USING fts5vocab(requirements_fts, 'row')",
+    f"CREATE TRIGGER IF NOT EXISTS requirements_fts_insert AFTER INSERT ON requirements BEGIN "
+    f"INSERT INTO requirements_fts({_COLUMNS_SQL}) VALUES ({_values_sql('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS requirements_fts_delete AFTER DELETE ON requirements BEGIN "
+    "DELETE FROM requirements_fts WHERE rowid = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS requirements_fts_update AFTER UPDATE OF "
+    f"{', '.join(('project_id',) + INDEXED_FIELDS + NOTE_FIELDS)} ON requirements BEGIN "
+    f"DELETE FROM requirements_fts WHERE rowid = old.id; "
+    f"INSERT INTO requirements_fts({_COLUMNS_SQL}) VALUES ({_values_sql('new')}); END",
+]
+
+_fts_enabled = False
+
+
+def fts_available(engine):
+    """数据库为SQLite且支持FTS5 trigram分词器（SQLite 3.34+）时返回True"""
+    if engine.dialect.name != 'sqlite':
+        return False
+    return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def rebuild_index():
+    """按需求表重建全文索引，返回索引的需求数"""
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DELETE FROM requirements_fts')
+        connection.exec_driver_sql(f"INSERT INTO requirements_fts({_COLUMNS_SQL}) "
+                                   f"SELECT {_values_sql('requirements')} FROM requirements")
+        return connection.exec_driver_sql('SELECT count(*) FROM requirements_fts').scalar()
+
+
+def init_search_index(app):
+    """创建全文索引表和同步触发器；索引行数与需求表不一致时（如首次启用）重建索引"""
+    global _fts_enabled
+    with app.app_context():
+        _fts_enabled = fts_available(db.engine)
+        if not _fts_enabled:
+            logger.warning("当前数据库不支持FTS5 trigram分词器，需求检索将使用LIKE查询")
+            return
+        with db.engine.begin() as connection:
+            for statement in SCHEMA:
+                connection.exec_driver_sql(statement)
+            indexed = connection.exec_driver_sql('SELECT count(*) FROM requirements_fts').scalar()
+            total = connection.exec_driver_sql('SELECT count(*) FROM requirements').scalar()
+        if indexed != total:
+            logger.info(f"已重建需求全文索引，共 {rebuild_index()} 条需求")
+
+
+def _phrase(term):
+    # FTS5字符串短语，双引号转义
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def expand_short_term(term):
+    """取出以短词开头的全部trigram，超过MAX_EXPANSION个时返回None"""
+    prefix = term.lower()
+    terms = db.session.execute(db.text(
+        "SELECT term FROM requirements_fts_vocab WHERE term >= :prefix AND term < :upper LIMIT :limit"),
+        {'prefix': prefix, 'upper': prefix + '\U0010ffff', 'limit': MAX_EXPANSION + 1}).scalars().all()
+    return None if len(terms) > MAX_EXPANSION else terms
+
+
+def highlight(text, terms):
+    """HTML转义后用<mark>标出命中的检索词"""
+    escaped = html.escape(text or '')
+    if not terms or not escaped:
+        return escaped
+    pattern = re.compile('|'.join(re.escape(html.escape(term)) for term in sorted(terms, key=len, reverse=True)),
+                         re.IGNORECASE)
+    return pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', escaped)
+
+
+def snippet(text, terms, width=SNIPPET_CHARS):
+    """截取第一个命中词附近的文本并高亮"""
+    text = text or ''
+    lowered = text.lower()
+    hits = [lowered.find(term.lower()) for term in terms]
+    hits = [pos for pos in hits if pos >= 0]
+    start = max(min(hits) - width // 3, 0) if hits else 0
+    piece = text[start:start + width]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + highlight(piece, terms) + suffix
+
+
+def _build_result(row, terms):
+    fields = dict(zip(SEARCH_COLUMNS, row[2:]))
+    lowered = [term.lower() for term in terms]
+    matched = [column for column in SEARCH_COLUMNS
+               if fields[column] and any(term in fields[column].lower() for term in lowered)]
+    # 摘要取标题以外第一个命中的字段，没有命中时取第一个非空字段
+    body = [column for column in SEARCH_COLUMNS[1:] if fields[column]]
+    best = next((column for column in matched if column != 'title'), body[0] if body else None)
+    return {
+        'id': row[0],
+        'score': round(-row[1], 4) if row[1] is not None else None,
+        'title': highlight(fields['title'], terms),
+        'matched_fields': matched,
+        'snippet_field': best,
+        'snippet': snippet(fields[best], terms) if best else '',
+    }
+
+
+def _unpad(value):
+    """去掉索引时补的空格，空字段返回None"""
+    if not value:
+        return None
+    if value.endswith(PAD):
+        value = value[:-len(PAD)]
+    return value if value.strip() else None
+
+
+def _fts_search(project_id, terms, page, per_page):
+    """先在索引内按项目和检索词求交集并按bm25取当前页的rowid，再读取这一页的字段"""
+    clauses = [f'project_key : {_phrase(project_key(project_id))}']
+    like_terms = []
+    for term in terms:
+        if len(term) >= TRIGRAM_LENGTH:
+            clauses.append(_phrase(term))
+            continue
+        expanded = expand_short_term(term)
+        if expanded is None:
+            like_terms.append(term)
+        elif not expanded:
+            return 0, []
+        else:
+            clauses.append('(' + ' OR '.join(_phrase(t) for t in expanded) + ')')
+
+    params = {'match': ' AND '.join(clauses), 'limit': per_page, 'offset': (page - 1) * per_page}
+    where = ['requirements_fts MATCH :match']
+    for i, term in enumerate(like_terms):
+        params[f'like{i}'] = _like_pattern(term)
+        where.append('(' + ' OR '.join(f"{column} LIKE :like{i} ESCAPE '\\'" for column in SEARCH_COLUMNS) + ')')
+    condition = ' AND '.join(where)
+
+    score = f"bm25(requirements_fts, {', '.join(map(str, BM25_WEIGHTS))})"
+    total = db.session.execute(db.text(f'SELECT count(*) FROM requirements_fts WHERE {condition}'), params).scalar()
+    ranked = db.session.execute(db.text(
+        f"SELECT rowid, {score} AS score FROM requirements_fts "
+        f"WHERE {condition} ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset"), params).all()
+    if not ranked:
+        return total, []
+
+    fields = {row[0]: [_unpad(value) for value in row[1:]] for row in db.session.execute(db.text(
+        f"SELECT rowid, {', '.join(SEARCH_COLUMNS)} FROM requirements_fts "
+        f"WHERE rowid IN ({', '.join(str(row[0]) for row in ranked)})"))}
+    return total, [(rowid, score, *fields[rowid]) for rowid, score in ranked]
+
+
+def _like_search(project_id, terms, page, per_page):
+    """不支持FTS5时直接在需求表上按LIKE过滤（不排序相关度）"""
+    columns = [getattr(Requirement, field) for field in INDEXED_FIELDS]
+    notes = db.func.coalesce(getattr(Requirement, NOTE_FIELDS[0]), '')
+    for field in NOTE_FIELDS[1:]:
+        notes = notes + ' ' + db.func.coalesce(getattr(Requirement, field), '')
+    query = db.session.query(Requirement.id, db.literal(None), *columns, notes).filter(
+        Requirement.project_id == project_id)
+    for term in terms:
+        pattern = _like_pattern(term)
+        query = query.filter(db.or_(*[column.like(pattern, escape='\\') for column in columns + [notes]]))
+    total = query.count()
+    rows = query.order_by(Requirement.id.desc()).limit(per_page).offset((page - 1) * per_page).all()
+    return total, rows
+
+
+def search(project_id, query, page=1, per_page=20):
+    """在项目内检索需求，返回 {"total", "page", "per_page", "results"}
+
+    检索词以空格分隔，需同时命中；用FTS5 trigram索引匹配并按bm25排序（标题权重最高）。
+    结果的标题和摘要中命中的词以<mark>标出（其余内容已HTML转义）。
+    """
+    per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+    page = max(1, int(page))
+    terms = query.split()
+    if not terms:
+        return {'total': 0, 'page': page, 'per_page': per_page, 'results': []}
+
+    if _fts_enabled:
+        total, rows = _fts_search(project_id, terms, page, per_page)
+    else:
+        total, rows = _like_search(project_id, terms, page, per_page)
+    return {
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'results': [_build_result(row, terms) for row in rows],
+    }
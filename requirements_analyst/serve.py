@@ -0,0 +1,24 @@
+# serve.py
+"""生产环境入口：用gevent的协程WSGI服务器运行应用
+
+项目变更事件流（/api/projects/<id>/events）是长连接，线程模式的服务器中每个打开的事件流
+都占用一个线程；gevent服务器中空闲的事件流只占一个协程。monkey patch须在导入应用之前执行，
+使event_stream的条件变量、后台对账线程等都成为协程。
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import logging
+
+from gevent.pywsgi import WSGIServer
+
+import project_stats
+from app import app
+
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    project_stats.start_reconciler(app)
+    logger.info("应用已在端口 5001 启动（gevent）")
+    WSGIServer(('0.0.0.0', 5001), app).serve_forever()
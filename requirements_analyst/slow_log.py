@@ -0,0 +1,231 @@
+# slow_log.py
+import _thread
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import event_stream
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestLog:
+    """把超过阈值的请求和SQL语句以JSON行写入滚动日志文件"""
+
+    def __init__(self, path, threshold_ms, slow_query_ms=0, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.threshold = threshold_ms / 1000.0
+        self.slow_query_threshold = slow_query_ms / 1000.0 if slow_query_ms else None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._logger = logging.getLogger(f'requirements_analyst.slow_log.{os.path.abspath(path)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.handlers = [handler]
+
+    def is_slow(self, duration):
+        return duration >= self.threshold
+
+    def write(self, record):
+        self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def record_request(self, context, trace, duration, profile_name=None):
+        """写入一条慢请求记录
+
+        context 包含 route、path、method、status、project_id、user 等请求信息。
+        """
+        record = {
+            'type': 'slow_request',
+            'timestamp': datetime.utcnow().isoformat(),
+            **context,
+            'duration_ms': round(duration * 1000, 3),
+            'sql_count': trace.sql_count,
+            'sql_time_ms': round(trace.sql_time * 1000, 3),
+            'app_time_ms': round((duration - trace.sql_time) * 1000, 3),
+            'queries': [{
+                'sql': statement,
+                'duration_ms': round(query_duration * 1000, 3)
+            } for statement, _, query_duration in trace.queries]
+        }
+        if profile_name:
+            record['profile'] = profile_name
+        self.write(record)
+
+    def record_slow_queries(self, context, trace):
+        """写入单条超过阈值的SQL语句（无论请求本身是否慢）"""
+        if self.slow_query_threshold is None:
+            return
+        for statement, parameters, duration in trace.queries:
+            if duration >= self.slow_query_threshold:
+                self.write({
+                    'type': 'slow_query',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'route': context.get('route'),
+                    'project_id': context.get('project_id'),
+                    'user': context.get('user'),
+                    'sql': statement,
+                    'parameters': _safe_parameters(parameters),
+                    'duration_ms': round(duration * 1000, 3)
+                })
+
+
+def _safe_parameters(parameters):
+    try:
+        json.dumps(parameters, default=str)
+        return parameters
+    except (TypeError, ValueError):
+        return repr(parameters)
+
+
+def _native_thread_api():
+    """返回系统线程的 (start_new_thread, allocate_lock, get_ident, sleep)
+
+    gevent的monkey patch把threading、_thread中的线程和锁以及time.sleep都换成了协程实现，
+    此时取patch之前的原始函数，否则返回当前模块中的函数（两者相同）。
+    """
+    if event_stream.cooperative():
+        monkey = sys.modules['gevent.monkey']
+        return tuple(monkey.get_original('_thread', ['start_new_thread', 'allocate_lock', 'get_ident'])) + \
+            (monkey.get_original('time', 'sleep'),)
+    return _thread.start_new_thread, _thread.allocate_lock, _thread.get_ident, time.sleep
+
+
+class StackSampler:
+    """统计采样分析器
+
+    单个后台线程按固定间隔读取正在处理请求的线程的调用栈，
+    以折叠栈（folded stacks）形式计数，开销与活跃请求数成正比。
+    没有正在采样的请求时线程阻塞等待，不会定时唤醒。
+
+    采样线程始终是系统线程，锁和线程ID也取gevent patch之前的原始实现：在gevent服务器（serve.py）下，
+    采样协程要等CPU密集的请求让出hub才能运行，协程的ID也与sys._current_frames()的键（系统线程ID）
+    不对应。gevent下每个请求协程按（系统线程ID, 协程）登记，协程挂起时采样其gr_frame，
+    正在运行时采样所在系统线程的当前栈。
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._start_thread, allocate_lock, self._get_ident, self._sleep = _native_thread_api()
+        self._current_greenlet = sys.modules['greenlet'].getcurrent if event_stream.cooperative() else None
+        self._active = {}
+        self._lock = allocate_lock()
+        # 没有活跃请求时采样线程在_wake上阻塞，start()释放它
+        self._wake = allocate_lock()
+        self._wake.acquire()
+        self._idle = False
+        self._running = False
+
+    def _key(self):
+        return self._get_ident(), self._current_greenlet() if self._current_greenlet is not None else None
+
+    def start(self):
+        """开始采样当前请求，返回采样计数字典"""
+        samples = {}
+        with self._lock:
+            self._active[self._key()] = samples
+            if not self._running:
+                self._running = True
+                self._start_thread(self._run, ())
+            elif self._idle:
+                self._idle = False
+                self._wake.release()
+        return samples
+
+    def stop(self):
+        """停止采样当前请求，返回的计数字典之后不会再被采样线程修改"""
+        with self._lock:
+            return self._active.pop(self._key(), None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = self._idle = not self._active
+            if idle:
+                # 每次置为空闲后恰好acquire一次，与start()中的release一一对应
+                self._wake.acquire()
+                continue
+            self._sleep(self.interval)
+            frames = sys._current_frames()
+            # 计数在锁内写入，stop()取走计数字典后采样线程不再访问它
+            with self._lock:
+                for (thread_id, greenlet), samples in self._active.items():
+                    # 挂起的协程有自己的栈帧，正在运行的协程（gr_frame为None）即所在线程的当前栈
+                    frame = greenlet.gr_frame if greenlet is not None else None
+                    if frame is None:
+                        frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    key = self._collapse(frame)
+                    samples[key] = samples.get(key, 0) + 1
+            del frames
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+
+class ProfileStore:
+    """按1/N的比例保存慢请求的采样结果，供管理员下载"""
+
+    def __init__(self, directory, sample_every=10, max_profiles=50):
+        self.directory = directory
+        self.sample_every = max(1, sample_every)
+        self.max_profiles = max_profiles
+        self._slow_count = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def should_keep(self):
+        with self._lock:
+            self._slow_count += 1
+            return self._slow_count % self.sample_every == 0
+
+    def save(self, route, samples):
+        """以折叠栈格式保存，可直接用于flamegraph.pl或speedscope"""
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        safe_route = ''.join(c if c.isalnum() or c in '-_' else '_' for c in route)
+        name = f'{timestamp}_{safe_route}.folded'
+        with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(samples.items(), key=lambda item: item[1], reverse=True):
+                f.write(f'{stack} {count}\n')
+        self._prune()
+        return name
+
+    def list_profiles(self):
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.folded'):
+                continue
+            path = os.path.join(self.directory, name)
+            profiles.append({
+                'name': name,
+                'size': os.path.getsize(path),
+                'created_at': datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat()
+            })
+        return profiles
+
+    def path_for(self, name):
+        """返回剖析文件路径，文件名不合法或不存在时返回None"""
+        if os.path.basename(name) != name or not name.endswith('.folded'):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def _prune(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith('.folded'))
+        for name in names[:-self.max_profiles]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.warning(f"删除过期剖析文件失败: {name}: {e}")
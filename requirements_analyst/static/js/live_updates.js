@@ -0,0 +1,66 @@
+// 项目变更实时刷新
+// 订阅 /api/projects/<id>/events 事件流，收到变更通知后按游标调用 /api/projects/<id>/changes
+// 读取变化的数据，交给页面回调局部更新；游标早于已清理的变更记录时由页面重新加载。
+class LiveUpdates {
+    constructor(projectId, cursor, handlers) {
+        this.projectId = projectId;
+        this.cursor = cursor;
+        this.handlers = handlers;
+        this.timer = null;
+        this.fetching = false;
+        this.pending = false;
+    }
+
+    start() {
+        if (typeof EventSource === 'undefined') {
+            return;
+        }
+        const source = new EventSource(`/api/projects/${this.projectId}/events`);
+        source.addEventListener('change', () => this.schedule());
+        // 事件被挤出服务器缓冲区，按游标补读即可
+        source.addEventListener('reset', () => this.schedule());
+        // 首次连接及断线重连后补读期间的变化
+        source.addEventListener('open', () => this.schedule());
+    }
+
+    schedule() {
+        // 合并短时间内的多个事件，只读取一次
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.catchUp(), LiveUpdates.DEBOUNCE_MS);
+    }
+
+    async catchUp() {
+        if (this.fetching) {
+            this.pending = true;
+            return;
+        }
+        this.fetching = true;
+        try {
+            let hasMore = true;
+            while (hasMore) {
+                const response = await fetch(`/api/projects/${this.projectId}/changes?since=${this.cursor}`);
+                const data = await response.json();
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                if (data.reset) {
+                    this.handlers.reset();
+                    return;
+                }
+                this.cursor = data.cursor;
+                this.handlers.apply(data);
+                hasMore = data.has_more;
+            }
+        } catch (error) {
+            console.error('读取项目变更失败:', error);
+        } finally {
+            this.fetching = false;
+            if (this.pending) {
+                this.pending = false;
+                this.schedule();
+            }
+        }
+    }
+}
+
+LiveUpdates.DEBOUNCE_MS = 300;
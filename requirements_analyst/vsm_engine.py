@@ -0,0 +1,251 @@
+# vsm_engine.py
+import json
+from datetime import datetime
+
+import numpy as np
+
+# 流程步骤字段及兼容的中文键名
+STEP_FIELDS = {
+    'process_time': ('process_time', '加工时间', '处理时间'),
+    'wait_time': ('wait_time', '等待时间'),
+    'inventory': ('inventory', '库存', '在制品'),
+    'operators': ('operators', '人数', '操作人数'),
+}
+FUTURE_FIELDS = {
+    'process_time': ('future_process_time', '改善后加工时间'),
+    'wait_time': ('future_wait_time', '改善后等待时间'),
+}
+
+
+def _number(step, keys, default=0.0):
+    for key in keys:
+        value = step.get(key)
+        if value not in (None, ''):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return default
+    return default
+
+
+def _load_steps(raw):
+    if not raw:
+        return []
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return []
+    if isinstance(data, dict):
+        data = data.get('steps', [])
+    return [step for step in data if isinstance(step, dict)] if isinstance(data, list) else []
+
+
+class StepArrays:
+    """所有需求流程步骤的紧凑数组表示
+
+    各需求的步骤依次拼接成一维数组，owner 记录每个步骤所属需求的行号。
+    """
+
+    def __init__(self, requirement_ids, owner, names, process, wait, inventory, operators, has_future=None):
+        self.requirement_ids = requirement_ids
+        self.has_future = has_future
+        self.owner = owner
+        self.names = names
+        self.process = process
+        self.wait = wait
+        self.inventory = inventory
+        self.operators = operators
+
+    @property
+    def size(self):
+        return len(self.requirement_ids)
+
+
+def build_arrays(rows, daily_demand=None, future=False):
+    """把 (需求ID, 当前步骤JSON, 未来状态JSON) 列表转换为StepArrays
+
+    future 为True时构建未来状态：优先使用vsm_future_state中的步骤列表，
+    否则使用各步骤的future_process_time/future_wait_time（缺省沿用当前值）。
+    步骤未给出等待时间但给出库存且提供日需求量时，等待时间按 库存/日需求量 折算。
+    """
+    requirement_ids, has_future = [], []
+    owner, names, process, wait, inventory, operators = [], [], [], [], [], []
+    for req_id, steps_raw, future_raw in rows:
+        steps = _load_steps(steps_raw)
+        use_future_keys = False
+        if future:
+            future_steps = _load_steps(future_raw)
+            use_future_keys = not future_steps
+            if future_steps:
+                steps = future_steps
+        if not steps:
+            continue
+        row = len(requirement_ids)
+        requirement_ids.append(req_id)
+        has_future.append(future and not use_future_keys)
+        for index, step in enumerate(steps):
+            p = _number(step, STEP_FIELDS['process_time'])
+            w = _number(step, STEP_FIELDS['wait_time'], default=None)
+            inv = _number(step, STEP_FIELDS['inventory'])
+            if future and use_future_keys:
+                if any(key in step for keys in FUTURE_FIELDS.values() for key in keys):
+                    has_future[row] = True
+                p = _number(step, FUTURE_FIELDS['process_time'], default=p)
+                w = _number(step, FUTURE_FIELDS['wait_time'], default=w)
+            if w is None:
+                w = inv / daily_demand if daily_demand else 0.0
+            owner.append(row)
+            names.append(str(step.get('name') or step.get('名称') or f'步骤{index + 1}'))
+            process.append(p)
+            wait.append(w)
+            inventory.append(inv)
+            operators.append(max(1.0, _number(step, STEP_FIELDS['operators'], default=1.0)))
+
+    return StepArrays(
+        requirement_ids,
+        np.asarray(owner, dtype=np.int64),
+        names,
+        np.asarray(process, dtype=float),
+        np.asarray(wait, dtype=float),
+        np.asarray(inventory, dtype=float),
+        np.asarray(operators, dtype=float),
+        has_future,
+    )
+
+
+def _segment_argmax(values, owner, n):
+    """返回每个需求内取最大值的步骤下标"""
+    order = np.lexsort((values, owner))
+    sorted_owner = owner[order]
+    last = np.flatnonzero(np.r_[sorted_owner[1:] != sorted_owner[:-1], True])
+    result = np.full(n, -1, dtype=np.int64)
+    result[sorted_owner[last]] = order[last]
+    return result
+
+
+def summarize(arrays):
+    """按需求汇总加工时间、等待时间、交付周期、增值比和瓶颈步骤"""
+    n = arrays.size
+    if n == 0:
+        return {}
+    owner = arrays.owner
+    process_total = np.bincount(owner, weights=arrays.process, minlength=n)
+    wait_total = np.bincount(owner, weights=arrays.wait, minlength=n)
+    inventory_total = np.bincount(owner, weights=arrays.inventory, minlength=n)
+    step_count = np.bincount(owner, minlength=n)
+    lead_time = process_total + wait_total
+    value_added_ratio = np.divide(process_total, lead_time, out=np.zeros(n), where=lead_time > 0)
+
+    # 有效节拍：步骤加工时间 / 操作人数，最大者为瓶颈
+    effective_cycle = arrays.process / arrays.operators
+    bottleneck = _segment_argmax(effective_cycle, owner, n)
+
+    return {
+        'process_time': process_total,
+        'wait_time': wait_total,
+        'inventory': inventory_total,
+        'step_count': step_count,
+        'lead_time': lead_time,
+        'value_added_ratio': value_added_ratio,
+        'effective_cycle': effective_cycle,
+        'bottleneck': bottleneck,
+    }
+
+
+def analyze(rows, takt_time=None, daily_demand=None):
+    """对一组需求的VSM数据做一次向量化分析
+
+    rows 为 [(需求ID, vsm_process_steps_json, vsm_future_state), ...]。
+    返回 {需求ID: 结果字典}。
+    """
+    current = build_arrays(rows, daily_demand)
+    if current.size == 0:
+        return {}
+    stats = summarize(current)
+
+    future = build_arrays(rows, daily_demand, future=True)
+    future_stats = summarize(future)
+    future_row = {req_id: i for i, req_id in enumerate(future.requirement_ids) if future.has_future[i]}
+
+    # 节拍分析：有效节拍超过节拍时间的步骤，按所属需求分组
+    over_takt = None
+    if takt_time:
+        over_takt = {}
+        for i in np.flatnonzero(stats['effective_cycle'] > takt_time):
+            over_takt.setdefault(int(current.owner[i]), []).append(current.names[i])
+
+    results = {}
+    for row, req_id in enumerate(current.requirement_ids):
+        b = stats['bottleneck'][row]
+        result = {
+            'requirement_id': req_id,
+            'step_count': int(stats['step_count'][row]),
+            'process_time': round(float(stats['process_time'][row]), 3),
+            'wait_time': round(float(stats['wait_time'][row]), 3),
+            'inventory': round(float(stats['inventory'][row]), 3),
+            'lead_time': round(float(stats['lead_time'][row]), 3),
+            'value_added_ratio': round(float(stats['value_added_ratio'][row]), 4),
+            'process_efficiency': round(float(stats['value_added_ratio'][row]) * 100, 2),
+            'bottleneck': {
+                'name': current.names[b],
+                'cycle_time': round(float(stats['effective_cycle'][b]), 3),
+            },
+        }
+        if over_takt is not None:
+            result['takt_time'] = takt_time
+            result['steps_over_takt'] = over_takt.get(row, [])
+
+        f = future_row.get(req_id)
+        if f is not None:
+            future_lead = float(future_stats['lead_time'][f])
+            future_ratio = float(future_stats['value_added_ratio'][f])
+            result['future_state'] = {
+                'lead_time': round(future_lead, 3),
+                'process_efficiency': round(future_ratio * 100, 2),
+                'lead_time_reduction': round(float(stats['lead_time'][row]) - future_lead, 3),
+                'efficiency_gain': round((future_ratio - float(stats['value_added_ratio'][row])) * 100, 2),
+            }
+        results[req_id] = result
+    return results
+
+
+def project_summary(results):
+    """项目级汇总：平均流程效率、总交付周期以及最常见的瓶颈步骤"""
+    if not results:
+        return {'analyzed_requirements': 0}
+    efficiency = np.array([r['process_efficiency'] for r in results.values()])
+    lead_time = np.array([r['lead_time'] for r in results.values()])
+    names, counts = np.unique([r['bottleneck']['name'] for r in results.values()], return_counts=True)
+    top = np.argsort(-counts)[:5]
+    return {
+        'analyzed_requirements': len(results),
+        'average_process_efficiency': round(float(efficiency.mean()), 2),
+        'median_process_efficiency': round(float(np.median(efficiency)), 2),
+        'total_lead_time': round(float(lead_time.sum()), 3),
+        'average_lead_time': round(float(lead_time.mean()), 3),
+        'common_bottlenecks': [{'name': str(names[i]), 'count': int(counts[i])} for i in top],
+        'future_lead_time_reduction': round(sum(
+            r['future_state']['lead_time_reduction'] for r in results.values() if 'future_state' in r), 3),
+    }
+
+
+def analyze_project(db, Requirement, project_id, takt_time=None, daily_demand=None, write=False):
+    """分析项目内所有带流程步骤的需求，write为True时批量写回周期时间（瓶颈步骤的有效节拍）、交付周期和流程效率"""
+    rows = db.session.query(
+        Requirement.id, Requirement.vsm_process_steps_json, Requirement.vsm_future_state
+    ).filter(Requirement.project_id == project_id, Requirement.vsm_process_steps_json.isnot(None)).all()
+    results = analyze([tuple(row) for row in rows], takt_time=takt_time, daily_demand=daily_demand)
+
+    if write and results:
+        now = datetime.utcnow()
+        db.session.execute(db.update(Requirement), [{
+            'id': req_id,
+            # 周期时间为瓶颈步骤的有效节拍，加工时间合计已计入lead_time
+            'cycle_time': r['bottleneck']['cycle_time'],
+            'lead_time': r['lead_time'],
+            'process_efficiency': r['process_efficiency'],
+            'vsm_analyzed': True,
+            'vsm_analysis_date': now,
+        } for req_id, r in results.items()])
+        db.session.commit()
+    return results
@@ -0,0 +1,351 @@
+# wfmt_engine.py
+import csv
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+# 1 TMU = 0.00001小时 = 0.036秒
+SECONDS_PER_TMU = 0.036
+DEFAULT_ALLOWANCE_RATE = 15.0
+
+# MTM-1 伸手(R)表，列依次为情况A、B、C/D、E，行为移动距离（英寸）
+_REACH_DISTANCES = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30)
+_REACH = (
+    (2.5, 2.5, 3.6, 2.4), (4.0, 4.0, 5.9, 3.8), (5.3, 5.3, 7.3, 5.3), (6.1, 6.4, 8.4, 6.8),
+    (6.5, 7.8, 9.4, 7.4), (7.0, 8.6, 10.1, 8.0), (7.4, 9.3, 10.8, 8.7), (7.9, 10.1, 11.5, 9.3),
+    (8.3, 10.8, 12.2, 9.9), (8.7, 11.5, 12.9, 10.5), (9.6, 12.9, 14.2, 11.8), (10.5, 14.4, 15.6, 13.0),
+    (11.4, 15.8, 17.0, 14.2), (12.3, 17.2, 18.4, 15.5), (13.1, 18.6, 19.8, 16.7), (14.0, 20.1, 21.2, 18.0),
+    (14.9, 21.5, 22.5, 19.2), (15.8, 22.9, 23.9, 20.4), (16.7, 24.4, 25.3, 21.7), (17.5, 25.8, 26.7, 22.9),
+)
+_REACH_CASES = ('A', 'B', 'C', 'E')
+_REACH_EXTRA = (0.4, 0.7, 0.7, 0.6)  # 超过30英寸每英寸增加值
+
+# MTM-1 移物(M)表，列依次为情况A、B、C
+_MOVE = (
+    (2.5, 2.9, 3.4), (3.6, 4.6, 5.2), (4.9, 5.7, 6.7), (6.1, 6.9, 8.0), (7.3, 8.0, 9.2),
+    (8.1, 8.9, 10.3), (8.9, 9.7, 11.1), (9.7, 10.6, 11.8), (10.5, 11.5, 12.7), (11.3, 12.2, 13.5),
+    (12.9, 13.4, 15.2), (14.4, 14.6, 16.9), (16.0, 15.8, 18.7), (17.6, 17.0, 20.4), (19.2, 18.2, 22.1),
+    (20.8, 19.4, 23.8), (22.4, 20.6, 25.5), (24.0, 21.8, 27.3), (25.5, 23.1, 29.0), (27.1, 24.3, 30.7),
+)
+_MOVE_CASES = ('A', 'B', 'C')
+_MOVE_EXTRA = (0.8, 0.6, 0.85)
+
+# 旋转(T)表：角度 -> 轻/中/重负荷
+_TURN = {
+    30: (2.8, 4.4, 8.4), 45: (3.5, 5.5, 10.5), 60: (4.1, 6.5, 12.3), 75: (4.8, 7.5, 14.4),
+    90: (5.4, 8.5, 16.2), 105: (6.1, 9.6, 18.3), 120: (6.8, 10.6, 20.4), 135: (7.4, 11.6, 22.2),
+    150: (8.1, 12.7, 24.3), 165: (8.7, 13.7, 26.1), 180: (9.4, 14.8, 28.2),
+}
+
+# 其余固定值动作：抓取、对准、放手、拆卸、施压、眼动和身体动作
+_FIXED = {
+    'G1A': 2.0, 'G1B': 3.5, 'G1C1': 7.3, 'G1C2': 8.7, 'G1C3': 10.8, 'G2': 5.6, 'G3': 5.6,
+    'G4A': 7.3, 'G4B': 9.1, 'G4C': 12.9, 'G5': 0.0,
+    'P1S': 5.6, 'P1SS': 9.1, 'P1NS': 10.4, 'P2S': 16.2, 'P2SS': 19.7, 'P2NS': 21.0,
+    'P3S': 43.0, 'P3SS': 46.5, 'P3NS': 47.8,
+    'P1SD': 11.2, 'P1SSD': 14.7, 'P1NSD': 16.0, 'P2SD': 21.8, 'P2SSD': 25.3, 'P2NSD': 26.6,
+    'P3SD': 48.6, 'P3SSD': 52.1, 'P3NSD': 53.4,
+    'RL1': 2.0, 'RL2': 0.0,
+    'D1E': 4.0, 'D1D': 5.7, 'D2E': 7.5, 'D2D': 11.8, 'D3E': 22.9, 'D3D': 34.7,
+    'AP1': 16.2, 'AP2': 10.6, 'APA': 10.6, 'APB': 16.2,
+    'EF': 7.3, 'ET': 15.2,
+    'FM': 8.5, 'FMP': 19.1, 'LM': 7.1, 'B': 29.0, 'AB': 31.9, 'S': 34.7, 'AS': 43.4,
+    'KOK': 29.0, 'AKOK': 31.9, 'KBK': 69.4, 'AKBK': 76.7, 'SIT': 34.7, 'STD': 43.4,
+    'TBC1': 18.6, 'TBC2': 37.2, 'W1P': 15.0,
+}
+
+_DISTANCE_CODE = re.compile(r'^([RM])(\d+(?:\.\d+)?)([A-E])$')
+_WALK_CODE = re.compile(r'^W(\d+)P$')
+
+
+def _distance_table(rows, extra):
+    """按英寸预计算0-30英寸的TMU数组，表中未列出的距离线性插值"""
+    values = np.asarray(rows, dtype=float)
+    distances = np.arange(31, dtype=float)
+    table = np.column_stack([np.interp(distances, _REACH_DISTANCES, values[:, c]) for c in range(values.shape[1])])
+    table[0] = 0.0
+    return table, np.asarray(extra, dtype=float)
+
+
+REACH_TABLE, REACH_EXTRA = _distance_table(_REACH, _REACH_EXTRA)
+MOVE_TABLE, MOVE_EXTRA = _distance_table(_MOVE, _MOVE_EXTRA)
+
+
+def default_codes():
+    """生成全部标准动作代码及其TMU值"""
+    codes = dict(_FIXED)
+    # 对准动作的E（易于处理）后缀与默认值相同
+    for code in [c for c in _FIXED if c.startswith('P') and not c.endswith('D')]:
+        codes[code + 'E'] = _FIXED[code]
+    for distance in range(1, 31):
+        for c, case in enumerate(_REACH_CASES):
+            codes[f'R{distance}{case}'] = round(float(REACH_TABLE[distance, c]), 1)
+        codes[f'R{distance}D'] = codes[f'R{distance}C']
+        for c, case in enumerate(_MOVE_CASES):
+            codes[f'M{distance}{case}'] = round(float(MOVE_TABLE[distance, c]), 1)
+    for degrees, values in _TURN.items():
+        for load, value in zip('SML', values):
+            codes[f'T{degrees}{load}'] = value
+    return codes
+
+
+class TmuTable:
+    """TMU查找表
+
+    动作代码映射为整数下标，TMU值保存在NumPy数组中，批量计算时只需一次数组索引。
+    version 为表内容的摘要，表变化后可据此判断是否需要重新计算。
+    """
+
+    def __init__(self, codes, source=None):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.values = np.asarray([codes[code] for code in self.codes], dtype=float)
+        self.source = source
+        digest = hashlib.sha1(json.dumps(sorted(codes.items())).encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def lookup(self, code):
+        """返回动作代码的TMU值，无法识别时返回None"""
+        code = normalize_code(code)
+        i = self.index.get(code)
+        if i is not None:
+            return float(self.values[i])
+        return _extended_tmu(code)
+
+
+def normalize_code(code):
+    return str(code).strip().upper().replace(' ', '')
+
+
+def _extended_tmu(code):
+    """计算预计算表之外的代码：超过30英寸或带小数距离的伸手/移物，以及多步行走"""
+    match = _DISTANCE_CODE.match(code)
+    if match:
+        kind, distance, case = match.group(1), float(match.group(2)), match.group(3)
+        if kind == 'R':
+            table, extra, cases = REACH_TABLE, REACH_EXTRA, 'ABCDE'
+            column = min(cases.index(case), 2) if case != 'E' else 3
+        else:
+            if case not in _MOVE_CASES:
+                return None
+            table, extra, column = MOVE_TABLE, MOVE_EXTRA, _MOVE_CASES.index(case)
+        if distance <= 30:
+            return round(float(np.interp(distance, np.arange(31), table[:, column])), 1)
+        return round(float(table[30, column] + extra[column] * (distance - 30)), 1)
+    match = _WALK_CODE.match(code)
+    if match:
+        return _FIXED['W1P'] * int(match.group(1))
+    return None
+
+
+def load_table_file(path):
+    """读取自定义TMU表（CSV，列为 code,tmu），覆盖或补充标准表"""
+    codes = default_codes()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            code = normalize_code(row.get('code', ''))
+            if code:
+                codes[code] = float(row['tmu'])
+    return TmuTable(codes, source=path)
+
+
+_table = None
+_table_file = None
+default_allowance_rate = DEFAULT_ALLOWANCE_RATE
+
+
+def configure(config):
+    """按config.ini的[WFMT]配置设置自定义TMU表文件和默认宽放率"""
+    global _table, _table_file, default_allowance_rate
+    _table_file = config.get('WFMT', 'tmu_table_file', fallback='').strip() or None
+    default_allowance_rate = config.getfloat('WFMT', 'default_allowance_rate', fallback=DEFAULT_ALLOWANCE_RATE)
+    _table = None
+
+
+def get_table():
+    """返回当前TMU表，首次调用时加载，之后复用"""
+    global _table
+    if _table is None:
+        if _table_file and os.path.exists(_table_file):
+            _table = load_table_file(_table_file)
+        else:
+            _table = TmuTable(default_codes())
+    return _table
+
+
+def reload_table():
+    """重新加载TMU表（表文件修改后调用）"""
+    global _table
+    _table = None
+    return get_table()
+
+
+def parse_sequence(raw):
+    """解析动作序列
+
+    支持 ["R10A", "G1A", ...]、[{"code": "R10A", "frequency": 2}, ...] 和
+    "R10A G1A M10A" 三种写法；{"before": [...], "after": [...]} 表示改善前后两个序列。
+    返回 (改善前序列, 改善后序列或None)，序列元素为 (代码, 次数)。
+    """
+    if raw is None or raw == '':
+        return [], None
+    data = raw
+    if isinstance(raw, str):
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            data = raw
+    if isinstance(data, dict):
+        before = data.get('before', data.get('current', []))
+        after = data.get('after', data.get('improved'))
+        return _parse_items(before), (_parse_items(after) if after is not None else None)
+    return _parse_items(data), None
+
+
+def _parse_items(data):
+    if isinstance(data, str):
+        data = re.split(r'[\s,，;；]+', data.strip())
+    if not isinstance(data, list):
+        raise ValueError('动作序列必须是列表')
+    items = []
+    for item in data:
+        if isinstance(item, dict):
+            code = item.get('code')
+            frequency = item.get('frequency', item.get('count', 1))
+        else:
+            code, frequency = item, 1
+        if code is None or str(code).strip() == '':
+            continue
+        try:
+            frequency = float(frequency)
+        except (TypeError, ValueError):
+            raise ValueError(f'动作 {code} 的次数无效')
+        if frequency < 0:
+            raise ValueError(f'动作 {code} 的次数不能为负数')
+        items.append((normalize_code(code), frequency))
+    return items
+
+
+def standard_seconds(tmu, allowance_rate):
+    return tmu * SECONDS_PER_TMU * (1 + allowance_rate / 100.0)
+
+
+def calculate(sequences, table=None):
+    """批量计算多个动作序列的TMU总数
+
+    sequences 为 {键: [(代码, 次数), ...]}，所有动作展开后经一次数组索引和
+    bincount求和。返回 ({键: TMU总数}, {键: [无法识别的代码]})。
+    """
+    table = table or get_table()
+    keys = list(sequences)
+    owner, ids, frequency = [], [], []
+    unknown = {}
+    # 表外代码（如超过30英寸的距离）按规则计算后追加在本次计算的数组末尾
+    extra_index, extra_values = {}, []
+    for row, key in enumerate(keys):
+        for code, count in sequences[key]:
+            i = table.index.get(code)
+            if i is None:
+                i = extra_index.get(code)
+            if i is None:
+                value = _extended_tmu(code)
+                if value is None:
+                    unknown.setdefault(key, []).append(code)
+                    continue
+                i = extra_index[code] = len(table) + len(extra_values)
+                extra_values.append(value)
+            owner.append(row)
+            ids.append(i)
+            frequency.append(count)
+    values = np.concatenate([table.values, extra_values]) if extra_values else table.values
+    totals = np.bincount(np.asarray(owner, dtype=np.int64),
+                         weights=values[np.asarray(ids, dtype=np.int64)] * np.asarray(frequency, dtype=float),
+                         minlength=len(keys))
+    return {key: round(float(totals[row]), 1) for row, key in enumerate(keys)}, unknown
+
+
+def analyze(items, table=None):
+    """计算一组需求的改善前后标准时间
+
+    items 为 [(需求ID, 动作序列原始值, 宽放率, 改善潜力%), ...]。
+    没有改善后序列时按改善潜力估算改善后时间。
+    """
+    table = table or get_table()
+    sequences, meta, errors = {}, {}, {}
+    for req_id, raw, allowance_rate, potential in items:
+        try:
+            before, after = parse_sequence(raw)
+        except ValueError as e:
+            errors[req_id] = str(e)
+            continue
+        if not before:
+            continue
+        sequences[(req_id, 'before')] = before
+        if after is not None:
+            sequences[(req_id, 'after')] = after
+        meta[req_id] = (default_allowance_rate if allowance_rate is None else allowance_rate, potential)
+
+    totals, unknown = calculate(sequences, table)
+    results = {}
+    for req_id, (allowance_rate, potential) in meta.items():
+        tmu_before = totals[(req_id, 'before')]
+        before_time = standard_seconds(tmu_before, allowance_rate)
+        if (req_id, 'after') in totals:
+            tmu_after = totals[(req_id, 'after')]
+            after_time = standard_seconds(tmu_after, allowance_rate)
+        elif potential:
+            tmu_after = None
+            after_time = before_time * (1 - min(potential, 100) / 100.0)
+        else:
+            tmu_after = None
+            after_time = before_time
+        unknown_codes = unknown.get((req_id, 'before'), []) + unknown.get((req_id, 'after'), [])
+        results[req_id] = {
+            'requirement_id': req_id,
+            'tmu_total': tmu_before,
+            'tmu_after': tmu_after,
+            'allowance_rate': allowance_rate,
+            'standard_time': round(before_time, 2),
+            'before_time': round(before_time, 2),
+            'after_time': round(after_time, 2),
+            'time_saved': round(before_time - after_time, 2),
+            'unknown_codes': sorted(set(unknown_codes)),
+        }
+    return results, errors
+
+
+def result_fields(result, now):
+    """把计算结果转换为Requirement字段"""
+    return {
+        'wfmt_tmu_total': result['tmu_total'],
+        'wfmt_allowance_rate': result['allowance_rate'],
+        'standard_time': result['standard_time'],
+        'wfmt_before_time': result['before_time'],
+        'wfmt_after_time': result['after_time'],
+        'wfmt_time_saved': result['time_saved'],
+        'wfmt_analyzed': True,
+        'wfmt_analysis_date': now,
+    }
+
+
+def recompute_project(db, Requirement, project_id, table=None):
+    """按当前TMU表重新计算项目内所有需求的动作序列并批量写回"""
+    rows = db.session.query(
+        Requirement.id, Requirement.wfmt_action_sequence, Requirement.wfmt_allowance_rate,
+        Requirement.improvement_potential
+    ).filter(Requirement.project_id == project_id, Requirement.wfmt_action_sequence.isnot(None)).all()
+    results, errors = analyze([tuple(row) for row in rows], table)
+
+    now = datetime.utcnow()
+    updates = [dict(result_fields(r, now), id=req_id) for req_id, r in results.items() if not r['unknown_codes']]
+    if updates:
+        db.session.execute(db.update(Requirement), updates)
+        db.session.commit()
+    return results, errors
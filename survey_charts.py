@@ -0,0 +1,200 @@
+# survey_charts.py
+"""桌面端（xuQiu.py）数据分析图表
+
+图表只依据survey_engine.summarize()的汇总结果绘制，不使用pyplot：直方图计数等数值由
+chart_data()在后台线程计算；界面中的Figure在数据分析标签页创建时生成一次，坐标轴和图形
+对象在首次分析时创建，之后每次分析只更新其数据。导出PNG时在后台线程中用独立的Figure和
+Agg画布绘制，按数据库标识和数据版本缓存到文件。
+"""
+import glob
+import os
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import survey_engine
+
+FIGURE_SIZE = (12, 10)
+# 重要性、紧急性直方图的分组数
+HIST_BINS = 5
+PNG_DPI = 80
+# 缓存目录中保留的PNG数量（按修改时间保留最新的）
+MAX_CACHED_PNGS = 5
+
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+def new_figure():
+    return Figure(figsize=FIGURE_SIZE)
+
+
+def draw_placeholder(fig):
+    """未生成分析结果时的占位提示"""
+    fig.clear()
+    ax = fig.add_subplot(111)
+    ax.text(0.5, 0.5, '请点击"生成分析报告"按钮\n以查看数据分析结果',
+            horizontalalignment='center', verticalalignment='center',
+            transform=ax.transAxes, fontsize=14)
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis('off')
+
+
+def chart_data(summary):
+    """由汇总结果计算各图表要显示的数值（纯计算，可在后台线程调用）"""
+    importance = summary['scores'][survey_engine.IMPORTANCE]['weighted_scores']
+    urgency = summary['scores'][survey_engine.URGENCY]['scores']
+    return {
+        'emotions': summary['emotions'],
+        'importance': np.histogram(importance, bins=HIST_BINS) if len(importance) else None,
+        'urgency': np.histogram(urgency, bins=HIST_BINS) if len(urgency) else None,
+        'function_types': summary['function_types'],
+    }
+
+
+class AnalysisChart:
+    """2×2分析图表（情绪、加权重要性、紧急性、职能类型）
+
+    坐标轴、标题、直方图的柱子等在创建时生成一次，update()只修改已有图形对象的数据
+    （set_height、set_x等），不清空Figure；类别变化时只重建该坐标轴内的饼图扇区或柱子。
+    """
+
+    def __init__(self, fig):
+        self.fig = fig
+        fig.clear()
+        (self.ax_emotion, self.ax_importance), (self.ax_urgency, self.ax_function) = fig.subplots(2, 2)
+        fig.suptitle('干系人需求调查分析报告', fontsize=16)
+
+        self.ax_emotion.set_title('干系人情绪状态分布')
+        self.emotion_labels = None
+        self.emotion_wedges, self.emotion_texts, self.emotion_pcts = [], [], []
+        self.emotion_artists = []
+
+        self.importance_bars = self._histogram_axes(
+            self.ax_importance, '重要性评分', '需求重要性分布', ['完全不重要', '不重要', '一般', '重要', '非常重要'])
+        self.urgency_bars = self._histogram_axes(
+            self.ax_urgency, '紧急性评分', '需求紧急性分布', ['完全不紧急', '不紧急', '一般', '紧急', '非常紧急'])
+        self.urgency_empty = self._empty_text(self.ax_urgency, '暂无紧急性数据')
+
+        self.ax_function.set_xlabel('职能类型')
+        self.ax_function.set_ylabel('人数')
+        self.ax_function.set_title('干系人职能类型分布')
+        self.function_labels = None
+        self.function_bars = None
+        self.function_empty = self._empty_text(self.ax_function, '暂无职能类型数据')
+        fig.tight_layout()
+
+    @staticmethod
+    def _histogram_axes(ax, xlabel, title, ticklabels):
+        bars = ax.bar(np.arange(1, HIST_BINS + 1), np.zeros(HIST_BINS), width=1.0, align='edge',
+                      edgecolor='black')
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('频次')
+        ax.set_title(title)
+        ax.set_xticks([1, 2, 3, 4, 5])
+        ax.set_xticklabels(ticklabels, rotation=45)
+        return bars
+
+    @staticmethod
+    def _empty_text(ax, text):
+        return ax.text(0.5, 0.5, text, ha='center', va='center', transform=ax.transAxes, visible=False)
+
+    def update(self, data):
+        """用chart_data()的结果更新图表（在界面线程调用，之后由画布重绘）"""
+        self._update_emotions(data['emotions'])
+        self._update_histogram(self.ax_importance, self.importance_bars, data['importance'])
+        self._update_histogram(self.ax_urgency, self.urgency_bars, data['urgency'])
+        self.urgency_empty.set_visible(data['urgency'] is None)
+        self._update_functions(data['function_types'])
+
+    def _update_emotions(self, emotions):
+        labels = [label for label, _ in emotions]
+        counts = np.array([count for _, count in emotions], dtype=float)
+        if labels != self.emotion_labels:
+            # 类别变化时只重建饼图的扇区和文字
+            for artist in self.emotion_artists:
+                artist.remove()
+            self.emotion_artists = []
+            if labels:
+                wedges, texts, autotexts = self.ax_emotion.pie(counts, labels=labels, autopct='%1.1f%%')
+                self.emotion_wedges, self.emotion_texts, self.emotion_pcts = wedges, texts, autotexts
+                self.emotion_artists = [*wedges, *texts, *autotexts]
+            self.emotion_labels = labels
+            return
+        if not labels:
+            return
+        # 类别不变时按新比例调整扇区角度及标签位置（与Axes.pie的默认布局一致）
+        fractions = counts / counts.sum()
+        bounds = 360 * np.concatenate([[0], np.cumsum(fractions)])
+        for k, wedge in enumerate(self.emotion_wedges):
+            wedge.set_theta1(bounds[k])
+            wedge.set_theta2(bounds[k + 1])
+            middle = np.deg2rad((bounds[k] + bounds[k + 1]) / 2)
+            x, y = np.cos(middle), np.sin(middle)
+            self.emotion_texts[k].set_position((1.1 * x, 1.1 * y))
+            self.emotion_texts[k].set_horizontalalignment('left' if x > 0 else 'right')
+            self.emotion_pcts[k].set_position((0.6 * x, 0.6 * y))
+            self.emotion_pcts[k].set_text(f'{fractions[k] * 100:1.1f}%')
+
+    @staticmethod
+    def _update_histogram(ax, bars, histogram):
+        if histogram is None:
+            counts, edges = np.zeros(HIST_BINS), np.arange(1, HIST_BINS + 2)
+        else:
+            counts, edges = histogram
+        for bar, count, left, right in zip(bars, counts, edges[:-1], edges[1:]):
+            bar.set_x(left)
+            bar.set_width(right - left)
+            bar.set_height(count)
+            bar.set_visible(histogram is not None)
+        ax.relim()
+        ax.autoscale_view()
+
+    def _update_functions(self, function_types):
+        labels = [label for label, _ in function_types]
+        counts = [count for _, count in function_types]
+        self.function_empty.set_visible(not labels)
+        if labels == self.function_labels:
+            for bar, count in zip(self.function_bars or [], counts):
+                bar.set_height(count)
+        else:
+            # 类别变化时重建柱子，刻度标签长度可能不同，重新排版
+            if self.function_bars is not None:
+                self.function_bars.remove()
+            self.function_bars = self.ax_function.bar(labels, counts) if labels else None
+            self.ax_function.tick_params(axis='x', rotation=45)
+            self.function_labels = labels
+            self.fig.tight_layout()
+        self.ax_function.relim()
+        self.ax_function.autoscale_view()
+
+
+def png_path(cache_dir, database_id, revision):
+    """缓存文件名含数据库标识：重建survey.db后版本号从头计数，不会取到旧数据库的图片"""
+    return os.path.join(cache_dir, f'analysis_{database_id}_r{revision}.png')
+
+
+def render_png(data, cache_dir, database_id, revision):
+    """把分析图表（chart_data()的结果）绘制为PNG并缓存（可在后台线程调用），已缓存时直接返回文件路径"""
+    path = png_path(cache_dir, database_id, revision)
+    if os.path.exists(path):
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    fig = new_figure()
+    FigureCanvasAgg(fig)
+    AnalysisChart(fig).update(data)
+    # 先写临时文件再改名，避免界面读到写了一半的图片
+    temp_path = path + '.tmp'
+    fig.savefig(temp_path, dpi=PNG_DPI, format='png')
+    os.replace(temp_path, path)
+
+    cached = sorted(glob.glob(os.path.join(cache_dir, 'analysis_*.png')), key=os.path.getmtime, reverse=True)
+    for old in cached[MAX_CACHED_PNGS:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return path
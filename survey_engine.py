@@ -0,0 +1,106 @@
+# survey_engine.py
+"""桌面端（xuQiu.py）调查结果汇总
+
+先按问题ID和干系人姓名建立索引，把全部调查结果展开为一张答案表（每个答案一行：
+干系人下标、问题类别、答案编码、分数、职级权重），再用NumPy按类别分组统计。
+数据分析图表和调查报告使用同一份汇总结果。
+"""
+from collections import Counter
+
+import numpy as np
+
+# 与survey_questions中的category一致
+EMOTION = '情绪状态'
+IMPORTANCE = '需求重要性'
+URGENCY = '需求紧急性'
+SATISFACTION = '满意度'
+COOPERATION = '合作意愿'
+SCORED_CATEGORIES = (IMPORTANCE, URGENCY, SATISFACTION, COOPERATION)
+
+
+def option_scores(question):
+    """问题选项按从高到低排列，第一个选项得满分（选项数），最后一个得1分"""
+    options = question.get('options', [])
+    return {option: len(options) - i for i, option in enumerate(options)}
+
+
+class AnswerTable:
+    """展开后的答案表，各列为等长的NumPy数组"""
+
+    def __init__(self, responses, questions, stakeholders, level_weights):
+        question_index = {q['id']: q for q in questions}
+        self.categories = sorted({q['category'] for q in questions})
+        category_code = {category: i for i, category in enumerate(self.categories)}
+        scores = {q['id']: option_scores(q) for q in questions}
+        self.stakeholder_names = [s['name'] for s in stakeholders]
+        stakeholder_index = {name: i for i, name in enumerate(self.stakeholder_names)}
+        stakeholder_weights = np.array([level_weights.get(s['level'], 1.0) for s in stakeholders] + [1.0])
+
+        answers, answer_code = [], {}
+        rows = []
+        for name, items in responses.items():
+            stakeholder = stakeholder_index.get(name, -1)
+            for response in items:
+                for q_id, answer in response['responses'].items():
+                    question = question_index.get(q_id)
+                    if question is None:
+                        continue
+                    code = answer_code.setdefault(answer, len(answers))
+                    if code == len(answers):
+                        answers.append(answer)
+                    rows.append((stakeholder, category_code[question['category']], code,
+                                 scores[q_id].get(answer, 0)))
+
+        table = np.array(rows, dtype=np.int64).reshape(-1, 4)
+        self.answers = np.array(answers, dtype=object)
+        self.stakeholder = table[:, 0]
+        self.category = table[:, 1]
+        self.answer = table[:, 2]
+        self.score = table[:, 3].astype(float)
+        # 未登记的干系人（已删除或改名）权重记为1，但不参与加权统计
+        self.known = self.stakeholder >= 0
+        self.weight = stakeholder_weights[self.stakeholder]
+        self.respondents = len(responses)
+        self.total_responses = sum(len(items) for items in responses.values())
+
+    def mask(self, category):
+        if category not in self.categories:
+            return np.zeros(len(self.category), dtype=bool)
+        return self.category == self.categories.index(category)
+
+    def distribution(self, category):
+        """该类别各答案的次数，按次数从多到少排列 [(答案, 次数), ...]"""
+        codes, counts = np.unique(self.answer[self.mask(category)], return_counts=True)
+        order = np.lexsort((codes, -counts))
+        return [(self.answers[codes[i]], int(counts[i])) for i in order]
+
+    def score_stats(self, category):
+        """该类别的分数统计：平均分、按职级加权的平均分、各分数的次数"""
+        mask = self.mask(category)
+        scores = self.score[mask]
+        weighted = mask & self.known
+        total_weight = self.weight[weighted].sum()
+        return {
+            'count': int(mask.sum()),
+            'mean': float(scores.mean()) if len(scores) else None,
+            'weighted_mean': float((self.score[weighted] * self.weight[weighted]).sum() / total_weight)
+            if total_weight else None,
+            'scores': scores,
+            'weighted_scores': self.score[weighted] * self.weight[weighted],
+            'histogram': {int(k): int(v) for k, v in zip(*np.unique(scores, return_counts=True))},
+        }
+
+
+def summarize(responses, questions, stakeholders, level_weights):
+    """汇总调查结果，返回数据分析图表和调查报告共用的统计数据"""
+    table = AnswerTable(responses, questions, stakeholders, level_weights)
+    return {
+        'stakeholder_count': len(stakeholders),
+        'respondents': table.respondents,
+        'total_responses': table.total_responses,
+        'function_types': Counter(s['function_type'] for s in stakeholders).most_common(),
+        'levels': Counter(s['level'] for s in stakeholders).most_common(),
+        'emotions': table.distribution(EMOTION),
+        'cooperation_distribution': table.distribution(COOPERATION),
+        'scores': {category: table.score_stats(category) for category in SCORED_CATEGORIES},
+    }
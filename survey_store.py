@@ -0,0 +1,443 @@
+# survey_store.py
+"""桌面端（xuQiu.py）的本地SQLite存储
+
+干系人、需求、调查结果和追溯矩阵按记录保存，每次增删改只写入对应的行，并在一个事务中
+提交（WAL日志模式，进程崩溃或断电时不会留下写了一半的数据）。首次打开时把原来的
+stakeholders.json / requirements.json / responses.json / trace_matrix.json 一次性导入，
+原JSON文件保留不动。
+
+每次写入都会递增meta表中的revision，界面据此判断统计结果和图表缓存是否需要重新计算；
+meta表中的database_id在创建数据库时生成，重建数据库后revision从头计数，缓存同时按它区分。
+
+干系人和需求记录带有与服务器同步所需的字段（见 survey_sync.py）：server_id 为服务器上的
+记录ID，server_updated_at 为最近一次同步时服务器记录的 updated_at，local_rev 为最近一次
+未同步的本地修改对应的revision（0表示与服务器一致）。删除已同步过的记录时在sync_deletions
+中保留删除记录，下次同步时推送到服务器。
+"""
+import datetime
+import json
+import os
+import sqlite3
+import uuid
+
+DEFAULT_DB_FILE = 'survey.db'
+SCHEMA_VERSION = 2
+
+STAKEHOLDER_FIELDS = ('id', 'name', 'position', 'function_type', 'level', 'influence', 'interest',
+                      'emotion', 'contact', 'created_at')
+REQUIREMENT_FIELDS = ('id', 'name', 'type', 'priority', 'status', 'source', 'description',
+                      'created_at', 'updated_at')
+TRACE_FIELDS = ('design', 'development', 'testing', 'status')
+# 参与服务器同步的表
+SYNC_TABLES = ('stakeholders', 'requirements')
+
+# 需求以用户输入的编号为主键，列表顺序按插入顺序（rowid）
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS stakeholders (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        position TEXT,
+        function_type TEXT,
+        level TEXT,
+        influence INTEGER,
+        interest INTEGER,
+        emotion TEXT,
+        contact TEXT,
+        created_at TEXT,
+        server_id INTEGER,
+        server_updated_at TEXT,
+        local_rev INTEGER NOT NULL DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS requirements (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        type TEXT,
+        priority TEXT,
+        status TEXT,
+        source TEXT,
+        description TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        server_id INTEGER,
+        server_updated_at TEXT,
+        local_rev INTEGER NOT NULL DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS responses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stakeholder TEXT NOT NULL,
+        timestamp TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_responses_stakeholder ON responses (stakeholder)",
+    """CREATE TABLE IF NOT EXISTS response_answers (
+        response_id INTEGER NOT NULL REFERENCES responses (id) ON DELETE CASCADE,
+        question_id INTEGER NOT NULL,
+        answer TEXT,
+        PRIMARY KEY (response_id, question_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS trace_matrix (
+        requirement_id TEXT PRIMARY KEY,
+        design TEXT,
+        development TEXT,
+        testing TEXT,
+        status TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS sync_deletions (
+        kind TEXT NOT NULL,
+        server_id INTEGER NOT NULL,
+        server_updated_at TEXT,
+        PRIMARY KEY (kind, server_id)
+    )""",
+]
+
+# 旧版数据库升级到各版本时执行的语句
+MIGRATIONS = {
+    2: [
+        'ALTER TABLE stakeholders ADD COLUMN server_id INTEGER',
+        'ALTER TABLE stakeholders ADD COLUMN server_updated_at TEXT',
+        'ALTER TABLE stakeholders ADD COLUMN local_rev INTEGER NOT NULL DEFAULT 1',
+        'ALTER TABLE requirements ADD COLUMN server_id INTEGER',
+        'ALTER TABLE requirements ADD COLUMN server_updated_at TEXT',
+        'ALTER TABLE requirements ADD COLUMN local_rev INTEGER NOT NULL DEFAULT 1',
+    ],
+}
+
+JSON_FILES = {
+    'stakeholders': 'stakeholders.json',
+    'requirements': 'requirements.json',
+    'responses': 'responses.json',
+    'trace_matrix': 'trace_matrix.json',
+}
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def default_stakeholders():
+    """没有任何历史数据时的示例干系人"""
+    now = _now()
+    return [
+        {"id": 1, "name": "张经理", "position": "项目经理", "function_type": "管理职能", "level": "高级",
+         "influence": 5, "interest": 5, "emotion": "积极", "contact": "zhang@company.com", "created_at": now},
+        {"id": 2, "name": "李工程师", "position": "系统架构师", "function_type": "技术职能", "level": "专家级",
+         "influence": 4, "interest": 4, "emotion": "中性", "contact": "li@company.com", "created_at": now},
+        {"id": 3, "name": "王业务", "position": "业务分析师", "function_type": "业务职能", "level": "中级",
+         "influence": 3, "interest": 5, "emotion": "积极", "contact": "wang@company.com", "created_at": now},
+    ]
+
+
+def _question_id(key):
+    # JSON中的问题ID是字符串，统一转为整数以便与survey_questions中的id比较
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return key
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SurveyStore:
+    """按记录读写的调查数据存储"""
+
+    def __init__(self, path=DEFAULT_DB_FILE, json_dir=None):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+        version = self.get_meta('schema_version')
+        if version is None:
+            self.migrate_json(json_dir if json_dir is not None else os.path.dirname(os.path.abspath(path)))
+        elif int(version) < SCHEMA_VERSION:
+            self.upgrade(int(version))
+        self._revision = int(self.get_meta('revision') or 0)
+        if self.get_meta('database_id') is None:
+            with self.conn:
+                self._set_meta('database_id', uuid.uuid4().hex)
+
+    def close(self):
+        """合并WAL日志后关闭连接"""
+        if self.conn is not None:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.conn.close()
+            self.conn = None
+
+    # 元数据
+    def get_meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def revision(self):
+        """数据版本号，每次写入后递增"""
+        return self._revision
+
+    def database_id(self):
+        """数据库标识（首次打开时生成的UUID），重建数据库后改变，与revision一起标识一份数据"""
+        return self.get_meta('database_id')
+
+    def _bump(self):
+        # 在写入所在的事务中更新版本号，返回新版本号
+        self._revision += 1
+        self._set_meta('revision', self._revision)
+        return self._revision
+
+    def upgrade(self, version):
+        """按MIGRATIONS把旧版数据库升级到当前版本"""
+        with self.conn:
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                for statement in MIGRATIONS.get(target, []):
+                    self.conn.execute(statement)
+            self._set_meta('schema_version', SCHEMA_VERSION)
+
+    def migrate_json(self, json_dir):
+        """一次性导入旧版JSON文件（在一个事务中完成，失败时不留下部分数据）"""
+        paths = {name: os.path.join(json_dir, filename) for name, filename in JSON_FILES.items()}
+        stakeholders = _read_json(paths['stakeholders'])
+        stakeholders = stakeholders.get('stakeholders', []) if stakeholders is not None else default_stakeholders()
+        requirements = _read_json(paths['requirements']) or []
+        responses = _read_json(paths['responses']) or {}
+        trace_matrix = _read_json(paths['trace_matrix']) or {}
+
+        with self.conn:
+            used_ids = set()
+            for stakeholder in stakeholders:
+                # 旧版按列表长度生成ID，删除后再添加可能出现重复ID，重复时重新分配
+                record = dict(stakeholder)
+                if record.get('id') in used_ids or not isinstance(record.get('id'), int):
+                    record['id'] = None
+                record['id'] = self._insert_stakeholder(record)
+                used_ids.add(record['id'])
+            for requirement in requirements:
+                self._upsert_requirement(requirement)
+            for name, items in responses.items():
+                for response in items:
+                    self._insert_response(response.get('stakeholder', name), response.get('timestamp'),
+                                          response.get('responses', {}))
+            self._upsert_trace(trace_matrix)
+            self._set_meta('schema_version', SCHEMA_VERSION)
+            self._set_meta('migrated_at', _now())
+            self._set_meta('migrated_from', ','.join(name for name, path in paths.items() if os.path.exists(path)))
+
+    # 干系人
+    def load_stakeholders(self):
+        rows = self.conn.execute(f"SELECT {', '.join(STAKEHOLDER_FIELDS)} FROM stakeholders ORDER BY id")
+        return [dict(row) for row in rows]
+
+    def _insert_stakeholder(self, stakeholder, local_rev=1):
+        values = [stakeholder.get(field) for field in STAKEHOLDER_FIELDS] + [local_rev]
+        cursor = self.conn.execute(
+            f"INSERT INTO stakeholders ({', '.join(STAKEHOLDER_FIELDS)}, local_rev) "
+            f"VALUES ({', '.join('?' * (len(STAKEHOLDER_FIELDS) + 1))})", values)
+        return cursor.lastrowid
+
+    def add_stakeholder(self, stakeholder):
+        """新增干系人，ID由数据库分配（忽略传入的id），返回新ID"""
+        with self.conn:
+            return self._insert_stakeholder(dict(stakeholder, id=None), self._bump())
+
+    def update_stakeholder(self, stakeholder):
+        fields = STAKEHOLDER_FIELDS[1:]
+        with self.conn:
+            self.conn.execute(f"UPDATE stakeholders SET {', '.join(f'{field} = ?' for field in fields)}, "
+                              f"local_rev = ? WHERE id = ?",
+                              [stakeholder.get(field) for field in fields] + [self._bump(), stakeholder['id']])
+
+    def delete_stakeholder(self, stakeholder_id):
+        with self.conn:
+            self._bump()
+            self._record_deletion('stakeholders', stakeholder_id)
+            self.conn.execute('DELETE FROM stakeholders WHERE id = ?', (stakeholder_id,))
+
+    # 需求
+    def load_requirements(self):
+        rows = self.conn.execute(f"SELECT {', '.join(REQUIREMENT_FIELDS)} FROM requirements ORDER BY rowid")
+        return [dict(row) for row in rows]
+
+    def requirement_exists(self, requirement_id):
+        return self.conn.execute('SELECT 1 FROM requirements WHERE id = ?', (requirement_id,)).fetchone() is not None
+
+    def _upsert_requirement(self, requirement, local_rev=1):
+        fields = REQUIREMENT_FIELDS[1:] + ('local_rev',)
+        self.conn.execute(
+            f"INSERT INTO requirements ({', '.join(REQUIREMENT_FIELDS)}, local_rev) "
+            f"VALUES ({', '.join('?' * (len(REQUIREMENT_FIELDS) + 1))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in fields)}",
+            [requirement.get(field) for field in REQUIREMENT_FIELDS] + [local_rev])
+
+    def save_requirement(self, requirement):
+        """新增或更新需求（按需求ID）"""
+        with self.conn:
+            self._upsert_requirement(requirement, self._bump())
+
+    def delete_requirement(self, requirement_id):
+        with self.conn:
+            self._bump()
+            self._record_deletion('requirements', requirement_id)
+            self.conn.execute('DELETE FROM requirements WHERE id = ?', (requirement_id,))
+
+    # 调查结果
+    def load_responses(self):
+        """按干系人分组返回调查结果 {姓名: [{"stakeholder", "timestamp", "responses": {问题ID: 答案}}]}"""
+        responses = {}
+        by_id = {}
+        for row in self.conn.execute('SELECT id, stakeholder, timestamp FROM responses ORDER BY id'):
+            record = {'stakeholder': row['stakeholder'], 'timestamp': row['timestamp'], 'responses': {}}
+            by_id[row['id']] = record
+            responses.setdefault(row['stakeholder'], []).append(record)
+        for row in self.conn.execute(
+                'SELECT response_id, question_id, answer FROM response_answers ORDER BY response_id, question_id'):
+            by_id[row['response_id']]['responses'][row['question_id']] = row['answer']
+        return responses
+
+    def _insert_response(self, stakeholder, timestamp, answers):
+        cursor = self.conn.execute('INSERT INTO responses (stakeholder, timestamp) VALUES (?, ?)',
+                                   (stakeholder, timestamp))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO response_answers (response_id, question_id, answer) VALUES (?, ?, ?)',
+            [(cursor.lastrowid, _question_id(q_id), answer) for q_id, answer in answers.items()])
+        return cursor.lastrowid
+
+    def add_response(self, response):
+        """保存一次调查结果，返回记录ID"""
+        with self.conn:
+            self._bump()
+            return self._insert_response(response['stakeholder'], response.get('timestamp'),
+                                         response.get('responses', {}))
+
+    # 追溯矩阵
+    def load_trace_matrix(self):
+        rows = self.conn.execute(f"SELECT requirement_id, {', '.join(TRACE_FIELDS)} FROM trace_matrix ORDER BY rowid")
+        return {row['requirement_id']: {field: row[field] for field in TRACE_FIELDS} for row in rows}
+
+    def _upsert_trace(self, entries):
+        self.conn.executemany(
+            f"INSERT INTO trace_matrix (requirement_id, {', '.join(TRACE_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' * len(TRACE_FIELDS))}) "
+            f"ON CONFLICT (requirement_id) DO UPDATE SET "
+            f"{', '.join(f'{field} = excluded.{field}' for field in TRACE_FIELDS)}",
+            [[requirement_id] + [info.get(field, '') for field in TRACE_FIELDS]
+             for requirement_id, info in entries.items()])
+
+    def save_trace_entries(self, entries):
+        """新增或更新追溯信息 {需求ID: {"design", "development", "testing", "status"}}"""
+        if entries:
+            with self.conn:
+                self._bump()
+                self._upsert_trace(entries)
+
+    # 服务器同步
+    def _record_deletion(self, kind, key):
+        # 已同步到服务器的记录被删除时保留删除记录，下次同步时推送
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO sync_deletions (kind, server_id, server_updated_at) "
+            f"SELECT ?, server_id, server_updated_at FROM {kind} WHERE id = ? AND server_id IS NOT NULL",
+            (kind, key))
+
+    def sync_settings(self):
+        """同步设置 {"url", "project_id", "username"} 及各类型的拉取游标"""
+        settings = {name: self.get_meta(f'sync_{name}') or '' for name in ('url', 'project_id', 'username')}
+        settings['cursors'] = {kind: self.get_meta(f'sync_cursor_{kind}') or '' for kind in SYNC_TABLES}
+        settings['deletion_cursor'] = self.get_meta('sync_cursor_deletions') or ''
+        return settings
+
+    def save_sync_settings(self, url, project_id, username):
+        """保存同步设置；服务器地址或项目改变时清除已有的同步关系，下次同步时全部重新上传"""
+        current = self.sync_settings()
+        with self.conn:
+            if (current['url'], current['project_id']) != (url, str(project_id)):
+                for kind in SYNC_TABLES:
+                    self.conn.execute(f"UPDATE {kind} SET server_id = NULL, server_updated_at = NULL, "
+                                      f"local_rev = MAX(local_rev, 1)")
+                    self._set_meta(f'sync_cursor_{kind}', '')
+                self._set_meta('sync_cursor_deletions', '')
+                self.conn.execute('DELETE FROM sync_deletions')
+            self._set_meta('sync_url', url)
+            self._set_meta('sync_project_id', project_id)
+            self._set_meta('sync_username', username)
+
+    def pending_changes(self, kind):
+        """有未同步修改的记录（含server_id、server_updated_at、local_rev）"""
+        return [dict(row) for row in self.conn.execute(f"SELECT * FROM {kind} WHERE local_rev > 0 ORDER BY rowid")]
+
+    def pending_deletions(self, kind):
+        """未同步的删除 [(server_id, server_updated_at)]"""
+        return [tuple(row) for row in self.conn.execute(
+            'SELECT server_id, server_updated_at FROM sync_deletions WHERE kind = ?', (kind,))]
+
+    def server_index(self, kind):
+        """{server_id: (本地ID, server_updated_at, local_rev)}"""
+        return {row[0]: (row[1], row[2], row[3]) for row in self.conn.execute(
+            f"SELECT server_id, id, server_updated_at, local_rev FROM {kind} WHERE server_id IS NOT NULL")}
+
+    def apply_sync(self, kind, synced=(), remote=(), rebased=(), unlinked=(), dropped=(), cursor=None):
+        """在一个事务中写入一次同步的结果
+
+        synced: [(本地ID, server_id, server_updated_at, local_rev)] 已推送的记录，推送后未再修改时标记为已同步；
+        remote: [(本地ID或None, 字段, server_id, server_updated_at)] 服务器上的记录，覆盖本地或新增；
+        rebased: [(本地ID, server_updated_at)] 冲突时保留本地修改，下次推送覆盖服务器；
+        unlinked: [本地ID] 服务器上已删除的记录，解除关联后下次同步重新上传；
+        dropped: [server_id] 服务器上已删除的记录及已处理的删除记录，删除本地关联的记录和删除记录。
+        返回remote中新增记录的本地ID列表。
+        """
+        fields = STAKEHOLDER_FIELDS if kind == 'stakeholders' else REQUIREMENT_FIELDS
+        created = []
+        with self.conn:
+            self._bump()
+            # 先删除：本地删除与服务器修改冲突时，remote中会以同一server_id重新新增
+            self.conn.executemany(f"DELETE FROM {kind} WHERE server_id = ?", [(server_id,) for server_id in dropped])
+            for key, server_id, server_updated_at, local_rev in synced:
+                self.conn.execute(
+                    f"UPDATE {kind} SET server_id = ?, server_updated_at = ?, "
+                    f"local_rev = CASE WHEN local_rev = ? THEN 0 ELSE local_rev END WHERE id = ?",
+                    (server_id, server_updated_at, local_rev, key))
+            for key, values, server_id, server_updated_at in remote:
+                if key is None:
+                    key = self._insert_remote(kind, fields, values)
+                    created.append(key)
+                columns = [field for field in values if field in fields[1:]]
+                self.conn.execute(
+                    f"UPDATE {kind} SET {''.join(f'{field} = ?, ' for field in columns)}"
+                    f"server_id = ?, server_updated_at = ?, local_rev = 0 WHERE id = ?",
+                    [values[field] for field in columns] + [server_id, server_updated_at, key])
+            self.conn.executemany(f"UPDATE {kind} SET server_updated_at = ? WHERE id = ?",
+                                  [(server_updated_at, key) for key, server_updated_at in rebased])
+            self.conn.executemany(f"UPDATE {kind} SET server_id = NULL, server_updated_at = NULL, "
+                                  f"local_rev = MAX(local_rev, 1) WHERE id = ?", [(key,) for key in unlinked])
+            self.conn.executemany('DELETE FROM sync_deletions WHERE kind = ? AND server_id = ?',
+                                  [(kind, server_id) for server_id in dropped])
+            if cursor is not None:
+                self._set_meta(f'sync_cursor_{kind}', cursor)
+        return created
+
+    def set_deletion_cursor(self, cursor):
+        """保存服务器删除记录的拉取游标（各类型的同步结果都写入后调用）"""
+        with self.conn:
+            self._set_meta('sync_cursor_deletions', cursor)
+
+    def _insert_remote(self, kind, fields, values):
+        if kind == 'stakeholders':
+            return self._insert_stakeholder(dict(values, id=None), 0)
+        # 需求以编号为主键，服务器上新建的需求编号为 SRV-<服务器ID>
+        key = values['id']
+        suffix = 1
+        while self.requirement_exists(key):
+            suffix += 1
+            key = f"{values['id']}-{suffix}"
+        self._upsert_requirement(dict(values, id=key), 0)
+        return key
@@ -0,0 +1,320 @@
+# survey_sync.py
+"""桌面端（xuQiu.py）与需求分析服务器（app.py）之间的双向同步
+
+一次同步只需两次请求：先把本地所有未同步的新增、修改和删除一次性推送到
+POST /api/sync/<项目ID>，再用上次保存的游标从 GET /api/sync/<项目ID> 拉取服务器上
+之后变化的记录和删除的记录ID（记录很多时按页继续拉取）。推送的修改带有本地最近一次
+同步时服务器记录的updated_at，服务器据此检测冲突；拉取到的记录如果本地也有未同步的
+修改，同样作为冲突交给用户选择保留哪一方。服务器上删除的记录在本地一并删除，本地有
+未同步修改的则解除关联，下次同步重新上传。
+
+所有HTTP请求复用同一个持久连接（HTTP/1.1 keep-alive），服务器关闭连接后自动重连。
+读写本地存储的 prepare()/apply()/resolve() 必须在创建SurveyStore的线程（界面主线程）中
+调用，只有网络交换 exchange() 可以放到后台线程执行。
+"""
+import datetime
+import http.client
+import json
+import urllib.parse
+
+SYNC_KINDS = ('stakeholders', 'requirements')
+# 单次推送的记录数（服务器端上限为2000）
+PUSH_BATCH_SIZE = 1000
+PULL_PAGE_SIZE = 2000
+DEFAULT_TIMEOUT = 30
+
+# 本地取值与服务器取值的对应关系（服务器上没有“开发中”，推送为confirmed）
+REQUIREMENT_TYPES = {"功能性需求": "functional", "非功能性需求": "non_functional", "业务需求": "business",
+                     "用户需求": "user"}
+# 优先级一一对应，服务器上的critical在本地为“紧急”，往返同步不会降级
+PRIORITIES = {"紧急": "critical", "高": "high", "中": "medium", "低": "low"}
+STATUSES = {"新建": "collected", "评审中": "analyzing", "已批准": "confirmed", "开发中": "confirmed",
+            "已完成": "completed", "已取消": "rejected"}
+SERVER_PRIORITIES = {value: key for key, value in PRIORITIES.items()}
+SERVER_STATUSES = {"collected": "新建", "analyzing": "评审中", "confirmed": "已批准", "completed": "已完成",
+                   "rejected": "已取消"}
+SERVER_REQUIREMENT_TYPES = {value: key for key, value in REQUIREMENT_TYPES.items()}
+
+
+class SyncError(Exception):
+    """同步请求失败（无法连接、登录失败或服务器返回错误）"""
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def to_server(kind, record):
+    """本地记录转换为服务器字段"""
+    if kind == 'stakeholders':
+        return {
+            'name': record['name'],
+            'role': record.get('position'),
+            'influence': record.get('influence'),
+            'interest': record.get('interest'),
+            'contact_info': record.get('contact'),
+        }
+    return {
+        'title': record['name'],
+        'requirement_type': REQUIREMENT_TYPES.get(record.get('type'), record.get('type')),
+        'priority': PRIORITIES.get(record.get('priority'), record.get('priority')),
+        'status': STATUSES.get(record.get('status'), record.get('status')),
+        'source': record.get('source'),
+        'problem': record.get('description'),
+    }
+
+
+def from_server(kind, record, new=False):
+    """服务器记录转换为本地字段；new为真时补齐本地新建记录需要的字段"""
+    if kind == 'stakeholders':
+        values = {
+            'name': record['name'],
+            'position': record.get('role') or '',
+            'influence': record.get('influence'),
+            'interest': record.get('interest'),
+            'contact': record.get('contact_info') or '',
+        }
+        if new:
+            values.update(function_type='', level='', emotion='', created_at=_now())
+        return values
+    values = {
+        'name': record['title'],
+        'type': SERVER_REQUIREMENT_TYPES.get(record.get('requirement_type'), record.get('requirement_type') or ''),
+        'priority': SERVER_PRIORITIES.get(record.get('priority'), record.get('priority') or ''),
+        'status': SERVER_STATUSES.get(record.get('status'), record.get('status') or ''),
+        'source': record.get('source') or '',
+        'description': record.get('problem') or '',
+        'updated_at': _now(),
+    }
+    if new:
+        values.update(id=f"SRV-{record['id']}", created_at=values['updated_at'])
+    return values
+
+
+class SyncClient:
+    """带登录会话的HTTP客户端，所有请求复用同一个连接"""
+
+    def __init__(self, base_url, username, password, timeout=DEFAULT_TIMEOUT):
+        parts = urllib.parse.urlsplit(base_url if '://' in base_url else f'http://{base_url}')
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise SyncError(f'无效的服务器地址: {base_url}')
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connection = None
+        self.cookie = None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, content_type=None):
+        """发送请求并返回 (状态码, 响应体)
+
+        复用的连接可能已被服务器关闭（keep-alive超时），这种情况下发送失败时重连后重试一次；
+        新建的连接出错时直接报错。
+        """
+        headers = {'Accept': 'application/json'}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in range(2):
+            reused = self.connection is not None
+            if not reused:
+                self._connect()
+            try:
+                self.connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest) as e:
+                self.close()
+                if reused and attempt == 0:
+                    continue
+                raise SyncError(f'无法连接服务器: {e}') from e
+            except OSError as e:
+                self.close()
+                raise SyncError(f'无法连接服务器: {e}') from e
+            for header in response.headers.get_all('Set-Cookie') or []:
+                if header.startswith('session='):
+                    self.cookie = header.split(';', 1)[0]
+            if response.will_close:
+                self.close()
+            return response.status, data
+
+    def login(self):
+        body = urllib.parse.urlencode({'username': self.username, 'password': self.password})
+        status, _ = self.request('POST', '/login', body, 'application/x-www-form-urlencoded')
+        # 登录成功时重定向到首页，失败时返回登录页
+        if status != 302 or not self.cookie:
+            raise SyncError('登录失败，请检查用户名和密码')
+
+    def call(self, method, path, payload=None):
+        """调用JSON接口，会话过期（401）时重新登录后重试"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        if self.cookie is None:
+            self.login()
+        status, data = self.request(method, path, body, 'application/json' if body is not None else None)
+        if status == 401:
+            self.login()
+            status, data = self.request(method, path, body, 'application/json' if body is not None else None)
+        try:
+            result = json.loads(data.decode('utf-8'))
+        except ValueError:
+            raise SyncError(f'服务器返回了无法解析的响应（HTTP {status}）')
+        if status != 200 or not result.get('success'):
+            raise SyncError(result.get('error') or f'服务器返回错误（HTTP {status}）')
+        return result
+
+
+class SurveySync:
+    """本地存储与服务器项目之间的同步"""
+
+    def __init__(self, store, client, project_id):
+        self.store = store
+        self.client = client
+        self.project_id = project_id
+
+    def prepare(self):
+        """读取本地未同步的修改和删除及拉取游标（主线程）"""
+        settings = self.store.sync_settings()
+        plan = {'cursors': settings['cursors'], 'deletion_cursor': settings['deletion_cursor'], 'push': {},
+                'local_revs': {}}
+        for kind in SYNC_KINDS:
+            items = []
+            revs = plan['local_revs'][kind] = {}
+            for record in self.store.pending_changes(kind):
+                key = str(record['id'])
+                revs[key] = (record['id'], record['local_rev'])
+                items.append({'key': key, 'id': record['server_id'], 'base_updated_at': record['server_updated_at'],
+                              'fields': to_server(kind, record)})
+            for server_id, server_updated_at in self.store.pending_deletions(kind):
+                items.append({'key': f'deleted:{server_id}', 'id': server_id, 'base_updated_at': server_updated_at,
+                              'deleted': True})
+            plan['push'][kind] = items
+        return plan
+
+    def exchange(self, plan):
+        """推送本地修改并拉取服务器上的变化（可在后台线程执行）"""
+        path = f'/api/sync/{self.project_id}'
+        pushed = {kind: [] for kind in SYNC_KINDS}
+        items = [(kind, item) for kind in SYNC_KINDS for item in plan['push'][kind]]
+        for start in range(0, len(items), PUSH_BATCH_SIZE):
+            batch = {kind: [] for kind in SYNC_KINDS}
+            for kind, item in items[start:start + PUSH_BATCH_SIZE]:
+                batch[kind].append(item)
+            results = self.client.call('POST', path, batch)['results']
+            for kind in SYNC_KINDS:
+                pushed[kind].extend(results.get(kind, []))
+
+        pulled = {kind: [] for kind in SYNC_KINDS}
+        removed = {kind: [] for kind in SYNC_KINDS}
+        cursors = dict(plan['cursors'])
+        deletion_cursor, reset = plan['deletion_cursor'], False
+        pending, deletions_pending = list(SYNC_KINDS), True
+        while pending or deletions_pending:
+            query = urllib.parse.urlencode(dict(cursors, deletions=deletion_cursor, limit=PULL_PAGE_SIZE))
+            result = self.client.call('GET', f'{path}?{query}')
+            changes, deletions = result['changes'], result['deletions']
+            for kind in pending:
+                pulled[kind].extend(changes[kind]['records'])
+                cursors[kind] = changes[kind]['cursor']
+            pending = [kind for kind in pending if changes[kind]['has_more']]
+            if deletions_pending:
+                for kind in SYNC_KINDS:
+                    removed[kind].extend(deletions[kind])
+                deletion_cursor, reset = deletions['cursor'], deletions['reset']
+                deletions_pending = deletions['has_more']
+        return {'pushed': pushed, 'pulled': pulled, 'cursors': cursors, 'removed': removed,
+                'deletion_cursor': deletion_cursor, 'deletion_reset': reset}
+
+    def apply(self, plan, response):
+        """写入同步结果（主线程），返回 {"pushed", "pulled", "removed", "conflicts", "errors"}"""
+        report = {'pushed': 0, 'pulled': 0, 'removed': 0, 'conflicts': [], 'errors': []}
+        for kind in SYNC_KINDS:
+            revs = plan['local_revs'][kind]
+            synced, remote, unlinked, dropped = [], [], [], []
+            conflict_keys = set()
+            for result in response['pushed'][kind]:
+                status, key = result['status'], result['key']
+                if key.startswith('deleted:'):
+                    if status in ('deleted', 'missing', 'invalid'):
+                        dropped.append(result['id'])
+                    elif status == 'conflict':
+                        # 删除后服务器记录又被他人修改过，保留服务器上的记录
+                        dropped.append(result['id'])
+                        remote.append((None, from_server(kind, result['server'], new=True), result['id'],
+                                       result['server']['updated_at']))
+                    report['pushed'] += status == 'deleted'
+                    continue
+                local_id, local_rev = revs[key]
+                if status in ('created', 'updated'):
+                    synced.append((local_id, result['id'], result['updated_at'], local_rev))
+                    report['pushed'] += 1
+                elif status == 'missing':
+                    unlinked.append(local_id)
+                elif status == 'conflict':
+                    conflict_keys.add(result['id'])
+                    report['conflicts'].append({'kind': kind, 'key': local_id, 'server': result['server']})
+                else:
+                    report['errors'].append(f"{key}: {result.get('error', status)}")
+
+            # 先记录推送结果，拉取到的自己刚推送的记录（updated_at相同）不再重复写入
+            index = self.store.server_index(kind)
+            for local_id, server_id, server_updated_at, _ in synced:
+                index[server_id] = (local_id, server_updated_at, 0)
+
+            # 服务器上删除的记录；删除游标已过期时服务器返回现有的全部ID，本地关联的其余记录都已删除
+            removed = set(response['removed'][kind])
+            if response['deletion_reset']:
+                removed = set(index) - removed
+            for server_id in sorted(removed):
+                local_id, _, local_rev = index.pop(server_id, (None, None, 0))
+                if local_id is not None and local_rev:
+                    # 本地有未同步的修改，保留本地记录并在下次同步时重新上传
+                    unlinked.append(local_id)
+                else:
+                    dropped.append(server_id)
+                    report['removed'] += local_id is not None
+            deleted = {server_id for server_id, _ in self.store.pending_deletions(kind)} - set(dropped)
+            for record in response['pulled'][kind]:
+                server_id = record['id']
+                if server_id in deleted or server_id in conflict_keys:
+                    continue
+                local_id, server_updated_at, local_rev = index.get(server_id, (None, None, 0))
+                if server_updated_at == record['updated_at']:
+                    continue
+                if local_id is not None and local_rev:
+                    report['conflicts'].append({'kind': kind, 'key': local_id, 'server': record})
+                    continue
+                remote.append((local_id, from_server(kind, record, new=local_id is None), server_id,
+                               record['updated_at']))
+            report['pulled'] += len(remote)
+            self.store.apply_sync(kind, synced=synced, remote=remote, unlinked=unlinked, dropped=dropped,
+                                  cursor=response['cursors'][kind])
+        self.store.set_deletion_cursor(response['deletion_cursor'])
+        return report
+
+    def resolve(self, conflicts, keep_local):
+        """处理冲突：keep_local为真时保留本地修改（下次同步覆盖服务器），否则使用服务器上的记录"""
+        for kind in SYNC_KINDS:
+            items = [conflict for conflict in conflicts if conflict['kind'] == kind]
+            if not items:
+                continue
+            if keep_local:
+                self.store.apply_sync(kind, rebased=[(item['key'], item['server']['updated_at']) for item in items])
+            else:
+                self.store.apply_sync(kind, remote=[(item['key'], from_server(kind, item['server']),
+                                                     item['server']['id'], item['server']['updated_at'])
+                                                    for item in items])
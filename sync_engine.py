@@ -0,0 +1,247 @@
+# sync_engine.py
+"""桌面端（xuQiu.py）与服务器之间的增量同步
+
+拉取：按change_log记录id游标返回项目中自上次同步以来新增或修改的干系人和需求（首次同步
+按id分页返回全部记录），一次请求可返回上千条记录。服务器上删除（或移到其他项目）的记录
+按change_log中的删除标记另用一个游标拉取。
+推送：一次请求提交一批新增、修改和删除，在同一个事务中执行。修改和删除需带上客户端
+上次看到的 updated_at（base_updated_at），与服务器当前值不一致时视为冲突，不写入并
+返回服务器上的记录，由客户端决定保留哪一方。
+"""
+import change_log
+from database import db
+from models import Stakeholder, Requirement, ChangeLog
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+# 单次推送的记录数上限（各类型合计）
+MAX_PUSH_ITEMS = 2000
+
+# 参与同步的记录类型：模型及桌面端可读写的字段
+SYNC_KINDS = {
+    'stakeholders': (Stakeholder, ('name', 'role', 'influence', 'interest', 'contact_info')),
+    'requirements': (Requirement, ('title', 'requirement_type', 'priority', 'status', 'source', 'problem')),
+}
+# 新建记录时必填的字段
+REQUIRED_FIELDS = {'stakeholders': 'name', 'requirements': 'title'}
+INTEGER_FIELDS = ('influence', 'interest')
+
+
+def format_timestamp(value):
+    return value.isoformat() if value else None
+
+
+def format_cursor(change_id=None, snapshot=None):
+    """增量游标为 c<change_log记录id>；全量拉取过程中为 s<开始时的change_log记录id>:<已返回的最大记录id>"""
+    if snapshot is not None:
+        return f's{snapshot[0]}:{snapshot[1]}'
+    return f'c{change_id}'
+
+
+def parse_cursor(cursor):
+    """解析游标，返回 ("changes", change_log记录id) 或 ("snapshot", (change_log记录id, 记录id))
+
+    空游标（首次同步）和早期按 (updated_at, id) 生成的游标都从头全量拉取，格式错误抛出ValueError。
+    """
+    if not cursor or '|' in cursor:
+        return 'snapshot', None
+    try:
+        if cursor[0] == 'c':
+            return 'changes', int(cursor[1:])
+        if cursor[0] == 's':
+            since, _, record_id = cursor[1:].partition(':')
+            return 'snapshot', (int(since), int(record_id))
+    except ValueError:
+        pass
+    raise ValueError(f'无效的同步游标: {cursor}')
+
+
+def serialize(kind, record):
+    _, fields = SYNC_KINDS[kind]
+    data = {field: getattr(record, field) for field in fields}
+    data['id'] = record.id
+    data['updated_at'] = format_timestamp(record.updated_at)
+    return data
+
+
+def _query_records(model, fields, project_id):
+    return db.session.query(model.id, model.updated_at, *(getattr(model, field) for field in fields)) \
+        .filter(model.project_id == project_id)
+
+
+def _record(fields, row):
+    return dict(zip(fields, row[2:]), id=row[0], updated_at=format_timestamp(row[1]))
+
+
+def _pull_snapshot(model, fields, project_id, snapshot, limit):
+    """按id分页返回项目内的全部记录；返回完后游标切换为开始时的change_log记录id，期间的变化按变更记录补拉"""
+    since, after_id = snapshot if snapshot is not None else (change_log.latest_cursor(), 0)
+    rows = _query_records(model, fields, project_id).filter(model.id > after_id) \
+        .order_by(model.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = format_cursor(snapshot=(since, rows[-1][0])) if has_more else format_cursor(since)
+    return {'records': [_record(fields, row) for row in rows], 'cursor': cursor, 'has_more': has_more}
+
+
+def _pull_changed(model, fields, project_id, since, limit):
+    """返回change_log记录id在游标之后新增或修改的记录（同一记录多次变化只返回一次当前数据）"""
+    entity = change_log.TRACKED_MODELS[model][0]
+    entries = db.session.query(ChangeLog.id, ChangeLog.entity_id).filter(
+        ChangeLog.project_id == project_id, ChangeLog.id > since, ChangeLog.entity == entity,
+        ChangeLog.action != 'delete').order_by(ChangeLog.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    # 按最后一次变化的顺序返回
+    order = {entity_id: position for position, (_, entity_id) in enumerate(entries)}
+    ids = list(order)
+    rows = []
+    for start in range(0, len(ids), 500):
+        rows.extend(_query_records(model, fields, project_id).filter(model.id.in_(ids[start:start + 500])).all())
+    rows.sort(key=lambda row: order[row[0]])
+    return {'records': [_record(fields, row) for row in rows],
+            'cursor': format_cursor(entries[-1][0] if entries else since), 'has_more': has_more}
+
+
+def pull_changes(project_id, cursors, limit=DEFAULT_PAGE_SIZE):
+    """返回各类型在游标之后变化的记录
+
+    cursors为 {类型: 游标}，返回 {类型: {"records", "cursor", "has_more"}}。
+    只查询同步字段，不加载需求的其余几十个分析字段。
+    首次同步（或游标早于已清理的变更记录）时按id分页返回全部记录，之后按change_log记录id
+    取新增或修改过的记录：change_log的id按提交顺序分配，提交较晚而updated_at较早的记录
+    也排在游标之后，不会漏拉。
+    """
+    changes = {}
+    for kind, (model, fields) in SYNC_KINDS.items():
+        mode, position = parse_cursor(cursors.get(kind))
+        if mode == 'changes' and change_log.cursor_expired(position):
+            mode, position = 'snapshot', None
+        if mode == 'snapshot':
+            changes[kind] = _pull_snapshot(model, fields, project_id, position, limit)
+        else:
+            changes[kind] = _pull_changed(model, fields, project_id, position, limit)
+    return changes
+
+
+def parse_deletion_cursor(cursor):
+    """删除游标为change_log记录id；空游标（首次同步）返回None，格式错误抛出ValueError"""
+    if not cursor:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ValueError(f'无效的删除游标: {cursor}')
+
+
+def pull_deletions(project_id, cursor, limit=DEFAULT_PAGE_SIZE):
+    """返回删除游标之后服务器上删除的干系人和需求ID
+
+    返回 {"cursor", "has_more", "reset", 类型: [ID]}。首次同步（游标为空）时本地还没有关联的记录，
+    只返回当前游标。游标早于已清理的变更记录时无法得知期间的删除，reset为真，各类型返回当前全部
+    记录的ID，客户端删除其余已关联的记录。删除后又以同一ID新建的记录不列入。
+    """
+    since = parse_deletion_cursor(cursor)
+    latest = change_log.latest_cursor()
+    deletions = {'cursor': str(latest), 'has_more': False, 'reset': False}
+    if since is None:
+        return dict(deletions, **{kind: [] for kind in SYNC_KINDS})
+    if change_log.cursor_expired(since):
+        deletions['reset'] = True
+        for kind, (model, _) in SYNC_KINDS.items():
+            deletions[kind] = [row[0] for row in db.session.query(model.id).filter(
+                model.project_id == project_id).order_by(model.id)]
+        return deletions
+
+    entities = {change_log.TRACKED_MODELS[model][0]: kind for kind, (model, _) in SYNC_KINDS.items()}
+    entries = db.session.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id).filter(
+        ChangeLog.project_id == project_id, ChangeLog.id > since, ChangeLog.id <= latest,
+        ChangeLog.action == 'delete', ChangeLog.entity.in_(entities)).order_by(ChangeLog.id).limit(limit + 1).all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        deletions.update(cursor=str(entries[-1][0]), has_more=True)
+    for kind, (model, _) in SYNC_KINDS.items():
+        ids = sorted({entity_id for _, entity, entity_id in entries if entities[entity] == kind})
+        existing = set()
+        for start in range(0, len(ids), 500):
+            existing.update(row[0] for row in db.session.query(model.id).filter(
+                model.project_id == project_id, model.id.in_(ids[start:start + 500])))
+        deletions[kind] = [record_id for record_id in ids if record_id not in existing]
+    return deletions
+
+
+def _clean_fields(kind, values):
+    _, fields = SYNC_KINDS[kind]
+    cleaned = {}
+    for field in fields:
+        if field not in values:
+            continue
+        value = values[field]
+        if field in INTEGER_FIELDS and value is not None:
+            value = int(value)
+        cleaned[field] = value
+    return cleaned
+
+
+def apply_changes(project_id, batch):
+    """在当前会话中应用一批客户端修改（由调用方提交事务）
+
+    batch为 {类型: [{"key", "id", "base_updated_at", "deleted", "fields"}]}，key是客户端自己的
+    记录标识，原样返回。每条记录的结果状态：created、updated、deleted、conflict（服务器记录在
+    base_updated_at之后被修改过，附带服务器记录）、missing（服务器上已删除）、invalid。
+    """
+    results = {}
+    pending = []
+    conflicts = []
+    for kind, items in batch.items():
+        if kind not in SYNC_KINDS:
+            raise ValueError(f'不支持的同步类型: {kind}')
+        model, _ = SYNC_KINDS[kind]
+        ids = [item['id'] for item in items if item.get('id') is not None]
+        existing = {record.id: record for record in
+                    model.query.filter(model.project_id == project_id, model.id.in_(ids)).all()} if ids else {}
+        kind_results = results[kind] = []
+        for item in items:
+            result = {'key': item.get('key'), 'id': item.get('id')}
+            kind_results.append(result)
+            try:
+                fields = _clean_fields(kind, item.get('fields') or {})
+            except (TypeError, ValueError) as e:
+                result.update(status='invalid', error=str(e))
+                continue
+
+            if item.get('id') is None:
+                if item.get('deleted'):
+                    result['status'] = 'deleted'
+                elif not fields.get(REQUIRED_FIELDS[kind]):
+                    result.update(status='invalid', error=f'缺少 {REQUIRED_FIELDS[kind]}')
+                else:
+                    record = model(project_id=project_id, **fields)
+                    db.session.add(record)
+                    result['status'] = 'created'
+                    pending.append((kind, result, record))
+                continue
+
+            record = existing.get(item['id'])
+            if record is None:
+                result['status'] = 'missing'
+            elif format_timestamp(record.updated_at) != item.get('base_updated_at'):
+                result['status'] = 'conflict'
+                conflicts.append((kind, result, record))
+            elif item.get('deleted'):
+                db.session.delete(record)
+                result['status'] = 'deleted'
+            else:
+                for field, value in fields.items():
+                    setattr(record, field, value)
+                result['status'] = 'updated'
+                pending.append((kind, result, record))
+
+    db.session.flush()
+    # 新ID和onupdate生成的updated_at在flush后才有值
+    for kind, result, record in pending:
+        result['id'] = record.id
+        result['updated_at'] = format_timestamp(record.updated_at)
+    for kind, result, record in conflicts:
+        result['server'] = serialize(kind, record)
+    return results
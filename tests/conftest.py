@@ -0,0 +1,8 @@
+# tests/conftest.py
+"""测试配置：使仓库根目录的模块可导入，并启用查询数量断言插件（query_fixtures）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest_plugins = ['query_fixtures']
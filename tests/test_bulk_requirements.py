@@ -0,0 +1,119 @@
+# tests/test_bulk_requirements.py
+"""批量修改、删除需求：受影响的行数、变更记录，里程碑的需求ID列表，以及依赖边和签名随需求一并删除"""
+import pytest
+
+from database import db
+from models import Project, Requirement, Milestone, RequirementDependency, RequirementSignature, ChangeLog
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='批量操作测试项目')
+        db.session.add(project)
+        db.session.flush()
+        requirements = [Requirement(project_id=project.id, title=f'批量需求{i}',
+                                    priority='high' if i < 4 else 'low') for i in range(10)]
+        db.session.add_all(requirements)
+        db.session.flush()
+        # 低优先级需求依赖第一个高优先级需求
+        for requirement in requirements[4:]:
+            requirement.dependencies = f'依赖需求 #{requirements[0].id}'
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        RequirementSignature.query.filter_by(project_id=project_id).delete()
+        RequirementDependency.query.filter_by(project_id=project_id).delete()
+        Requirement.query.filter_by(project_id=project_id).delete()
+        Milestone.query.filter_by(project_id=project_id).delete()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def _changes(project_id, since, action):
+    return sorted(row[0] for row in db.session.query(ChangeLog.entity_id).filter(
+        ChangeLog.project_id == project_id, ChangeLog.id > since,
+        ChangeLog.entity == 'requirement', ChangeLog.action == action))
+
+
+def _ids(project_id, **filters):
+    return sorted(row[0] for row in db.session.query(Requirement.id).filter_by(project_id=project_id, **filters))
+
+
+def test_bulk_update(flask_app, client, project_id):
+    with flask_app.app_context():
+        cursor = db.session.query(db.func.max(ChangeLog.id)).scalar() or 0
+        targets = _ids(project_id, priority='low')
+
+    response = client.post(f'/api/projects/{project_id}/requirements/bulk-update',
+                           json={'filter': {'priority': 'low'}, 'set': {'status': 'in_progress'}})
+    assert response.get_json() == {'success': True, 'updated': 6}
+
+    with flask_app.app_context():
+        assert _ids(project_id, status='in_progress') == targets
+        assert _changes(project_id, cursor, 'update') == targets
+
+
+def test_bulk_delete(flask_app, client, project_id):
+    with flask_app.app_context():
+        cursor = db.session.query(db.func.max(ChangeLog.id)).scalar() or 0
+        targets = _ids(project_id, priority='high')
+        remaining = _ids(project_id, priority='low')
+        assert RequirementSignature.query.filter_by(project_id=project_id).count() == 10
+        assert RequirementDependency.query.filter_by(project_id=project_id).count() == 6
+
+    response = client.post(f'/api/projects/{project_id}/requirements/bulk-delete',
+                           json={'filter': {'priority': 'high'}})
+    assert response.get_json() == {'success': True, 'deleted': 4}
+
+    with flask_app.app_context():
+        assert _ids(project_id) == remaining
+        assert _changes(project_id, cursor, 'delete') == targets
+        assert sorted(row[0] for row in db.session.query(RequirementSignature.requirement_id).filter_by(
+            project_id=project_id)) == remaining
+        # 被删除的需求是全部依赖边的终点
+        assert RequirementDependency.query.filter_by(project_id=project_id).count() == 0
+
+
+def _milestone_lists(project_id):
+    return {m.title: sorted(int(r) for r in m.requirements.split(',') if r) if m.requirements else []
+            for m in Milestone.query.filter_by(project_id=project_id)}
+
+
+def test_bulk_operations_rewrite_milestone_lists(flask_app, client, project_id):
+    with flask_app.app_context():
+        high = _ids(project_id, priority='high')
+        low = _ids(project_id, priority='low')
+    first = client.post(f'/api/milestones/{project_id}', json={'title': '一期', 'requirements': high[:2] + low[:2]}).get_json()['id']
+    client.post(f'/api/milestones/{project_id}', json={'title': '二期', 'requirements': [low[2]]})
+
+    response = client.post(f'/api/projects/{project_id}/requirements/bulk-update',
+                           json={'filter': {'priority': 'low'}, 'set': {'assigned_milestone_id': first}})
+    assert response.get_json() == {'success': True, 'updated': 6}
+    with flask_app.app_context():
+        assert _milestone_lists(project_id) == {'一期': sorted(high[:2] + low), '二期': []}
+
+    response = client.post(f'/api/projects/{project_id}/requirements/bulk-delete', json={'ids': [high[0], low[0]]})
+    assert response.get_json() == {'success': True, 'deleted': 2}
+    with flask_app.app_context():
+        assert _milestone_lists(project_id) == {'一期': [high[1]] + low[1:], '二期': []}
+
+
+def test_delete_project_removes_edges(flask_app, client):
+    with flask_app.app_context():
+        project = Project(name='删除项目测试')
+        db.session.add(project)
+        db.session.flush()
+        first = Requirement(project_id=project.id, title='被依赖的需求')
+        db.session.add(first)
+        db.session.flush()
+        db.session.add(Requirement(project_id=project.id, title='依赖方', dependencies=f'依赖需求 #{first.id}'))
+        db.session.commit()
+        project_id = project.id
+        assert RequirementDependency.query.filter_by(project_id=project_id).count() == 1
+
+    assert client.post(f'/project/{project_id}/delete').get_json() == {'success': True}
+    with flask_app.app_context():
+        assert RequirementDependency.query.filter_by(project_id=project_id).count() == 0
+        assert RequirementSignature.query.filter_by(project_id=project_id).count() == 0
@@ -0,0 +1,10 @@
+# tests/test_dependencies.py
+"""依赖图接口的参数校验"""
+
+
+def test_requirement_dependencies_validation(client, seeded_project):
+    assert client.get('/api/dependencies/999999/1').status_code == 404
+    for days_per_point in ('-1', '0'):
+        response = client.get(f'/api/dependencies/{seeded_project}/1?days_per_point={days_per_point}')
+        assert response.status_code == 400
+        assert client.get(f'/api/dependencies/{seeded_project}?days_per_point={days_per_point}').status_code == 400
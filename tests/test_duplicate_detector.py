@@ -0,0 +1,81 @@
+# tests/test_duplicate_detector.py
+"""导入时的重复检查只与导入前已有的需求比较；签名随需求写入维护，检测接口不写数据库"""
+import pytest
+
+from database import db
+from models import Project, Requirement, RequirementSignature
+
+ORIGINAL = '操作员在换班时需要手工抄写设备运行参数，经常抄错并且耗费大量时间，希望系统能够自动采集并生成交接班报表'
+REWORDED = '操作员在换班时需要手工抄写设备运行参数，经常抄错并且耗费大量时间，希望系统能够自动采集并生成交接班报告'
+OTHER = '仓库管理员每天盘点库存时需要逐个扫描货架条码，盘点一次需要半天，希望支持批量识别货架上的全部条码标签'
+OTHER_REWORDED = '仓库管理员每天盘点库存时需要逐个扫描货架条码，盘点一次需要半天，希望支持批量识别货架上的所有条码标签'
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='重复检测测试项目')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        RequirementSignature.query.filter_by(project_id=project_id).delete()
+        Requirement.query.filter_by(project_id=project_id).delete()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def test_signatures_written_with_requirements(flask_app, project_id):
+    with flask_app.app_context():
+        requirement = Requirement(project_id=project_id, title=ORIGINAL)
+        db.session.add(requirement)
+        db.session.commit()
+        first = db.session.get(RequirementSignature, requirement.id).signature
+        requirement.title = OTHER
+        db.session.commit()
+        assert db.session.get(RequirementSignature, requirement.id).signature != first
+        db.session.delete(requirement)
+        db.session.commit()
+        assert db.session.get(RequirementSignature, requirement.id) is None
+
+
+def test_import_check_ignores_same_batch(flask_app, project_id):
+    from app import check_imported_duplicates
+
+    with flask_app.app_context():
+        existing = Requirement(project_id=project_id, title=ORIGINAL)
+        db.session.add(existing)
+        db.session.commit()
+        existing_id = existing.id
+        last_id = db.session.query(db.func.max(Requirement.id)).scalar()
+
+        batch = [Requirement(project_id=project_id, title=title) for title in (REWORDED, OTHER, OTHER_REWORDED)]
+        db.session.add_all(batch)
+        db.session.flush()
+        duplicates = check_imported_duplicates(project_id, last_id, 'skip')
+
+        assert [(item['id'], item['duplicate_of']) for item in duplicates] == [(batch[0].id, existing_id)]
+        remaining = {row[0] for row in db.session.query(Requirement.id).filter_by(project_id=project_id)}
+        assert remaining == {existing_id, batch[1].id, batch[2].id}
+        # 尚未提交：回滚后本批导入（含跳过的重复需求）全部撤销
+        db.session.rollback()
+        assert db.session.query(Requirement.id).filter_by(project_id=project_id).all() == [(existing_id,)]
+
+
+def test_detect_duplicates_is_read_only(flask_app, client, project_id):
+    with flask_app.app_context():
+        db.session.add(Requirement(project_id=project_id, title=ORIGINAL))
+        db.session.commit()
+        # 直接用SQL写入的需求没有签名
+        db.session.execute(db.insert(Requirement).values(project_id=project_id, title=REWORDED))
+        db.session.commit()
+        signatures = RequirementSignature.query.filter_by(project_id=project_id).count()
+
+    response = client.get(f'/api/duplicates/{project_id}')
+    data = response.get_json()
+    assert data['success'] and data['signatures_computed'] == 1
+    assert data['duplicate_groups'] == 1
+
+    with flask_app.app_context():
+        assert RequirementSignature.query.filter_by(project_id=project_id).count() == signatures
@@ -0,0 +1,49 @@
+# tests/test_kano.py
+"""KANO评估接口：答案合并、单次问答字段、无法识别的答案和requirement_id校验"""
+import pytest
+
+from database import db
+from models import Project, Requirement
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='KANO测试项目')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        db.session.commit()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def test_kano_evaluation(flask_app, client, project_id):
+    with flask_app.app_context():
+        surveyed = Requirement(project_id=project_id, title='调查需求')
+        single = Requirement(project_id=project_id, title='单次问答需求',
+                             kano_positive_answer='like', kano_negative_answer='dislike')
+        garbled = Requirement(project_id=project_id, title='答案无法识别的需求', kano_category='must_be',
+                              kano_survey_data='[["maybe", "perhaps"]]')
+        db.session.add_all([surveyed, single, garbled])
+        db.session.commit()
+        surveyed_id, single_id, garbled_id = surveyed.id, single.id, garbled.id
+
+    response = client.post(f'/api/kano/{project_id}', json={'responses': [
+        {'requirement_id': str(surveyed_id), 'functional': 'like', 'dysfunctional': 'neutral'}]})
+    results = {item['requirement_id']: item for item in response.get_json()['results']}
+    assert results[surveyed_id]['category'] == 'attractive'
+    assert results[single_id]['category'] == 'one_dimensional'
+    assert results[garbled_id]['category'] is None
+
+    with flask_app.app_context():
+        categories = dict(db.session.query(Requirement.id, Requirement.kano_category).filter_by(project_id=project_id))
+        assert categories == {surveyed_id: 'attractive', single_id: 'one_dimensional', garbled_id: 'must_be'}
+
+    for responses in ([{'requirement_id': 'abc', 'functional': 'like', 'dysfunctional': 'like'}],
+                      [{'requirement_id': None}], 'like'):
+        response = client.post(f'/api/kano/{project_id}', json={'responses': responses})
+        assert response.status_code == 400
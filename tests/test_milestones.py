@@ -0,0 +1,79 @@
+# tests/test_milestones.py
+"""里程碑的需求以需求的assigned_milestone_id为准，里程碑接口和需求修改接口同时维护里程碑的需求ID列表"""
+import pytest
+
+from database import db
+from models import Project, Requirement, Milestone
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='里程碑测试项目')
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([Requirement(project_id=project.id, title=f'里程碑需求{i}') for i in range(6)])
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        Milestone.query.filter_by(project_id=project_id).delete()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def _requirement_ids(project_id):
+    return sorted(row[0] for row in db.session.query(Requirement.id).filter_by(project_id=project_id))
+
+
+def _membership(project_id):
+    """{里程碑ID: (按assigned_milestone_id的需求, 里程碑的需求ID列表)}"""
+    result = {}
+    for milestone in Milestone.query.filter_by(project_id=project_id):
+        assigned = sorted(row[0] for row in db.session.query(Requirement.id).filter_by(
+            assigned_milestone_id=milestone.id))
+        listed = [int(r) for r in milestone.requirements.split(',') if r] if milestone.requirements else []
+        result[milestone.id] = (assigned, listed)
+    return result
+
+
+def test_milestone_api_assigns_requirements(flask_app, client, project_id):
+    with flask_app.app_context():
+        ids = _requirement_ids(project_id)
+
+    first = client.post(f'/api/milestones/{project_id}', json={'title': '一期', 'requirements': ids[:3]}).get_json()['id']
+    second = client.post(f'/api/milestones/{project_id}', json={'title': '二期', 'requirements': [ids[2], ids[3]]}).get_json()['id']
+    with flask_app.app_context():
+        assert _membership(project_id) == {first: (ids[:2], ids[:2]), second: (ids[2:4], ids[2:4])}
+
+    roadmap = {m['id']: [r['id'] for r in m['requirements']] for m in client.get(f'/api/roadmap/{project_id}').get_json()}
+    assert roadmap == {first: ids[:2], second: ids[2:4]}
+
+    assert client.put(f'/api/milestones/{first}', json={'title': '一期', 'requirements': [ids[1], ids[4]]}).status_code == 200
+    with flask_app.app_context():
+        assert _membership(project_id) == {first: ([ids[1], ids[4]], [ids[1], ids[4]]), second: (ids[2:4], ids[2:4])}
+
+    assert client.put(f'/api/milestones/{first}', json={'title': '一期', 'requirements': ['x']}).status_code == 400
+    assert client.delete(f'/api/milestones/{second}').status_code == 200
+    with flask_app.app_context():
+        assert _membership(project_id) == {first: ([ids[1], ids[4]], [ids[1], ids[4]])}
+        assert db.session.query(Requirement.id).filter(Requirement.assigned_milestone_id == second).count() == 0
+
+
+def test_patch_moves_requirement_between_milestone_lists(flask_app, client, project_id):
+    with flask_app.app_context():
+        ids = _requirement_ids(project_id)
+    first = client.post(f'/api/milestones/{project_id}', json={'title': '一期', 'requirements': ids[:2]}).get_json()['id']
+    second = client.post(f'/api/milestones/{project_id}', json={'title': '二期', 'requirements': []}).get_json()['id']
+
+    response = client.patch(f'/api/requirements/{ids[0]}', json={'assigned_milestone_id': second})
+    assert response.status_code == 200
+    with flask_app.app_context():
+        assert _membership(project_id) == {first: ([ids[1]], [ids[1]]), second: ([ids[0]], [ids[0]])}
+
+    response = client.patch(f'/api/projects/{project_id}/requirements', json={'items': [
+        {'id': ids[1], 'assigned_milestone_id': None}, {'id': ids[2], 'assigned_milestone_id': first}]})
+    assert response.status_code == 200
+    with flask_app.app_context():
+        assert _membership(project_id) == {first: ([ids[2]], [ids[2]]), second: ([ids[0]], [ids[0]])}
@@ -0,0 +1,38 @@
+# tests/test_project_stats.py
+"""增量维护的项目统计与按需求表重新统计的结果一致"""
+import pytest
+
+import project_stats
+from database import db
+from models import Project, Requirement
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='项目统计测试项目')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        db.session.commit()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def test_actual_value_completion_counts_assessed_requirements(flask_app, project_id):
+    with flask_app.app_context():
+        requirements = [Requirement(project_id=project_id, title=f'统计需求{i}') for i in range(3)]
+        requirements[0].actual_roi = 2.5
+        db.session.add_all(requirements)
+        db.session.commit()
+        # actual_roi默认为0，未评估实际价值的需求不计入
+        assert project_stats.get_project_stats(project_id)['completion']['actual_value'] == 1
+
+        requirements[1].actual_roi = 1.0
+        requirements[0].actual_roi = 0
+        db.session.commit()
+        assert project_stats.get_project_stats(project_id)['completion']['actual_value'] == 1
+        assert project_stats.reconcile([project_id], fix=False) == []
@@ -0,0 +1,25 @@
+# tests/test_query_budgets.py
+"""已优化接口的SQL查询数量上限，查询数随里程碑或需求数量增长（N+1）时失败"""
+
+
+def test_roadmap_data_queries(seeded_project, assert_max_queries):
+    response = assert_max_queries(f'/api/roadmap/{seeded_project}', 2)
+    milestones = response.get_json()
+    assert len(milestones) == 4
+    assert all(len(m['requirements']) == 5 for m in milestones)
+
+
+def test_kanban_view_queries(seeded_project, assert_max_queries):
+    response = assert_max_queries(f'/project/{seeded_project}/kanban', 3)
+    assert response.status_code == 200
+
+
+def test_roadmap_planning_queries(seeded_project, assert_max_queries):
+    response = assert_max_queries(f'/project/{seeded_project}/roadmap', 4)
+    assert response.status_code == 200
+
+
+def test_project_stats_queries(seeded_project, assert_max_queries):
+    response = assert_max_queries(f'/api/projects/{seeded_project}/stats', 2)
+    stats = response.get_json()['stats']
+    assert stats['total'] == 20
@@ -0,0 +1,58 @@
+# tests/test_roadmap_optimizer.py
+"""路线图规划写回时只修改参与规划的需求，手工分配到已完成或容量为0的里程碑的需求保持不变"""
+from datetime import date
+
+import pytest
+
+from database import db
+from models import Project, Requirement, Milestone
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='路线图规划测试项目')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        Milestone.query.filter_by(project_id=project_id).delete()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def test_apply_keeps_manual_assignments(flask_app, client, project_id):
+    with flask_app.app_context():
+        done = Milestone(project_id=project_id, title='已完成', status='completed', deadline=date(2026, 1, 1))
+        frozen = Milestone(project_id=project_id, title='冻结', deadline=date(2026, 3, 1))
+        planned = Milestone(project_id=project_id, title='规划', deadline=date(2026, 6, 1))
+        db.session.add_all([done, frozen, planned])
+        db.session.flush()
+        requirements = [
+            Requirement(project_id=project_id, title='已完成里程碑中的需求', estimated_effort=3,
+                        estimated_roi=5, assigned_milestone_id=done.id),
+            Requirement(project_id=project_id, title='冻结里程碑中的需求', estimated_effort=3,
+                        estimated_roi=5, assigned_milestone_id=frozen.id),
+            Requirement(project_id=project_id, title='规划里程碑中放不下的需求', estimated_effort=5,
+                        estimated_roi=1, assigned_milestone_id=planned.id),
+            Requirement(project_id=project_id, title='未分配的需求', estimated_effort=4, estimated_roi=4),
+        ]
+        db.session.add_all(requirements)
+        db.session.commit()
+        ids = [r.id for r in requirements]
+        done_id, frozen_id, planned_id = done.id, frozen.id, planned.id
+
+    response = client.post(f'/api/roadmap/{project_id}/optimize',
+                           json={'capacities': {str(planned_id): 5}, 'apply': True})
+    result = response.get_json()
+    assert result['success'] and result['pinned_requirements'] == 2
+    assert [r['id'] for m in result['milestones'] for r in m['requirements']] == [ids[3]]
+
+    with flask_app.app_context():
+        assigned = dict(db.session.query(Requirement.id, Requirement.assigned_milestone_id).filter(
+            Requirement.project_id == project_id))
+        assert assigned == {ids[0]: done_id, ids[1]: frozen_id, ids[2]: None, ids[3]: planned_id}
+        lists = {m.id: m.requirements for m in Milestone.query.filter_by(project_id=project_id)}
+        assert lists == {done_id: str(ids[0]), frozen_id: str(ids[1]), planned_id: str(ids[3])}
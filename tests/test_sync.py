@@ -0,0 +1,67 @@
+# tests/test_sync.py
+"""桌面端同步拉取：首次全量分页，之后按变更记录游标拉取，提交较晚而updated_at较早的记录不会漏拉"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from models import Project, Requirement
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='同步测试项目')
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([Requirement(project_id=project.id, title=f'同步需求{i}') for i in range(5)])
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        db.session.commit()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def _pull(client, project_id, cursor):
+    response = client.get(f'/api/sync/{project_id}?requirements={cursor}&limit=2')
+    assert response.status_code == 200
+    return response.get_json()['changes']['requirements']
+
+
+def _pull_all(client, project_id, cursor=''):
+    records = []
+    while True:
+        page = _pull(client, project_id, cursor)
+        records.extend(record['id'] for record in page['records'])
+        cursor = page['cursor']
+        if not page['has_more']:
+            return records, cursor
+
+
+def test_pull_uses_commit_order(flask_app, client, project_id):
+    with flask_app.app_context():
+        ids = sorted(row[0] for row in db.session.query(Requirement.id).filter_by(project_id=project_id))
+
+    records, cursor = _pull_all(client, project_id)
+    assert records == ids
+    assert _pull_all(client, project_id, cursor) == ([], cursor)
+
+    with flask_app.app_context():
+        latest = Requirement(project_id=project_id, title='新需求')
+        db.session.add(latest)
+        db.session.commit()
+        # 模拟提交较晚的写入：updated_at早于已拉取的记录
+        late = db.session.get(Requirement, ids[0])
+        late.title = '提交较晚的修改'
+        late.updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        latest_id = latest.id
+
+    records, cursor = _pull_all(client, project_id, cursor)
+    assert records == [latest_id, ids[0]]
+    # 早期 (updated_at, id) 格式的游标从头全量拉取，格式错误返回400
+    assert len(_pull_all(client, project_id, '2026-01-01T00:00:00|3')[0]) == 6
+    assert client.get(f'/api/sync/{project_id}?requirements=x1').status_code == 400
@@ -0,0 +1,52 @@
+# tests/test_vsm.py
+"""VSM计算：写回的周期时间为瓶颈步骤的有效节拍，交付周期为加工和等待时间合计"""
+import json
+
+import pytest
+
+import vsm_engine
+from database import db
+from models import Project, Requirement
+
+STEPS = [
+    {'name': '需求评审', 'process_time': 2, 'wait_time': 10},
+    {'name': '开发', 'process_time': 12, 'wait_time': 4, 'operators': 3},
+    {'name': '测试', 'process_time': 6, 'wait_time': 6},
+]
+
+
+@pytest.fixture
+def project_id(flask_app):
+    with flask_app.app_context():
+        project = Project(name='VSM测试项目')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+    yield project_id
+    with flask_app.app_context():
+        Requirement.query.filter_by(project_id=project_id).delete()
+        db.session.commit()
+        db.session.delete(db.session.get(Project, project_id))
+        db.session.commit()
+
+
+def test_build_arrays_without_future_state():
+    arrays = vsm_engine.build_arrays([(1, json.dumps(STEPS), None), (2, None, None)], future=True)
+    assert arrays.requirement_ids == [1] and arrays.has_future == [False]
+
+
+def test_cycle_time_is_bottleneck(flask_app, client, project_id):
+    with flask_app.app_context():
+        requirement = Requirement(project_id=project_id, title='VSM需求', vsm_process_steps_json=json.dumps(STEPS))
+        db.session.add(requirement)
+        db.session.commit()
+        req_id = requirement.id
+
+    result = client.post(f'/api/vsm/{project_id}').get_json()
+    assert result['success']
+    with flask_app.app_context():
+        requirement = db.session.get(Requirement, req_id)
+        # 测试步骤 6/1 大于开发步骤 12/3
+        assert requirement.cycle_time == 6
+        assert requirement.lead_time == 40
+        assert requirement.process_efficiency == 50
@@ -0,0 +1,193 @@
+# virtual_tree.py
+"""只创建可见行的Treeview列表（桌面端xuQiu.py使用）
+
+数据保存在Python列表中，Treeview里始终只有当前窗口能显示的几十行，滚动时按偏移量
+重新填充这些行；新增、修改、删除单条记录时只更新对应的数据，必要时重绘可见窗口，
+不再清空后重新插入整个列表。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+# 鼠标滚轮每格滚动的行数
+WHEEL_ROWS = 3
+
+
+class VirtualTreeview(ttk.Frame):
+    """虚拟化的表格列表
+
+    每行由唯一的key标识（如干系人ID、需求ID）。选中行变化时调用command(key)，
+    selected_key() 返回当前选中行的key（滚动到窗口外后仍保持选中）。
+    """
+
+    def __init__(self, parent, columns, height=15, column_width=100, command=None, xscroll=False):
+        super().__init__(parent)
+        self.height = height
+        self.command = command
+        self.keys = []
+        self.rows = {}
+        self.offset = 0
+        self.selected = None
+        self._visible = {}
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=column_width, anchor=tk.CENTER)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        if xscroll:
+            h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+            self.tree.configure(xscroll=h_scrollbar.set)
+            h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", lambda e: self._render())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda e: self._step(-1))
+        self.tree.bind("<Down>", lambda e: self._step(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()))
+
+    # 数据操作
+    def set_rows(self, rows):
+        """整体替换数据 [(key, values), ...]"""
+        self.keys = []
+        self.rows = {}
+        for key, values in rows:
+            self.keys.append(key)
+            self.rows[key] = values
+        if self.selected not in self.rows:
+            self.selected = None
+        self._render()
+
+    def upsert(self, key, values):
+        """新增（追加到末尾）或修改一行，只重绘受影响的可见行"""
+        if key in self.rows:
+            self.rows[key] = values
+            iid = str(key)
+            if iid in self._visible:
+                self.tree.item(iid, values=values)
+            return
+        self.keys.append(key)
+        self.rows[key] = values
+        self._render()
+
+    def delete(self, key):
+        if key not in self.rows:
+            return
+        del self.rows[key]
+        self.keys.remove(key)
+        if self.selected == key:
+            self.selected = None
+        self._render()
+
+    def selected_key(self):
+        return self.selected
+
+    def clear_selection(self):
+        self.selected = None
+        self.tree.selection_remove(self.tree.selection())
+
+    def see(self, key):
+        """滚动到指定行"""
+        if key in self.rows:
+            position = self.keys.index(key)
+            rows = self.visible_rows()
+            if not self.offset <= position < self.offset + rows:
+                self.offset = position
+                self._render()
+
+    # 滚动与绘制
+    def visible_rows(self):
+        """当前窗口能显示的行数（按表头高度和行高计算）"""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if bbox:
+            header, row_height = bbox[1], bbox[3]
+        else:
+            header, row_height = DEFAULT_ROW_HEIGHT, DEFAULT_ROW_HEIGHT
+        available = self.tree.winfo_height() - header
+        if available <= row_height:
+            return self.height
+        return max(1, available // row_height)
+
+    def scroll(self, delta):
+        self.offset += delta
+        self._render()
+        return "break"
+
+    def _step(self, delta):
+        # 键盘上下移动选中行，到达窗口边缘时滚动
+        if not self.keys:
+            return "break"
+        position = self.keys.index(self.selected) + delta if self.selected in self.rows else 0
+        position = min(max(position, 0), len(self.keys) - 1)
+        self.see(self.keys[position])
+        self._select(self.keys[position])
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        rows = self.visible_rows()
+        if action == 'moveto':
+            self.offset = int(round(float(amount) * len(self.keys)))
+        elif unit == 'pages':
+            self.offset += int(amount) * rows
+        else:
+            self.offset += int(amount)
+        self._render()
+
+    def _render(self):
+        rows = self.visible_rows()
+        self.offset = min(max(self.offset, 0), max(len(self.keys) - rows, 0))
+        window = self.keys[self.offset:self.offset + rows]
+
+        # 复用已存在的行：先删除不在窗口内的，再按顺序插入或移动
+        wanted = {str(key): key for key in window}
+        stale = [iid for iid in self._visible if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+        for position, key in enumerate(window):
+            iid = str(key)
+            if iid in self._visible:
+                self.tree.item(iid, values=self.rows[key])
+                self.tree.move(iid, "", position)
+            else:
+                self.tree.insert("", position, iid=iid, values=self.rows[key])
+        self._visible = wanted
+
+        selected = str(self.selected) if self.selected is not None else None
+        if selected in wanted:
+            if self.tree.selection() != (selected,):
+                self.tree.selection_set(selected)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        if self.keys:
+            total = len(self.keys)
+            self.scrollbar.set(self.offset / total, min((self.offset + rows) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _select(self, key):
+        self.selected = key
+        iid = str(key)
+        if iid in self._visible and self.tree.selection() != (iid,):
+            self.tree.selection_set(iid)
+        if self.command:
+            self.command(key)
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        # 绘制时恢复选中或行滚出窗口引起的事件不视为用户选择
+        if not selection or selection[0] not in self._visible:
+            return
+        key = self._visible[selection[0]]
+        if key != self.selected:
+            self.selected = key
+            if self.command:
+                self.command(key)
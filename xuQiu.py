@@ -2,11 +2,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
+import os
 import datetime
 from collections import defaultdict
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import survey_engine
+from survey_store import SurveyStore
+from survey_sync import SurveySync, SyncClient
+from virtual_tree import VirtualTreeview
+
+# matplotlib导入耗时较长，只在首次打开数据分析标签页时导入（见 load_plotting）
+survey_charts = None
+FigureCanvasTkAgg = None
+
+# 图片缓存模式下分析图表PNG的保存目录（与survey.db同目录）
+CHART_CACHE_DIR = 'chart_cache'
+# 后台任务完成情况的轮询间隔（毫秒）
+POLL_INTERVAL_MS = 50
+
+
+def load_plotting():
+    """首次调用时导入matplotlib和图表模块"""
+    global survey_charts, FigureCanvasTkAgg
+    if survey_charts is None:
+        import survey_charts as charts_module
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        survey_charts, FigureCanvasTkAgg = charts_module, canvas_class
+    return survey_charts
+
 
 class StakeholderSurveyApp:
     def __init__(self, root):
@@ -66,13 +90,28 @@ class StakeholderSurveyApp:
         ]
         
         self.current_stakeholder_index = 0
-        self.responses = defaultdict(list)
         
-        self.load_data()
-        self.load_requirements()
-        self.load_trace_matrix()
+        # 本地SQLite存储，首次运行时自动导入旧版JSON数据文件
+        self.store = SurveyStore()
+        self.stakeholders = self.store.load_stakeholders()
+        self.requirements = self.store.load_requirements()
+        self.responses = defaultdict(list, self.store.load_responses())
+        self.requirement_trace_matrix = self.store.load_trace_matrix()
+        # 汇总统计和PNG绘制在单个后台线程中执行，结果按数据版本缓存
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._summary_cache = (None, None)
+        # 与服务器同步使用的HTTP客户端（保持连接和登录会话，多次同步之间复用）
+        self.sync_client = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
         
+    def on_close(self):
+        self.executor.shutdown(wait=False)
+        if self.sync_client is not None:
+            self.sync_client.close()
+        self.store.close()
+        self.root.destroy()
+        
     def create_widgets(self):
         # 创建主框架
         main_frame = ttk.Frame(self.root)
@@ -81,24 +120,46 @@ class StakeholderSurveyApp:
         # 创建标题
         title_label = tk.Label(main_frame, text="干系人需求调查系统", 
                               font=("Arial", 20, "bold"), fg="#2c3e50", bg='#f0f0f0')
-        title_label.pack(pady=(0, 20))
+        title_label.pack(pady=(0, 10))
         
-        # 创建笔记本控件（标签页）
-        notebook = ttk.Notebook(main_frame)
-        notebook.pack(fill=tk.BOTH, expand=True)
-        
-        # 创建各个标签页
-        self.create_stakeholder_tab(notebook)
-        self.create_requirement_tab(notebook)  # 新增：需求管理标签页
-        self.create_survey_tab(notebook)
-        self.create_trace_matrix_tab(notebook)  # 新增：需求追溯矩阵标签页
-        self.create_analysis_tab(notebook)
-        self.create_report_tab(notebook)
+        # 服务器同步
+        sync_bar = ttk.Frame(main_frame)
+        sync_bar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(sync_bar, text="与服务器同步", command=self.open_sync_dialog).pack(side=tk.RIGHT)
+        self.sync_status = ttk.Label(sync_bar, text="")
+        self.sync_status.pack(side=tk.RIGHT, padx=10)
         
-    def create_stakeholder_tab(self, notebook):
-        stakeholder_frame = ttk.Frame(notebook)
-        notebook.add(stakeholder_frame, text="干系人管理")
+        # 创建笔记本控件（标签页）
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # 先添加空白标签页，内容在首次选中时才创建（启动时只创建第一个标签页）
+        self.pending_tabs = {}
+        for text, builder in (
+            ("干系人管理", self.create_stakeholder_tab),
+            ("需求管理", self.create_requirement_tab),
+            ("需求调查", self.create_survey_tab),
+            ("需求追溯矩阵", self.create_trace_matrix_tab),
+            ("数据分析", self.create_analysis_tab),
+            ("调查报告", self.create_report_tab),
+        ):
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=text)
+            self.pending_tabs[str(frame)] = (frame, builder)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.build_tab(self.notebook.select())
+        
+    def build_tab(self, tab_id):
+        """创建尚未创建的标签页内容"""
+        pending = self.pending_tabs.pop(str(tab_id), None)
+        if pending:
+            frame, builder = pending
+            builder(frame)
+            
+    def on_tab_changed(self, event):
+        self.build_tab(self.notebook.select())
         
+    def create_stakeholder_tab(self, stakeholder_frame):
         # 干系人信息输入区域
         input_frame = ttk.LabelFrame(stakeholder_frame, text="添加/编辑干系人", padding=10)
         input_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -165,33 +226,16 @@ class StakeholderSurveyApp:
         list_frame = ttk.LabelFrame(stakeholder_frame, text="干系人列表", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # 创建表格
+        # 创建表格（只创建可见行，选中行时填充表单）
         columns = ("ID", "姓名", "职位", "职能类型", "职级", "影响力", "关注度", "情绪状态")
-        self.stakeholder_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=15)
-        
-        # 设置列标题
-        for col in columns:
-            self.stakeholder_tree.heading(col, text=col)
-            self.stakeholder_tree.column(col, width=100, anchor=tk.CENTER)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.stakeholder_tree.yview)
-        self.stakeholder_tree.configure(yscroll=scrollbar.set)
-        
-        self.stakeholder_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 绑定选择事件
-        self.stakeholder_tree.bind("<<TreeviewSelect>>", self.on_stakeholder_select)
+        self.stakeholder_tree = VirtualTreeview(list_frame, columns, height=15, column_width=100,
+                                                command=self.on_stakeholder_select)
+        self.stakeholder_tree.pack(fill=tk.BOTH, expand=True)
         
         # 加载数据
-        self.load_data()
         self.refresh_stakeholder_list()
         
-    def create_requirement_tab(self, notebook):
-        requirement_frame = ttk.Frame(notebook)
-        notebook.add(requirement_frame, text="需求管理")
-        
+    def create_requirement_tab(self, requirement_frame):
         # 需求信息输入区域
         input_frame = ttk.LabelFrame(requirement_frame, text="添加/编辑需求", padding=10)
         input_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -214,7 +258,7 @@ class StakeholderSurveyApp:
         
         # 优先级
         ttk.Label(input_frame, text="优先级:").grid(row=1, column=2, sticky=tk.W, pady=5)
-        self.req_priority = ttk.Combobox(input_frame, values=["高", "中", "低"], width=27)
+        self.req_priority = ttk.Combobox(input_frame, values=["紧急", "高", "中", "低"], width=27)
         self.req_priority.grid(row=1, column=3, padx=5, pady=5)
         self.req_priority.set("中")
         
@@ -247,32 +291,16 @@ class StakeholderSurveyApp:
         list_frame = ttk.LabelFrame(requirement_frame, text="需求列表", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # 创建表格
+        # 创建表格（只创建可见行，选中行时填充表单）
         columns = ("ID", "名称", "类型", "优先级", "状态", "来源")
-        self.requirement_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=10)
-        
-        # 设置列标题
-        for col in columns:
-            self.requirement_tree.heading(col, text=col)
-            self.requirement_tree.column(col, width=120, anchor=tk.CENTER)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.requirement_tree.yview)
-        self.requirement_tree.configure(yscroll=scrollbar.set)
-        
-        self.requirement_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 绑定选择事件
-        self.requirement_tree.bind("<<TreeviewSelect>>", self.on_requirement_select)
+        self.requirement_tree = VirtualTreeview(list_frame, columns, height=10, column_width=120,
+                                                command=self.on_requirement_select)
+        self.requirement_tree.pack(fill=tk.BOTH, expand=True)
         
         # 加载数据
         self.refresh_requirement_list()
         
-    def create_survey_tab(self, notebook):
-        survey_frame = ttk.Frame(notebook)
-        notebook.add(survey_frame, text="需求调查")
-        
+    def create_survey_tab(self, survey_frame):
         # 调查控制区域
         control_frame = ttk.LabelFrame(survey_frame, text="调查控制", padding=10)
         control_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -284,7 +312,7 @@ class StakeholderSurveyApp:
         ttk.Button(control_frame, text="开始调查", command=self.start_survey).grid(row=0, column=2, padx=5, pady=5)
         ttk.Button(control_frame, text="保存结果", command=self.save_survey).grid(row=0, column=3, padx=5, pady=5)
 
-        self.refresh_stakeholder_list()
+        self.survey_stakeholder['values'] = [s["name"] for s in self.stakeholders]
         
         # 创建包含滚动条的画布和滚动区域
         survey_canvas_frame = ttk.Frame(survey_frame)
@@ -331,10 +359,7 @@ class StakeholderSurveyApp:
         # 处理鼠标滚轮事件
         self.survey_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
-    def create_trace_matrix_tab(self, notebook):
-        trace_frame = ttk.Frame(notebook)
-        notebook.add(trace_frame, text="需求追溯矩阵")
-        
+    def create_trace_matrix_tab(self, trace_frame):
         # 控制区域
         control_frame = ttk.Frame(trace_frame)
         control_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -346,52 +371,43 @@ class StakeholderSurveyApp:
         matrix_frame = ttk.Frame(trace_frame)
         matrix_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # 创建表格
+        # 创建表格（只创建可见行）
         columns = ("需求ID", "需求名称", "关联设计", "关联开发", "关联测试", "状态")
-        self.trace_tree = ttk.Treeview(matrix_frame, columns=columns, show="headings", height=15)
-        
-        # 设置列标题
-        for col in columns:
-            self.trace_tree.heading(col, text=col)
-            self.trace_tree.column(col, width=120, anchor=tk.CENTER)
-        
-        # 添加滚动条
-        v_scrollbar = ttk.Scrollbar(matrix_frame, orient=tk.VERTICAL, command=self.trace_tree.yview)
-        h_scrollbar = ttk.Scrollbar(matrix_frame, orient=tk.HORIZONTAL, command=self.trace_tree.xview)
-        self.trace_tree.configure(yscroll=v_scrollbar.set, xscroll=h_scrollbar.set)
-        
-        self.trace_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        # 绑定选择事件
-        self.trace_tree.bind("<<TreeviewSelect>>", self.on_trace_select)
+        self.trace_tree = VirtualTreeview(matrix_frame, columns, height=15, column_width=120,
+                                          command=self.on_trace_select, xscroll=True)
+        self.trace_tree.pack(fill=tk.BOTH, expand=True)
         
         # 加载数据
         self.refresh_trace_matrix()
         
-    def create_analysis_tab(self, notebook):
-        analysis_frame = ttk.Frame(notebook)
-        notebook.add(analysis_frame, text="数据分析")
-        
+    def create_analysis_tab(self, analysis_frame):
         # 控制面板
         control_panel = ttk.Frame(analysis_frame)
         control_panel.pack(fill=tk.X, padx=10, pady=10)
         
         ttk.Button(control_panel, text="生成分析报告", command=self.generate_analysis).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_panel, text="导出数据", command=self.export_data).pack(side=tk.LEFT, padx=5)
+        self.chart_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_panel, text="使用图片缓存", variable=self.chart_cache_var).pack(side=tk.LEFT, padx=5)
+        self.chart_status = ttk.Label(control_panel, text="")
+        self.chart_status.pack(side=tk.LEFT, padx=10)
         
-        # 图表区域
+        # 图表区域：Figure和画布只创建一次，之后每次分析更新同一组图形对象
         self.chart_frame = ttk.Frame(analysis_frame)
         self.chart_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # 创建默认图表
-        self.create_default_charts()
-        
-    def create_report_tab(self, notebook):
-        report_frame = ttk.Frame(notebook)
-        notebook.add(report_frame, text="调查报告")
-        
+        charts = load_plotting()
+        self.analysis_figure = charts.new_figure()
+        charts.draw_placeholder(self.analysis_figure)
+        self.analysis_chart = None
+        self.analysis_canvas = FigureCanvasTkAgg(self.analysis_figure, self.chart_frame)
+        self.analysis_canvas.draw()
+        self.analysis_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # 图片缓存模式下显示PNG的标签
+        self.chart_image_label = ttk.Label(self.chart_frame)
+        self.chart_image = None
+        
+    def create_report_tab(self, report_frame):
         # 报告控制
         report_control = ttk.Frame(report_frame)
         report_control.pack(fill=tk.X, padx=10, pady=10)
@@ -425,7 +441,7 @@ class StakeholderSurveyApp:
             return
             
         stakeholder = {
-            "id": len(self.stakeholders) + 1,
+            "id": None,
             "name": name,
             "position": position,
             "function_type": function_type,
@@ -437,20 +453,19 @@ class StakeholderSurveyApp:
             "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
+        stakeholder["id"] = self.store.add_stakeholder(stakeholder)
         self.stakeholders.append(stakeholder)
-        self.refresh_stakeholder_list()
+        self.stakeholder_tree.upsert(stakeholder["id"], self.stakeholder_row(stakeholder))
+        self.stakeholder_tree.see(stakeholder["id"])
+        self.update_survey_stakeholders()
         self.clear_form()
-        self.save_data()
         messagebox.showinfo("成功", f"干系人 {name} 已添加")
         
     def update_stakeholder(self):
-        selected = self.stakeholder_tree.selection()
-        if not selected:
+        stakeholder_id = self.stakeholder_tree.selected_key()
+        if stakeholder_id is None:
             messagebox.showwarning("选择错误", "请先选择要更新的干系人")
             return
-            
-        item = self.stakeholder_tree.item(selected[0])
-        stakeholder_id = int(item['values'][0])
         
         name = self.name_entry.get().strip()
         position = self.position_entry.get().strip()
@@ -479,26 +494,25 @@ class StakeholderSurveyApp:
                     "contact": contact,
                     "created_at": stakeholder["created_at"]
                 }
+                self.store.update_stakeholder(self.stakeholders[i])
+                self.stakeholder_tree.upsert(stakeholder_id, self.stakeholder_row(self.stakeholders[i]))
                 break
                 
-        self.refresh_stakeholder_list()
-        self.save_data()
+        self.update_survey_stakeholders()
         messagebox.showinfo("成功", f"干系人 {name} 已更新")
         
     def delete_stakeholder(self):
-        selected = self.stakeholder_tree.selection()
-        if not selected:
+        stakeholder_id = self.stakeholder_tree.selected_key()
+        if stakeholder_id is None:
             messagebox.showwarning("选择错误", "请先选择要删除的干系人")
             return
             
         if messagebox.askyesno("确认删除", "确定要删除选中的干系人吗？"):
-            item = self.stakeholder_tree.item(selected[0])
-            stakeholder_id = int(item['values'][0])
-            
+            self.store.delete_stakeholder(stakeholder_id)
             self.stakeholders = [s for s in self.stakeholders if s["id"] != stakeholder_id]
-            self.refresh_stakeholder_list()
+            self.stakeholder_tree.delete(stakeholder_id)
+            self.update_survey_stakeholders()
             self.clear_form()
-            self.save_data()
             messagebox.showinfo("成功", "干系人已删除")
             
     def clear_form(self):
@@ -513,50 +527,46 @@ class StakeholderSurveyApp:
         self.emotion.set("中性")
         self.contact_entry.delete(0, tk.END)
 
+    def stakeholder_row(self, stakeholder):
+        return (
+            stakeholder["id"],
+            stakeholder["name"],
+            stakeholder["position"],
+            stakeholder["function_type"],
+            stakeholder["level"],
+            stakeholder["influence"],
+            stakeholder["interest"],
+            stakeholder["emotion"]
+        )
+
     def refresh_stakeholder_list(self):
-        # 清空现有数据
-        for item in self.stakeholder_tree.get_children():
-            self.stakeholder_tree.delete(item)
-            
-        # 添加数据
-        for stakeholder in self.stakeholders:
-            self.stakeholder_tree.insert("", tk.END, values=(
-                stakeholder["id"],
-                stakeholder["name"],
-                stakeholder["position"],
-                stakeholder["function_type"],
-                stakeholder["level"],
-                stakeholder["influence"],
-                stakeholder["interest"],
-                stakeholder["emotion"]
-            ))
-            
+        self.stakeholder_tree.set_rows((s["id"], self.stakeholder_row(s)) for s in self.stakeholders)
+        self.update_survey_stakeholders()
+
+    def update_survey_stakeholders(self):
         # 更新调查下拉框（如果已创建）
         stakeholder_names = [s["name"] for s in self.stakeholders]
         # 只有当 survey_stakeholder 已经创建时才更新它
         if hasattr(self, 'survey_stakeholder') and self.survey_stakeholder is not None:
             self.survey_stakeholder['values'] = stakeholder_names
 
-    def on_stakeholder_select(self, event):
-        selected = self.stakeholder_tree.selection()
-        if selected:
-            item = self.stakeholder_tree.item(selected[0])
-            values = item['values']
-            
+    def on_stakeholder_select(self, stakeholder_id):
+        stakeholder = next((s for s in self.stakeholders if s["id"] == stakeholder_id), None)
+        if stakeholder:
             # 填充表单
             self.name_entry.delete(0, tk.END)
-            self.name_entry.insert(0, values[1])
+            self.name_entry.insert(0, stakeholder["name"])
             
             self.position_entry.delete(0, tk.END)
-            self.position_entry.insert(0, values[2])
+            self.position_entry.insert(0, stakeholder["position"] or "")
             
-            self.function_type.set(values[3])
-            self.level.set(values[4])
-            self.influence.set(values[5])
-            self.interest.set(values[6])
-            self.influence_label.config(text=str(values[5]))
-            self.interest_label.config(text=str(values[6]))
-            self.emotion.set(values[7])
+            self.function_type.set(stakeholder["function_type"])
+            self.level.set(stakeholder["level"])
+            self.influence.set(stakeholder["influence"])
+            self.interest.set(stakeholder["interest"])
+            self.influence_label.config(text=str(stakeholder["influence"]))
+            self.interest_label.config(text=str(stakeholder["interest"]))
+            self.emotion.set(stakeholder["emotion"])
             
     def add_requirement(self):
         req_id = self.req_id_entry.get().strip()
@@ -570,6 +580,9 @@ class StakeholderSurveyApp:
         if not req_id or not name:
             messagebox.showwarning("输入错误", "请输入需求ID和需求名称")
             return
+        if self.store.requirement_exists(req_id):
+            messagebox.showwarning("输入错误", f"需求ID {req_id} 已存在")
+            return
             
         requirement = {
             "id": req_id,
@@ -583,20 +596,18 @@ class StakeholderSurveyApp:
             "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
+        self.store.save_requirement(requirement)
         self.requirements.append(requirement)
-        self.refresh_requirement_list()
+        self.requirement_tree.upsert(req_id, self.requirement_row(requirement))
+        self.requirement_tree.see(req_id)
         self.clear_requirement_form()
-        self.save_requirements()
         messagebox.showinfo("成功", f"需求 {name} 已添加")
         
     def update_requirement(self):
-        selected = self.requirement_tree.selection()
-        if not selected:
+        req_id = self.requirement_tree.selected_key()
+        if req_id is None:
             messagebox.showwarning("选择错误", "请先选择要更新的需求")
             return
-            
-        item = self.requirement_tree.item(selected[0])
-        req_id = item['values'][0]
         
         name = self.req_name_entry.get().strip()
         req_type = self.req_type.get()
@@ -622,26 +633,23 @@ class StakeholderSurveyApp:
                     "created_at": requirement["created_at"],
                     "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
+                self.store.save_requirement(self.requirements[i])
+                self.requirement_tree.upsert(req_id, self.requirement_row(self.requirements[i]))
                 break
                 
-        self.refresh_requirement_list()
-        self.save_requirements()
         messagebox.showinfo("成功", f"需求 {name} 已更新")
         
     def delete_requirement(self):
-        selected = self.requirement_tree.selection()
-        if not selected:
+        req_id = self.requirement_tree.selected_key()
+        if req_id is None:
             messagebox.showwarning("选择错误", "请先选择要删除的需求")
             return
             
         if messagebox.askyesno("确认删除", "确定要删除选中的需求吗？"):
-            item = self.requirement_tree.item(selected[0])
-            req_id = item['values'][0]
-            
+            self.store.delete_requirement(req_id)
             self.requirements = [r for r in self.requirements if r["id"] != req_id]
-            self.refresh_requirement_list()
+            self.requirement_tree.delete(req_id)
             self.clear_requirement_form()
-            self.save_requirements()
             messagebox.showinfo("成功", "需求已删除")
             
     def clear_requirement_form(self):
@@ -653,54 +661,45 @@ class StakeholderSurveyApp:
         self.req_source.delete(0, tk.END)
         self.req_desc.delete("1.0", tk.END)
         
+    def requirement_row(self, requirement):
+        return (
+            requirement["id"],
+            requirement["name"],
+            requirement["type"],
+            requirement["priority"],
+            requirement["status"],
+            requirement["source"]
+        )
+        
     def refresh_requirement_list(self):
-        # 清空现有数据
-        for item in self.requirement_tree.get_children():
-            self.requirement_tree.delete(item)
-            
-        # 添加数据
-        for requirement in self.requirements:
-            self.requirement_tree.insert("", tk.END, values=(
-                requirement["id"],
-                requirement["name"],
-                requirement["type"],
-                requirement["priority"],
-                requirement["status"],
-                requirement["source"]
-            ))
-            
-    def on_requirement_select(self, event):
-        selected = self.requirement_tree.selection()
-        if selected:
-            item = self.requirement_tree.item(selected[0])
-            values = item['values']
+        self.requirement_tree.set_rows((r["id"], self.requirement_row(r)) for r in self.requirements)
             
+    def on_requirement_select(self, req_id):
+        req = next((r for r in self.requirements if r["id"] == req_id), None)
+        if req:
             # 填充表单
             self.req_id_entry.delete(0, tk.END)
-            self.req_id_entry.insert(0, values[0])
+            self.req_id_entry.insert(0, req["id"])
             
             self.req_name_entry.delete(0, tk.END)
-            self.req_name_entry.insert(0, values[1])
+            self.req_name_entry.insert(0, req["name"])
             
-            self.req_type.set(values[2])
-            self.req_priority.set(values[3])
-            self.req_status.set(values[4])
-            
-            # 查找完整需求信息
-            for req in self.requirements:
-                if req["id"] == values[0]:
-                    self.req_source.delete(0, tk.END)
-                    self.req_source.insert(0, req["source"])
-                    self.req_desc.delete("1.0", tk.END)
-                    self.req_desc.insert("1.0", req["description"])
-                    break
+            self.req_type.set(req["type"])
+            self.req_priority.set(req["priority"])
+            self.req_status.set(req["status"])
+            self.req_source.delete(0, tk.END)
+            self.req_source.insert(0, req["source"] or "")
+            self.req_desc.delete("1.0", tk.END)
+            self.req_desc.insert("1.0", req["description"] or "")
                     
     def generate_trace_matrix(self):
-        # 清空现有数据
-        for item in self.trace_tree.get_children():
-            self.trace_tree.delete(item)
-            
+        self.refresh_trace_matrix()
+        self.store.save_trace_entries(self.requirement_trace_matrix)
+        messagebox.showinfo("成功", "需求追溯矩阵已生成")
+        
+    def refresh_trace_matrix(self):
         # 生成追溯矩阵数据
+        rows = []
         for requirement in self.requirements:
             # 检查是否已有追溯信息，如果没有则创建默认值
             if requirement["id"] not in self.requirement_trace_matrix:
@@ -713,17 +712,15 @@ class StakeholderSurveyApp:
                 
             trace_info = self.requirement_trace_matrix[requirement["id"]]
             
-            self.trace_tree.insert("", tk.END, values=(
+            rows.append((requirement["id"], (
                 requirement["id"],
                 requirement["name"],
                 trace_info["design"],
                 trace_info["development"],
                 trace_info["testing"],
                 trace_info["status"]
-            ))
-            
-        self.save_trace_matrix()
-        messagebox.showinfo("成功", "需求追溯矩阵已生成")
+            )))
+        self.trace_tree.set_rows(rows)
         
     def export_trace_matrix(self):
         if not self.requirement_trace_matrix:
@@ -755,10 +752,7 @@ class StakeholderSurveyApp:
             except Exception as e:
                 messagebox.showerror("导出失败", f"导出数据时出错: {str(e)}")
                 
-    def refresh_trace_matrix(self):
-        self.generate_trace_matrix()
-        
-    def on_trace_select(self, event):
+    def on_trace_select(self, requirement_id):
         # 这里可以添加选择追溯矩阵行时的操作
         pass
         
@@ -824,205 +818,156 @@ class StakeholderSurveyApp:
             "responses": responses
         }
         
+        self.store.add_response(response_data)
         self.responses[stakeholder_name].append(response_data)
-        self.save_responses()
         
         messagebox.showinfo("保存成功", f"{stakeholder_name} 的调查结果已保存")
         
-    def generate_analysis(self):
-        # 清空图表区域
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
+    def run_in_background(self, task, callback, error_title="处理失败", error_message="统计调查数据时出错"):
+        """在后台线程执行task，完成后在主线程调用callback(结果)"""
+        future = self.executor.submit(task)
+        
+        def poll():
+            if not future.done():
+                self.root.after(POLL_INTERVAL_MS, poll)
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                messagebox.showerror(error_title, f"{error_message}: {str(e)}")
+                return
+            callback(result)
+            
+        self.root.after(POLL_INTERVAL_MS, poll)
+        
+    def summary_task(self):
+        """在主线程复制当前数据，返回 (数据版本, 可在后台线程执行的汇总函数)
+        
+        数据分析图表和调查报告共用同一份汇总结果，同一数据版本只汇总一次。
+        """
+        revision = self.store.revision()
+        responses = {name: list(items) for name, items in self.responses.items()}
+        stakeholders = [dict(s) for s in self.stakeholders]
+        
+        def compute():
+            cached_revision, summary = self._summary_cache
+            if cached_revision != revision:
+                summary = survey_engine.summarize(responses, self.survey_questions, stakeholders, self.level_weights)
+                self._summary_cache = (revision, summary)
+            return summary
             
+        return revision, compute
+        
+    def generate_analysis(self):
         if not self.responses:
             messagebox.showwarning("无数据", "暂无调查数据可供分析")
             return
-        # 设置matplotlib支持中文显示
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        charts = load_plotting()
+        revision, compute = self.summary_task()
+        database_id = self.store.database_id()
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(self.store.path)), CHART_CACHE_DIR)
+        use_png = self.chart_cache_var.get()
+        
+        def task():
+            # 汇总和图表数值在后台线程计算，界面线程只更新图形对象
+            data = charts.chart_data(compute())
+            path = charts.render_png(data, cache_dir, database_id, revision) if use_png else None
+            return revision, data, path
             
-        # 创建图表
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
-        fig.suptitle('干系人需求调查分析报告', fontsize=16)
-        
-        # 1. 干系人情绪分布
-        emotions = []
-        for responses in self.responses.values():
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '情绪状态':
-                        emotions.append(answer)
-                        
-        if emotions:
-            emotion_counts = pd.Series(emotions).value_counts()
-            ax1.pie(emotion_counts.values, labels=emotion_counts.index, autopct='%1.1f%%')
-            ax1.set_title('干系人情绪状态分布')
-        
-        # 2. 需求重要性分析
-        # 加权重要性分析
-        weighted_importance_scores = []
-        total_weight = 0
-        
-        for stakeholder_name, responses in self.responses.items():
-            # 获取干系人职级
-            stakeholder = next((s for s in self.stakeholders if s['name'] == stakeholder_name), None)
-            if not stakeholder:
-                continue
-                
-            weight = self.level_weights.get(stakeholder['level'], 1.0)
-            
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '需求重要性':
-                        score_map = {
-                            "非常重要": 5, "重要": 4, "一般": 3, "不重要": 2, "完全不重要": 1
-                        }
-                        score = score_map.get(answer, 0)
-                        weighted_importance_scores.append(score * weight)
-                        total_weight += weight
-        
-        if weighted_importance_scores:
-            ax2.hist(weighted_importance_scores, bins=5, edgecolor='black')
-            ax2.set_xlabel('重要性评分')
-            ax2.set_ylabel('频次')
-            ax2.set_title('需求重要性分布')
-            ax2.set_xticks([1, 2, 3, 4, 5])
-            ax2.set_xticklabels(['完全不重要', '不重要', '一般', '重要', '非常重要'], rotation=45)
-        
-        # 3. 需求紧急性分析 (新增)
-        urgency_scores = []
-        for responses in self.responses.values():
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '需求紧急性':
-                        # 将文字转换为分数
-                        score_map = {
-                            "非常紧急": 5, "紧急": 4, "一般": 3, "不紧急": 2, "完全不紧急": 1
-                        }
-                        urgency_scores.append(score_map.get(answer, 0))
-                        
-        if urgency_scores:
-            ax3.hist(urgency_scores, bins=5, edgecolor='black')
-            ax3.set_xlabel('紧急性评分')
-            ax3.set_ylabel('频次')
-            ax3.set_title('需求紧急性分布')
-            ax3.set_xticks([1, 2, 3, 4, 5])
-            ax3.set_xticklabels(['完全不紧急', '不紧急', '一般', '紧急', '非常紧急'], rotation=45)
-        else:
-            ax3.text(0.5, 0.5, '暂无紧急性数据', ha='center', va='center', transform=ax3.transAxes)
-        
-        # 4. 职能类型分布
-        function_types = [s['function_type'] for s in self.stakeholders]
-        if function_types:
-            function_counts = pd.Series(function_types).value_counts()
-            ax4.bar(function_counts.index, function_counts.values)
-            ax4.set_xlabel('职能类型')
-            ax4.set_ylabel('人数')
-            ax4.set_title('干系人职能类型分布')
-            ax4.tick_params(axis='x', rotation=45)
-        
-        # 如果没有职能类型数据，则在第4个子图显示提示信息
+        self.chart_status.config(text="正在生成分析图表...")
+        self.run_in_background(task, self.show_analysis, "分析失败")
+        
+    def show_analysis(self, result):
+        revision, data, path = result
+        canvas_widget = self.analysis_canvas.get_tk_widget()
+        if path:
+            self.chart_image = tk.PhotoImage(file=path)
+            self.chart_image_label.configure(image=self.chart_image)
+            canvas_widget.pack_forget()
+            self.chart_image_label.pack(fill=tk.BOTH, expand=True)
         else:
-            ax4.text(0.5, 0.5, '暂无职能类型数据', ha='center', va='center', transform=ax4.transAxes)
-        
-        plt.tight_layout()
-        
-        # 在Tkinter中显示图表
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            if self.analysis_chart is None:
+                # 首次分析时替换占位提示，创建坐标轴和图形对象，之后只更新数据
+                self.analysis_chart = survey_charts.AnalysisChart(self.analysis_figure)
+            self.analysis_chart.update(data)
+            self.chart_image_label.pack_forget()
+            canvas_widget.pack(fill=tk.BOTH, expand=True)
+            self.analysis_canvas.draw_idle()
+        self.chart_status.config(text=f"数据版本: {revision}")
 
     def generate_report(self):
+        revision, compute = self.summary_task()
+        requirements = list(self.requirements)
+        generated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.report_text.delete(1.0, tk.END)
+        self.report_text.insert(tk.END, "正在生成报告...\n")
+        self.run_in_background(lambda: self.format_report(compute(), requirements, generated_at),
+                               self.show_report, "报告生成失败")
         
+    def show_report(self, report):
+        self.report_text.delete(1.0, tk.END)
+        self.report_text.insert(tk.END, report)
+        
+    def format_report(self, summary, requirements, generated_at):
+        """根据汇总结果生成报告文本（在后台线程调用，不访问界面控件）"""
         report = f"""
 干系人需求调查报告
-生成时间: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+生成时间: {generated_at}
 
 ====================================================
 
 一、干系人概况
 ----------------------------------------------------
-总干系人数: {len(self.stakeholders)}
+总干系人数: {summary['stakeholder_count']}
 
 职能类型分布:
 """
         # 职能类型统计
-        function_types = [s['function_type'] for s in self.stakeholders]
-        function_counts = pd.Series(function_types).value_counts()
-        for func, count in function_counts.items():
+        for func, count in summary['function_types']:
             report += f"  {func}: {count}人\n"
             
         report += "\n职级分布:\n"
         # 职级统计
-        levels = [s['level'] for s in self.stakeholders]
-        level_counts = pd.Series(levels).value_counts()
-        for level, count in level_counts.items():
+        for level, count in summary['levels']:
             report += f"  {level}: {count}人\n"
             
         report += f"\n二、调查数据概览\n----------------------------------------------------\n"
-        report += f"已完成调查人数: {len(self.responses)}\n"
-        total_responses = sum(len(responses) for responses in self.responses.values())
-        report += f"总调查次数: {total_responses}\n"
+        report += f"已完成调查人数: {summary['respondents']}\n"
+        report += f"总调查次数: {summary['total_responses']}\n"
         
         # 情绪分析
-        emotions = []
-        for responses in self.responses.values():
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '情绪状态':
-                        emotions.append(answer)
-                        
-        if emotions:
-            emotion_counts = pd.Series(emotions).value_counts()
+        emotion_total = sum(count for _, count in summary['emotions'])
+        if emotion_total:
             report += "\n情绪状态分布:\n"
-            for emotion, count in emotion_counts.items():
-                percentage = (count / len(emotions)) * 100
+            for emotion, count in summary['emotions']:
+                percentage = (count / emotion_total) * 100
                 report += f"  {emotion}: {count}人 ({percentage:.1f}%)\n"
                 
-        # 需求重要性分析
-        importance_scores = []
-        for responses in self.responses.values():
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '需求重要性':
-                        score_map = {
-                            "非常重要": 5, "重要": 4, "一般": 3, "不重要": 2, "完全不重要": 1
-                        }
-                        importance_scores.append(score_map.get(answer, 0))
-                        
-        if importance_scores:
-            avg_importance = sum(importance_scores) / len(importance_scores)
-            report += f"\n平均需求重要性评分: {avg_importance:.2f} (满分5分)\n"
-            
-        # 需求紧急性分析 (新增)
-        urgency_scores = []
-        for responses in self.responses.values():
-            for response in responses:
-                for q_id, answer in response['responses'].items():
-                    question = next((q for q in self.survey_questions if q['id'] == q_id), None)
-                    if question and question['category'] == '需求紧急性':
-                        score_map = {
-                            "非常紧急": 5, "紧急": 4, "一般": 3, "不紧急": 2, "完全不紧急": 1
-                        }
-                        urgency_scores.append(score_map.get(answer, 0))
-                        
-        if urgency_scores:
-            avg_urgency = sum(urgency_scores) / len(urgency_scores)
-            report += f"平均需求紧急性评分: {avg_urgency:.2f} (满分5分)\n"
+        # 需求重要性、紧急性、满意度、合作意愿评分
+        importance = summary['scores'][survey_engine.IMPORTANCE]
+        if importance['count']:
+            report += f"\n平均需求重要性评分: {importance['mean']:.2f} (满分5分)\n"
+            if importance['weighted_mean'] is not None:
+                report += f"按职级加权的需求重要性评分: {importance['weighted_mean']:.2f} (满分5分)\n"
+        for category, label in ((survey_engine.URGENCY, '平均需求紧急性评分'),
+                                (survey_engine.SATISFACTION, '平均满意度评分'),
+                                (survey_engine.COOPERATION, '平均合作意愿评分')):
+            stats = summary['scores'][category]
+            if stats['count']:
+                report += f"{label}: {stats['mean']:.2f} (满分5分)\n"
+                
+        if summary['cooperation_distribution']:
+            report += "\n合作意愿分布:\n"
+            for answer, count in summary['cooperation_distribution']:
+                report += f"  {answer}: {count}次\n"
             
         # 需求统计
         report += f"\n三、需求管理概览\n----------------------------------------------------\n"
-        report += f"总需求数量: {len(self.requirements)}\n"
+        report += f"总需求数量: {len(requirements)}\n"
         
         # 需求状态统计
         status_counts = {}
-        for req in self.requirements:
+        for req in requirements:
             status = req['status']
             status_counts[status] = status_counts.get(status, 0) + 1
             
@@ -1032,7 +977,7 @@ class StakeholderSurveyApp:
             
         # 需求优先级统计
         priority_counts = {}
-        for req in self.requirements:
+        for req in requirements:
             priority = req['priority']
             priority_counts[priority] = priority_counts.get(priority, 0) + 1
             
@@ -1040,8 +985,95 @@ class StakeholderSurveyApp:
         for priority, count in priority_counts.items():
             report += f"  {priority}: {count}个\n"
             
-        self.report_text.insert(tk.END, report)
+        return report
 
+    def open_sync_dialog(self):
+        settings = self.store.sync_settings()
+        dialog = tk.Toplevel(self.root)
+        dialog.title("与服务器同步")
+        dialog.transient(self.root)
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        entries = {}
+        for row, (name, label, value) in enumerate((
+            ("url", "服务器地址:", settings["url"] or "http://127.0.0.1:5000"),
+            ("project_id", "项目ID:", settings["project_id"]),
+            ("username", "用户名:", settings["username"]),
+            ("password", "密码:", ""),
+        )):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=5)
+            entry = ttk.Entry(frame, width=35, show="*" if name == "password" else "")
+            entry.insert(0, value)
+            entry.grid(row=row, column=1, pady=5, padx=5)
+            entries[name] = entry
+            
+        ttk.Button(frame, text="开始同步",
+                   command=lambda: self.start_sync(dialog, {name: entry.get().strip() for name, entry in entries.items()})
+                   ).grid(row=4, column=0, columnspan=2, pady=10)
+        
+    def start_sync(self, dialog, values):
+        if not values["url"] or not values["username"]:
+            messagebox.showwarning("输入错误", "请输入服务器地址和用户名", parent=dialog)
+            return
+        if not values["project_id"].isdigit():
+            messagebox.showwarning("输入错误", "项目ID必须为数字", parent=dialog)
+            return
+        dialog.destroy()
+        
+        self.store.save_sync_settings(values["url"], values["project_id"], values["username"])
+        client = self.sync_client
+        if client is None or (client.base_url, client.username, client.password) != \
+                (values["url"], values["username"], values["password"]):
+            if client is not None:
+                client.close()
+            try:
+                client = self.sync_client = SyncClient(values["url"], values["username"], values["password"])
+            except Exception as e:
+                messagebox.showerror("同步失败", str(e))
+                return
+        sync = SurveySync(self.store, client, int(values["project_id"]))
+        plan = sync.prepare()
+        self.sync_status.config(text="正在同步...")
+        self.run_in_background(lambda: sync.exchange(plan),
+                               lambda response: self.finish_sync(sync, plan, response),
+                               "同步失败", "与服务器同步时出错")
+        
+    def finish_sync(self, sync, plan, response):
+        report = sync.apply(plan, response)
+        conflicts = report["conflicts"]
+        if conflicts:
+            keep_local = messagebox.askyesnocancel(
+                "同步冲突",
+                f"有 {len(conflicts)} 条记录在本地和服务器上都被修改过。\n\n"
+                "是：保留本地修改（下次同步时覆盖服务器）\n否：使用服务器上的数据\n取消：暂不处理")
+            if keep_local is not None:
+                sync.resolve(conflicts, keep_local)
+                
+        self.reload_synced_data()
+        self.sync_status.config(text=f"上次同步: {datetime.datetime.now().strftime('%H:%M:%S')}")
+        message = f"上传 {report['pushed']} 条，下载 {report['pulled']} 条"
+        if report["removed"]:
+            message += f"，删除服务器上已删除的 {report['removed']} 条"
+        if conflicts:
+            message += f"，冲突 {len(conflicts)} 条"
+        if report["errors"]:
+            message += "\n\n以下记录未能同步:\n" + "\n".join(report["errors"][:10])
+        messagebox.showinfo("同步完成", message)
+        
+    def reload_synced_data(self):
+        """同步后从存储重新加载干系人和需求，刷新已创建的列表"""
+        self.stakeholders = self.store.load_stakeholders()
+        self.requirements = self.store.load_requirements()
+        if hasattr(self, 'stakeholder_tree'):
+            self.refresh_stakeholder_list()
+        else:
+            self.update_survey_stakeholders()
+        if hasattr(self, 'requirement_tree'):
+            self.refresh_requirement_list()
+        if hasattr(self, 'trace_tree'):
+            self.refresh_trace_matrix()
+            
     def export_data(self):
         if not self.stakeholders and not self.responses:
             messagebox.showwarning("无数据", "没有数据可供导出")
@@ -1086,132 +1118,6 @@ class StakeholderSurveyApp:
                 messagebox.showinfo("保存成功", f"报告已保存到 {file_path}")
             except Exception as e:
                 messagebox.showerror("保存失败", f"保存报告时出错: {str(e)}")
-                
-    def create_default_charts(self):
-        # 设置matplotlib支持中文显示
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        # 创建默认的占位图表
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.text(0.5, 0.5, '请点击"生成分析报告"按钮\n以查看数据分析结果', 
-                horizontalalignment='center', verticalalignment='center',
-                transform=ax.transAxes, fontsize=14)
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.axis('off')
-        
-        canvas = FigureCanvasTkAgg(fig, self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-    def save_data(self):
-        data = {
-            "stakeholders": self.stakeholders,
-            "last_updated": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        try:
-            with open("stakeholders.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存干系人数据时出错: {e}")
-            
-    def load_data(self):
-        try:
-            with open("stakeholders.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.stakeholders = data.get("stakeholders", [])
-        except FileNotFoundError:
-            # 文件不存在，使用默认数据
-            self.stakeholders = [
-                {
-                    "id": 1,
-                    "name": "张经理",
-                    "position": "项目经理",
-                    "function_type": "管理职能",
-                    "level": "高级",
-                    "influence": 5,
-                    "interest": 5,
-                    "emotion": "积极",
-                    "contact": "zhang@company.com",
-                    "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                },
-                {
-                    "id": 2,
-                    "name": "李工程师",
-                    "position": "系统架构师",
-                    "function_type": "技术职能",
-                    "level": "专家级",
-                    "influence": 4,
-                    "interest": 4,
-                    "emotion": "中性",
-                    "contact": "li@company.com",
-                    "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                },
-                {
-                    "id": 3,
-                    "name": "王业务",
-                    "position": "业务分析师",
-                    "function_type": "业务职能",
-                    "level": "中级",
-                    "influence": 3,
-                    "interest": 5,
-                    "emotion": "积极",
-                    "contact": "wang@company.com",
-                    "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-            ]
-        except Exception as e:
-            print(f"加载干系人数据时出错: {e}")
-            
-    def save_responses(self):
-        try:
-            with open("responses.json", "w", encoding="utf-8") as f:
-                json.dump(dict(self.responses), f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存调查数据时出错: {e}")
-            
-    def load_responses(self):
-        try:
-            with open("responses.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.responses = defaultdict(list, data)
-        except FileNotFoundError:
-            pass
-        except Exception as e:
-            print(f"加载调查数据时出错: {e}")
-            
-    def save_requirements(self):
-        try:
-            with open("requirements.json", "w", encoding="utf-8") as f:
-                json.dump(self.requirements, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存需求数据时出错: {e}")
-            
-    def load_requirements(self):
-        try:
-            with open("requirements.json", "r", encoding="utf-8") as f:
-                self.requirements = json.load(f)
-        except FileNotFoundError:
-            self.requirements = []
-        except Exception as e:
-            print(f"加载需求数据时出错: {e}")
-            
-    def save_trace_matrix(self):
-        try:
-            with open("trace_matrix.json", "w", encoding="utf-8") as f:
-                json.dump(self.requirement_trace_matrix, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存追溯矩阵数据时出错: {e}")
-            
-    def load_trace_matrix(self):
-        try:
-            with open("trace_matrix.json", "r", encoding="utf-8") as f:
-                self.requirement_trace_matrix = json.load(f)
-        except FileNotFoundError:
-            self.requirement_trace_matrix = {}
-        except Exception as e:
-            print(f"加载追溯矩阵数据时出错: {e}")
 
 def main():
     root = tk.Tk()